@@ -0,0 +1,248 @@
+# app/asgi.py
+
+"""
+ASGI-режим сервера: те же маршруты, что у Flask-приложения (app.server), но ожидание
+рендеринга не занимает поток.
+
+- POST /generate: логика та же (generate_pdf_flow), но Future задания пула ожидается в цикле
+  событий через asyncio.wrap_future — тысячи клиентов, ждущих PDF, это тысячи корутин, а не потоков ОС.
+  Шаги между ожиданиями (проверка настроек, лимиты, кэш PDF на диске, журнал запросов, чтение
+  файла ответа) блокируют, поэтому выполняются короткими вызовами в пуле потоков ASGI_REQUEST_THREADS.
+- GET / и health-маршруты (/health, /metrics) — в том же пуле, не в очереди за долгими запросами WSGI.
+- Остальные маршруты (/jobs, /generate/batch, /generate/multipage, static) выполняет
+  WSGI-приложение Flask в ограниченном пуле потоков (ASGI_WSGI_THREADS), ответ передаётся по частям.
+
+Запрос разбирается тем же кодом, что и во Flask (контекст запроса Flask, werkzeug),
+поэтому авторизация, фильтр по IP (before_request), CORS, метрики и журнал запросов
+(after_request) и обработчик ошибок работают одинаково в обоих режимах.
+
+Запуск:
+    python run.py --mode asgi
+    uvicorn app.asgi:application --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import contextvars
+import functools
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import HTTPException
+
+from app.capture import request_capture
+from app.render_pool import get_render_pool
+from app.server import app as flask_app, generate_pdf_flow
+from configs.config_log import logger
+from configs.config_server import ASGI_REQUEST_THREADS, ASGI_WSGI_THREADS
+
+# Маршруты, логика которых написана генератором и ожидает рендеринг в цикле событий
+ASYNC_FLOWS = {
+    "generate_pdf_route": generate_pdf_flow,
+}
+
+# Быстрые маршруты без ожидания рендеринга — обрабатываются так же, но без генератора
+LOOP_VIEWS = ("index", "health", "metrics")
+
+_wsgi_executor = ThreadPoolExecutor(max_workers=ASGI_WSGI_THREADS, thread_name_prefix="asgi-wsgi")
+# Короткие блокирующие шаги запросов, обрабатываемых в цикле событий (ASYNC_FLOWS, LOOP_VIEWS)
+_request_executor = ThreadPoolExecutor(max_workers=ASGI_REQUEST_THREADS, thread_name_prefix="asgi-request")
+
+
+def build_environ(scope, body: bytes) -> dict:
+    """WSGI environ из ASGI scope и тела запроса (для разбора запроса средствами Flask/werkzeug)."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("0.0.0.0", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name != "CONTENT_LENGTH":
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+def _advance(flow, value):
+    """Шаг генератора-обработчика: (Future задания, None) или (None, ответ), если он завершился."""
+    try:
+        return flow.send(value), None
+    except StopIteration as stop:
+        # StopIteration нельзя передать через Future пула потоков — возвращаем ответ значением
+        return None, stop.value
+
+
+async def drive_flow(flow, run):
+    """
+    Асинхронный аналог app.server.run_flow: шаги генератора выполняет run (в пуле потоков),
+    Future задания ожидается в цикле событий без блокировки.
+    """
+    future, rv = await run(_advance, flow, None)
+    while future is not None:
+        future, rv = await run(_advance, flow, await asyncio.wrap_future(future))
+    return rv
+
+
+def _start_response_collector():
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+        return lambda data: None  # write() из WSGI-приложения Flask не используется
+
+    return started, start_response
+
+
+async def send_response_start(send, started):
+    await send({"type": "http.response.start", "status": started["status"], "headers": started["headers"]})
+
+
+async def send_body(send, started, body, run):
+    """Отправляет ответ WSGI по частям; чтение частей (файл PDF, поток ZIP) выполняет run вне цикла событий."""
+    iterator = iter(body)
+    done = object()
+    try:
+        chunk = await run(next, iterator, done)
+        await send_response_start(send, started)
+        while chunk is not done:
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            chunk = await run(next, iterator, done)
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        if hasattr(body, "close"):
+            await run(body.close)
+
+
+def _finish_request(rv, environ, start_response):
+    response = flask_app.process_response(flask_app.make_response(rv))
+    return response(environ, start_response)
+
+
+def _handle_exception(error, environ, start_response):
+    response = flask_app.make_response(flask_app.handle_exception(error))
+    return response(environ, start_response)
+
+
+async def handle_in_loop(environ, endpoint, send):
+    """
+    Обрабатывает запрос в контексте запроса Flask (before/after_request как во Flask) без потока
+    на весь запрос: синхронные шаги выполняются по одному в _request_executor, в цикле событий —
+    только ожидание рендеринга. Контекст запроса Flask живёт в contextvars, поэтому все шаги
+    выполняются в одной копии контекста.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+
+    def run(func, *args):
+        return loop.run_in_executor(_request_executor, context.run, func, *args)
+
+    started, start_response = _start_response_collector()
+    ctx = flask_app.request_context(environ)
+    await run(ctx.push)
+    try:
+        try:
+            rv = await run(flask_app.preprocess_request)
+            if rv is None:
+                if endpoint in ASYNC_FLOWS:
+                    rv = await drive_flow(ASYNC_FLOWS[endpoint](), run)
+                else:
+                    view = functools.partial(flask_app.view_functions[endpoint], **(ctx.request.view_args or {}))
+                    rv = await run(view)
+        except Exception as e:  # noqa: BLE001
+            rv = await run(flask_app.handle_user_exception, e)
+        body = await run(_finish_request, rv, environ, start_response)
+    except Exception as e:  # noqa: BLE001
+        body = await run(_handle_exception, e, environ, start_response)
+    finally:
+        await run(ctx.pop)
+
+    await send_body(send, started, body, run)
+
+
+async def handle_in_thread(environ, send):
+    """Выполняет запрос WSGI-приложением Flask в пуле потоков, тело ответа передаёт по частям."""
+    run = functools.partial(asyncio.get_running_loop().run_in_executor, _wsgi_executor)
+    started, start_response = _start_response_collector()
+    body = await run(flask_app, environ, start_response)
+    await send_body(send, started, body, run)
+
+
+def match_endpoint(environ):
+    """Имя view-функции Flask для запроса или None (нет маршрута / метод не разрешён)."""
+    try:
+        endpoint, _ = flask_app.url_map.bind_to_environ(environ).match()
+    except HTTPException:
+        return None
+    return endpoint
+
+
+async def lifespan(receive, send):
+    """Запуск пула рендеринга при старте сервера и его остановка при завершении."""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                # Запуск и прогрев воркеров блокирует — выполняем вне цикла событий
+                await asyncio.get_running_loop().run_in_executor(None, get_render_pool)
+            except Exception as e:  # noqa: BLE001
+                logger.exception("Не удалось запустить пул рендеринга:")
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            get_render_pool().shutdown()
+            request_capture.stop()
+            _wsgi_executor.shutdown(wait=False)
+            _request_executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    """ASGI-приложение (ASGI 3)."""
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return  # WebSocket не поддерживается
+
+    environ = build_environ(scope, await read_body(receive))
+    endpoint = match_endpoint(environ)
+    if endpoint in ASYNC_FLOWS or endpoint in LOOP_VIEWS:
+        await handle_in_loop(environ, endpoint, send)
+    else:
+        await handle_in_thread(environ, send)
@@ -0,0 +1,36 @@
+# app/background.py
+
+"""
+Фоновые операции с диском вне пути обработки запроса.
+
+Архивирование PDF в static/downloads/YYYY-MM-DD и запись в дисковый кэш
+выполняются одним фоновым потоком, чтобы ответ клиенту не ждал файловую систему.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from configs.config_log import logger
+
+# Один поток: операции записи выполняются по порядку и не конкурируют за диск
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-writer")
+
+
+def _run_logged(fn, *args):
+    try:
+        fn(*args)
+    except Exception:  # noqa: BLE001
+        logger.exception("Ошибка фоновой операции:")
+
+
+def run_in_background(fn, *args):
+    """Ставит fn(*args) в очередь фонового потока записи. Ошибки только логируются."""
+    return _executor.submit(_run_logged, fn, *args)
+
+
+def archive_pdf(pdf_path, pdf_bytes):
+    """Записывает PDF в архив (создаёт каталог при необходимости)."""
+    os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
+    with open(pdf_path, "wb") as f:
+        f.write(pdf_bytes)
+    logger.info(f"PDF сохранён в архив: {pdf_path}")
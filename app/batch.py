@@ -0,0 +1,122 @@
+# app/batch.py
+
+"""
+Пакетная генерация чертежей (POST /generate/batch).
+
+- Разбор входных данных: JSON-массив объектов или CSV (первая строка — имена полей).
+  Ключи — те же, что в DEFAULT_VALUES_DRAWING / DEFAULT_VALUES_TITLE_BLOCK (+ filename).
+- Потоковая сборка ZIP-архива: файлы добавляются по мере готовности и сразу
+  отдаются клиенту, архив целиком нигде не хранится (ни в памяти, ни на диске).
+"""
+
+import csv
+import io
+import json
+import zipfile
+
+from configs.config import ALL_BLOCKS, DEFAULT_FILENAME, RENDER_BACKENDS, checkbox_fields
+
+# Значения чекбоксов, которые считаются «включено»
+CHECKBOX_TRUE_VALUES = ("on", "да", "true", "1", "yes")
+
+
+class BatchError(ValueError):
+    """Некорректные входные данные пакетного запроса."""
+
+
+def normalize_batch_item(item: dict) -> tuple[dict, str]:
+    """
+    Приводит один набор параметров к виду, который ожидает generate_pdf.
+
+    В отличие от HTML-формы, не переданный чекбокс берёт значение по умолчанию
+    (ALL_BLOCKS), а не False: в JSON/CSV отсутствие поля означает «как обычно».
+    Возвращает (values, filename). Выбрасывает BatchError при недопустимом render_backend.
+    """
+    values = {key: value for key, value in item.items() if value is not None and value != ""}
+    if "render_backend" in values and values["render_backend"] not in RENDER_BACKENDS:
+        raise BatchError(f"Неизвестный render_backend: {values['render_backend']!r} "
+                         f"(допустимо: {', '.join(RENDER_BACKENDS)})")
+    for field, checked_value in checkbox_fields.items():
+        if field in values:
+            raw = values[field]
+            values[field] = raw if isinstance(raw, bool) else str(raw).strip().lower() in CHECKBOX_TRUE_VALUES
+        else:
+            values[field] = ALL_BLOCKS[field][1] == checked_value
+    filename = str(values.pop("filename", "") or DEFAULT_FILENAME)
+    return values, filename
+
+
+def parse_batch_payload(body: bytes, content_type: str, max_items: int) -> list[tuple[dict, str]]:
+    """
+    Разбирает тело запроса: JSON-массив (application/json) или CSV (text/csv).
+    Возвращает список (values, filename). Выбрасывает BatchError при ошибке.
+    """
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    text = body.decode("utf-8-sig")
+
+    if content_type in ("text/csv", "application/csv"):
+        rows = list(csv.DictReader(io.StringIO(text), delimiter=_sniff_delimiter(text)))
+    else:
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise BatchError(f"Некорректный JSON: {e}") from e
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise BatchError("Ожидается JSON-массив объектов с параметрами чертежей")
+
+    if not rows:
+        raise BatchError("Пустой список чертежей")
+    if len(rows) > max_items:
+        raise BatchError(f"Слишком много чертежей в запросе: {len(rows)} (максимум {max_items})")
+
+    return [normalize_batch_item(row) for row in rows]
+
+
+def _sniff_delimiter(text):
+    """Разделитель CSV: ';' (Excel в русской локали) или ','."""
+    header = text.split("\n", 1)[0]
+    return ";" if header.count(";") > header.count(",") else ","
+
+
+class _ZipStream(io.RawIOBase):
+    """Не поддерживающий seek буфер: zipfile пишет в него, генератор забирает готовые байты."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries, manifest_name="manifest.json"):
+    """
+    Генератор ZIP-архива.
+
+    entries — итератор (имя файла в архиве или None, байты PDF или None, запись манифеста).
+    Каждый готовый файл сразу отдаётся наружу; в конце добавляется манифест
+    со статусом каждого элемента (в том числе ошибками).
+    """
+    stream = _ZipStream()
+    manifest = []
+    # PDF уже сжат внутри, повторное сжатие почти ничего не даёт
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, data, record in entries:
+            if name is not None and data is not None:
+                zf.writestr(name, data)
+            manifest.append(record)
+            chunk = stream.pop()
+            if chunk:
+                yield chunk
+        manifest.sort(key=lambda record: record["index"])
+        zf.writestr(manifest_name, json.dumps(manifest, ensure_ascii=False, indent=2),
+                    compress_type=zipfile.ZIP_DEFLATED)
+    yield stream.pop()
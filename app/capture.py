@@ -0,0 +1,201 @@
+# app/capture.py
+
+"""
+Журнал запросов /generate: по одной JSON-строке на запрос (logs/requests.jsonl).
+
+В строке — нормализованные входные данные (после обработки чекбоксов), имя файла,
+клиент, статус ответа, попадание в кэш, время шагов генерации и размер PDF.
+Формат подходит для воспроизведения (benchmarks/load_test.py --replay) и аналитики.
+
+Запись не задерживает ответ: обработчик запроса только кладёт запись в очередь
+(logging.handlers.QueueHandler), а в файл её пишет отдельный поток (QueueListener).
+Если очередь переполнена (диск не успевает), запись отбрасывается и учитывается
+в счётчике dropped. Файл ротируется по размеру и по времени, старые части сжимаются gzip.
+"""
+
+import atexit
+import glob
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from configs.config_log import logger
+from configs.config_server import (
+    CAPTURE_ENABLED, CAPTURE_FILE, CAPTURE_MAX_MB, CAPTURE_ROTATE_HOURS, CAPTURE_BACKUPS, CAPTURE_COMPRESS,
+)
+
+# Макс. кол-во записей, ожидающих записи на диск
+CAPTURE_QUEUE_SIZE = 10000
+
+
+class SizeAndTimeRotatingHandler(logging.handlers.BaseRotatingHandler):
+    """
+    Ротация файла при превышении max_bytes или по истечении interval секунд.
+    Части переименовываются в <файл>.<ГГГГММДД-ЧЧММСС>[.N] и сжимаются gzip (compress=True);
+    хранится не больше backup_count частей, более старые удаляются.
+    """
+
+    def __init__(self, filename, max_bytes, interval, backup_count, compress=True):
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        super().__init__(filename, mode="a", encoding="utf-8", delay=False)
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backup_count = backup_count
+        self.compress = compress
+        self.rollover_at = time.time() + interval if interval > 0 else None
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return self.stream is not None and self.stream.tell() > 0
+        if self.max_bytes > 0 and self.stream is not None:
+            return self.stream.tell() + len(self.format(record)) + 1 > self.max_bytes
+        return False
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        suffix = datetime.now().strftime("%Y%m%d-%H%M%S")
+        target = f"{self.baseFilename}.{suffix}"
+        index = 1
+        while os.path.exists(target) or os.path.exists(target + ".gz"):
+            target = f"{self.baseFilename}.{suffix}.{index}"
+            index += 1
+        os.replace(self.baseFilename, target)
+        if self.compress:
+            with open(target, "rb") as src, gzip.open(target + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(target)
+
+        if self.backup_count > 0:
+            parts = sorted(glob.glob(glob.escape(self.baseFilename) + ".*"), key=os.path.getmtime)
+            for path in parts[:-self.backup_count]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        self.stream = self._open()
+        if self.interval > 0:
+            self.rollover_at = time.time() + self.interval
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler, который при переполненной очереди отбрасывает запись вместо ожидания."""
+
+    def __init__(self, record_queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # Запись уже сериализована в JSON-строку в RequestCapture.record — лишней работы не делаем
+        return record
+
+
+class RequestCapture:
+    """
+    Журнал запросов: неблокирующая запись JSON-строк с ротацией.
+
+    Поток записи запускается при первой записи в текущем процессе: после fork
+    (например, воркеры сервера, запущенного с предзагрузкой приложения) потоки
+    родителя не наследуются, и каждый процесс запускает свой.
+    """
+
+    def __init__(self, path, max_bytes, interval, backup_count, compress=True, enabled=True):
+        self.enabled = enabled
+        self.path = path
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backup_count = backup_count
+        self.compress = compress
+        self._pid = None
+        self._listener = None
+        self._queue_handler = None
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger("request_capture")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+
+    def _start(self):
+        """Открывает файл журнала и запускает поток записи в текущем процессе."""
+        try:
+            file_handler = SizeAndTimeRotatingHandler(
+                self.path, self.max_bytes, self.interval, self.backup_count, self.compress
+            )
+        except OSError as e:
+            logger.warning(f"Журнал запросов отключён: не удалось открыть {self.path}: {e}")
+            self.enabled = False
+            return
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+
+        record_queue = queue.Queue(maxsize=CAPTURE_QUEUE_SIZE)
+        self._queue_handler = _DroppingQueueHandler(record_queue)
+        self._logger.handlers.clear()
+        self._logger.addHandler(self._queue_handler)
+        self._listener = logging.handlers.QueueListener(record_queue, file_handler)
+        self._listener.start()
+        self._pid = os.getpid()
+        atexit.register(self.stop)
+
+    def record(self, **fields):
+        """Добавляет запись в журнал (поле ts проставляется автоматически)."""
+        if not self.enabled:
+            return
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._start()
+                    if not self.enabled:
+                        return
+        entry = {"ts": datetime.now().isoformat(timespec="milliseconds"), **fields}
+        self._logger.info(json.dumps(entry, ensure_ascii=False, default=str, separators=(",", ":")))
+
+    def use_process_file(self, suffix):
+        """
+        Переключает журнал текущего процесса на отдельный файл: logs/requests.jsonl ->
+        logs/requests.<suffix>.jsonl. Нужно, когда запросы обслуживают несколько процессов
+        (режим production): ротация одного файла из нескольких процессов небезопасна.
+        """
+        root, ext = os.path.splitext(self.path)
+        with self._lock:
+            self.stop()
+            self.path = f"{root}.{suffix}{ext}"
+
+    @property
+    def dropped(self) -> int:
+        return self._queue_handler.dropped if self._queue_handler else 0
+
+    def stop(self):
+        """Дописывает оставшиеся в очереди записи и останавливает поток записи."""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+        self._listener = None
+        self._pid = None
+
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+request_capture = RequestCapture(
+    path=CAPTURE_FILE if os.path.isabs(CAPTURE_FILE) else os.path.join(BASE_DIR, CAPTURE_FILE),
+    max_bytes=CAPTURE_MAX_MB * 1024 * 1024,
+    interval=CAPTURE_ROTATE_HOURS * 3600,
+    backup_count=CAPTURE_BACKUPS,
+    compress=CAPTURE_COMPRESS,
+    enabled=CAPTURE_ENABLED,
+)
@@ -0,0 +1,80 @@
+# app/form_page.py
+
+"""
+Страница HTML-формы (GET /), собранная заранее.
+
+Шаблон form.html зависит только от токена формы (SECRET_TOKEN), поэтому страница собирается
+один раз — при первом запросе и после перезагрузки настроек (app.runtime_config) — и хранится
+в памяти в трёх вариантах: без сжатия, gzip и brotli (если установлен пакет brotli).
+Запрос выбирает вариант по Accept-Encoding и получает готовые байты; у каждого варианта
+свой сильный ETag, повторная загрузка с If-None-Match — 304 без тела.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+
+from app.runtime_config import runtime_config
+from configs.config_server import FORM_CACHE_MAX_AGE
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него отдаются gzip и несжатый вариант
+    brotli = None
+
+# Варианты сжатия в порядке предпочтения и суффиксы их ETag
+ENCODINGS = (("br", "-br"), ("gzip", "-gz"))
+
+
+class FormVariant:
+    """Готовое тело страницы в одной кодировке и его ETag (без кавычек)."""
+
+    def __init__(self, body, etag, encoding=None):
+        self.body = body
+        self.etag = etag
+        self.encoding = encoding
+
+
+class FormPage:
+    """
+    Собранная страница формы. render(api_token) возвращает HTML-строку;
+    пересборка — при смене токена или номера перезагрузки настроек.
+    """
+
+    def __init__(self, render, max_age=FORM_CACHE_MAX_AGE):
+        self.render = render
+        self.cache_control = f"private, max-age={max_age}" if max_age > 0 else "private, no-cache"
+        self._key = None
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    def _build(self, api_token) -> dict:
+        body = self.render(api_token).encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        variants = {None: FormVariant(body, digest)}
+        compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body, mode=brotli.MODE_TEXT, quality=11)
+        for encoding, suffix in ENCODINGS:
+            if encoding in compressed:
+                variants[encoding] = FormVariant(compressed[encoding], digest + suffix, encoding)
+        return variants
+
+    def variants(self) -> dict:
+        """Варианты страницы; собираются заново, если сменился токен формы или настройки перечитаны."""
+        key = (os.getenv("SECRET_TOKEN", ""), runtime_config.reloads)
+        if key != self._key:
+            with self._lock:
+                if key != self._key:
+                    self._variants = self._build(key[0])
+                    self._key = key
+        return self._variants
+
+    def select(self, accept_encodings) -> FormVariant:
+        """Вариант для заголовка Accept-Encoding (werkzeug Accept): brotli, gzip или без сжатия."""
+        variants = self.variants()
+        for encoding, _suffix in ENCODINGS:
+            if encoding in variants and accept_encodings[encoding] > 0:
+                return variants[encoding]
+        return variants[None]
@@ -0,0 +1,181 @@
+# app/ip_allowlist.py
+
+"""
+Белый список IP-адресов и подсетей (IPv4 и IPv6).
+
+Записи (адреса и подсети CIDR) при загрузке сливаются в непересекающиеся отсортированные
+интервалы целых чисел — отдельно для IPv4 и IPv6. Проверка адреса — двоичный поиск
+по началам интервалов (bisect), O(log n): стоимость почти не зависит от числа подсетей.
+Последние решения дополнительно кэшируются (LRU), повторный запрос с того же адреса
+обходится без разбора адреса.
+
+Источники записей: переменная ALLOWED_IPS (через запятую) и файл ALLOWED_IPS_FILE
+(по записи на строку, "#" — комментарий). Файл перечитывается без перезапуска сервера:
+не чаще раза в ALLOWED_IPS_RELOAD_SECONDS проверяется время его изменения, и при
+изменении новый список подменяет старый целиком (уже идущие проверки не затрагиваются).
+
+Пустой список (и "*") — ограничений нет, как и раньше.
+"""
+
+import ipaddress
+import os
+import threading
+import time
+from bisect import bisect_right
+from functools import lru_cache
+
+from configs.config_log import logger
+from configs.config_server import ALLOWED_IPS_FILE, ALLOWED_IPS_RELOAD_SECONDS, IP_DECISION_CACHE_SIZE
+
+
+def parse_entries(text) -> list[str]:
+    """Записи из текста: разделители — запятые, пробелы и переводы строк, "#" до конца строки — комментарий."""
+    entries = []
+    for line in text.splitlines():
+        entries.extend(line.split("#", 1)[0].replace(",", " ").split())
+    return entries
+
+
+def _merge(intervals) -> tuple[list[int], list[int]]:
+    """Сливает пересекающиеся и смежные интервалы [start, end]. Возвращает (starts, ends)."""
+    starts, ends = [], []
+    for start, end in sorted(intervals):
+        if ends and start <= ends[-1] + 1:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+class IpAllowlist:
+    """Неизменяемый набор разрешённых подсетей с быстрой проверкой адреса."""
+
+    def __init__(self, entries=(), cache_size=IP_DECISION_CACHE_SIZE, source=""):
+        self.source = source
+        self.allow_all = False
+        intervals = {4: [], 6: []}
+        self.size = 0
+        for entry in entries:
+            if entry == "*":
+                self.allow_all = True
+                continue
+            try:
+                # Адрес без префикса — подсеть из одного адреса (/32 или /128)
+                network = ipaddress.ip_network(entry, strict=False)
+            except ValueError:
+                logger.error(f"Некорректная запись в белом списке IP{f' ({source})' if source else ''}: {entry}")
+                continue
+            intervals[network.version].append(
+                (int(network.network_address), int(network.broadcast_address))
+            )
+            self.size += 1
+        self._intervals = {version: _merge(items) for version, items in intervals.items()}
+        self.is_allowed = lru_cache(maxsize=cache_size)(self._lookup)
+
+    @property
+    def unrestricted(self) -> bool:
+        """Ограничений нет: явный "*" или пустой список."""
+        return self.allow_all or self.size == 0
+
+    def _lookup(self, ip: str) -> bool:
+        if self.unrestricted:
+            return True
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            # Невалидный IP — доступ запрещён
+            return False
+        if addr.version == 6 and addr.ipv4_mapped is not None:
+            addr = addr.ipv4_mapped  # ::ffff:1.2.3.4 — клиент IPv4 на сокете IPv6
+        starts, ends = self._intervals[addr.version]
+        value = int(addr)
+        index = bisect_right(starts, value) - 1
+        return index >= 0 and value <= ends[index]
+
+    def intervals(self, version) -> int:
+        """Кол-во интервалов после слияния (для логов и бенчмарка)."""
+        return len(self._intervals[version][0])
+
+
+class ReloadableAllowlist:
+    """
+    Белый список из ALLOWED_IPS и файла, перечитываемого при изменении.
+    current() возвращает актуальный IpAllowlist; подмена — одно присваивание ссылки.
+    """
+
+    def __init__(self, env_value="", path=None, reload_seconds=ALLOWED_IPS_RELOAD_SECONDS):
+        self.env_entries = parse_entries(env_value)
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._allowlist = self._build(self._read_file())
+        self._log_loaded()
+
+    def _read_file(self) -> list[str] | None:
+        """Записи файла (None — файла нет или его не удалось прочитать)."""
+        if not self.path:
+            return None
+        try:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path, encoding="utf-8") as f:
+                entries = parse_entries(f.read())
+        except OSError:
+            self._mtime = None
+            return None
+        self._mtime = mtime
+        return entries
+
+    def _build(self, file_entries) -> IpAllowlist:
+        return IpAllowlist(self.env_entries + (file_entries or []), source=self.path or "ALLOWED_IPS")
+
+    def _log_loaded(self):
+        allowlist = self._allowlist
+        if allowlist.allow_all:
+            logger.info("IP-фильтрация отключена: '*' — разрешены все IP.")
+        elif allowlist.size:
+            logger.info(f"Белый список IP: записей {allowlist.size}, интервалов IPv4 {allowlist.intervals(4)}, "
+                        f"IPv6 {allowlist.intervals(6)}")
+
+    def reload(self, env_value=None) -> bool:
+        """
+        Перечитывает файл (и, если передано, новое значение ALLOWED_IPS).
+        Возвращает True, если список заменён.
+        """
+        with self._lock:
+            if env_value is not None:
+                self.env_entries = parse_entries(env_value)
+            file_entries = self._read_file()
+            if file_entries is None and self.path and os.path.exists(self.path):
+                return False  # файл есть, но не читается — оставляем прежний список
+            self._allowlist = self._build(file_entries)
+        self._log_loaded()
+        return True
+
+    def current(self) -> IpAllowlist:
+        """Актуальный список; раз в reload_seconds проверяет, не изменился ли файл."""
+        if self.path and self.reload_seconds >= 0:
+            now = time.monotonic()
+            if now - self._checked_at >= self.reload_seconds:
+                self._checked_at = now
+                try:
+                    mtime = os.stat(self.path).st_mtime
+                except OSError:
+                    mtime = None
+                if mtime != self._mtime:
+                    self.reload()
+        return self._allowlist
+
+    def is_allowed(self, ip: str) -> bool:
+        return self.current().is_allowed(ip)
+
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+ip_allowlist = ReloadableAllowlist(
+    os.getenv("ALLOWED_IPS", ""),
+    (ALLOWED_IPS_FILE if os.path.isabs(ALLOWED_IPS_FILE) else os.path.join(BASE_DIR, ALLOWED_IPS_FILE))
+    if ALLOWED_IPS_FILE else None,
+)
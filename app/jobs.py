@@ -0,0 +1,289 @@
+# app/jobs.py
+
+"""
+Реестр асинхронных заданий для API /jobs.
+
+POST /jobs ставит задание в пул рендеринга и сразу возвращает его id,
+GET /jobs/<id> отдаёт состояние (status, stage), GET /jobs/<id>/pdf — результат.
+
+Состояние и результат заданий хранятся на диске (static/downloads/jobs/<id>/), а не в памяти
+процесса: в режиме production задание принимает один процесс-обработчик gunicorn, а запросы
+его статуса и PDF приходят в любой. Процесс, поставивший задание, пишет status.json при
+постановке, начале и смене этапа, а по завершении — сначала result.pdf, затем итоговый
+status.json (запись атомарная: временный файл и os.replace). Если этот процесс завершился,
+не доведя задание до конца, задание считается завершённым с ошибкой.
+
+Завершённые задания хранятся JOBS_TTL_SECONDS секунд, затем удаляются;
+одновременно — не больше JOBS_MAX_COMPLETED, сверх лимита удаляются те,
+которые дольше всех не запрашивали (LRU по времени изменения status.json).
+Каталог заданий просматривает фоновый поток (свой в каждом процессе, запускается при первом
+обращении к реестру после fork), а не обработчик запроса.
+"""
+
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+from app.background import run_in_background
+from app.render_pool import RenderJob, get_render_pool
+from configs.config_log import logger
+from configs.config_server import JOBS_MAX_COMPLETED, JOBS_TTL_SECONDS
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+STATUS_FILE = "status.json"
+RESULT_FILE = "result.pdf"
+FINISHED_STATUSES = ("done", "error", "timeout")
+# Как часто (сек) фоновый поток процесса просматривает каталог заданий для удаления устаревших
+CLEANUP_INTERVAL = 10
+
+_JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def _write_atomic(path, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _process_alive(pid) -> bool:
+    """Жив ли процесс pid (на Windows не проверяется)."""
+    if os.name == "nt" or not pid or pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobRecord:
+    """Состояние задания, прочитанное из status.json (в любом процессе)."""
+
+    def __init__(self, data, directory):
+        self.id = data["id"]
+        self.status = data["status"]
+        self.stage = data.get("stage")
+        self.filename = data.get("filename")
+        self.etag = data.get("etag")
+        self.cache = data.get("cache", "MISS")
+        self.error = data.get("error")
+        self.pid = data.get("pid")
+        self.created_at = data.get("created_at")
+        self.started_at = data.get("started_at")
+        self.finished_at = data.get("finished_at")
+        pdf = data.get("pdf")
+        # Свой result.pdf — в каталоге задания; при RENDER_IN_MEMORY=0 — путь к файлу в архиве
+        self.pdf_path = os.path.join(directory, pdf) if pdf and not os.path.isabs(pdf) else pdf
+
+    def to_dict(self) -> dict:
+        """Состояние задания для JSON-ответа API (как RenderJob.to_dict)."""
+        data = {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status in ("error", "timeout") and self.error:
+            data["error"] = self.error
+        return data
+
+
+class JobRegistry:
+    """Хранит задания, запущенные через API, по их id — в каталоге, общем для всех процессов сервера."""
+
+    def __init__(self, directory, ttl=JOBS_TTL_SECONDS, max_completed=JOBS_MAX_COMPLETED,
+                 cleanup_interval=CLEANUP_INTERVAL):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_completed = max_completed
+        self.cleanup_interval = cleanup_interval
+        # Запись состояний заданий этого процесса (поток пула и фоновый поток записи) — по порядку
+        self._lock = threading.Lock()
+        # Поток очистки: потоки родителя не переживают fork, поэтому запускается в каждом процессе
+        self._cleaner_pid = None
+        self._cleaner_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def submit(self, filename, etag=None, **kwargs) -> RenderJob:
+        """
+        Ставит задание в пул рендеринга (аргументы как у generate_pdf).
+        filename — имя файла для скачивания результата, etag — ключ кэша PDF результата.
+        Пробрасывает RenderQueueFull при переполнении очереди.
+        """
+        self._ensure_cleaner()
+        job = get_render_pool().submit(**kwargs)
+        job.filename = filename
+        job.etag = etag
+        job.on_update = self._save_state
+        self._save_state(job)
+        job.future.add_done_callback(lambda future: run_in_background(self._save_result, job, future.result()))
+        return job
+
+    def add_completed(self, filename, result, etag=None) -> RenderJob:
+        """Регистрирует уже готовое задание (например, при попадании в кэш PDF) без участия воркеров."""
+        self._ensure_cleaner()
+        job = RenderJob({})
+        job.filename = filename
+        job.etag = etag
+        job.status = "done"
+        job.result = result
+        job.started_at = job.finished_at = job.created_at
+        job.future.set_result(result)
+        self._save_result(job, result)
+        return job
+
+    def get(self, job_id) -> JobRecord | None:
+        if not _JOB_ID.fullmatch(job_id):
+            return None
+        self._ensure_cleaner()
+        record = self._read(job_id)
+        if record is None:
+            return None
+        if record.status in FINISHED_STATUSES:
+            # Время изменения status.json — время последнего запроса (порядок вытеснения сверх лимита)
+            try:
+                os.utime(self._status_path(job_id))
+            except OSError:
+                pass
+        elif not _process_alive(record.pid):
+            record.status = "error"
+            record.error = "Процесс сервера, принявший задание, завершился до его окончания"
+        return record
+
+    # Файлы заданий
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.directory, job_id)
+
+    def _status_path(self, job_id):
+        return os.path.join(self._job_dir(job_id), STATUS_FILE)
+
+    def _read(self, job_id) -> JobRecord | None:
+        """Состояние задания или None, если status.json нет, он недописан или повреждён."""
+        try:
+            with open(self._status_path(job_id), "rb") as f:
+                data = json.loads(f.read())
+            return JobRecord(data, self._job_dir(job_id))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @staticmethod
+    def _state(job) -> dict:
+        return {
+            "id": job.id,
+            "status": job.status,
+            "stage": job.stage,
+            "filename": job.filename,
+            "etag": job.etag,
+            "pid": os.getpid(),
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+        }
+
+    def _write_status(self, job_id, state):
+        directory = self._job_dir(job_id)
+        os.makedirs(directory, exist_ok=True)
+        _write_atomic(os.path.join(directory, STATUS_FILE), json.dumps(state, ensure_ascii=False).encode("utf-8"))
+
+    def _save_state(self, job):
+        """Промежуточное состояние (queued/running, этап). После итоговой записи не пишется."""
+        with self._lock:
+            if job.on_update is None:
+                return
+            try:
+                self._write_status(job.id, self._state(job))
+            except OSError as e:
+                logger.error(f"Задание {job.id}: не удалось записать состояние: {e}")
+
+    def _save_result(self, job, result):
+        """Итог задания: сначала PDF, затем status.json — статус done виден только с готовым файлом."""
+        with self._lock:
+            job.on_update = None
+            state = self._state(job)
+            try:
+                if result.get("status") == "OK":
+                    if result.get("pdf") is not None:
+                        os.makedirs(self._job_dir(job.id), exist_ok=True)
+                        _write_atomic(os.path.join(self._job_dir(job.id), RESULT_FILE), result["pdf"])
+                        state["pdf"] = RESULT_FILE
+                    else:
+                        state["pdf"] = os.path.abspath(result["path"]) if result.get("path") else None
+                    state["cache"] = result.get("cache", "MISS")
+                else:
+                    state["error"] = result.get("message")
+                self._write_status(job.id, state)
+            except OSError as e:
+                logger.error(f"Задание {job.id}: не удалось записать результат: {e}")
+
+    # Очистка
+
+    def _ensure_cleaner(self):
+        """Запускает поток очистки в текущем процессе (проверка pid — без блокировки)."""
+        if self.cleanup_interval <= 0 or self._cleaner_pid == os.getpid():
+            return
+        with self._cleaner_lock:
+            if self._cleaner_pid == os.getpid():
+                return
+            self._stopped.clear()
+            threading.Thread(target=self._cleanup_loop, name="jobs-cleanup", daemon=True).start()
+            self._cleaner_pid = os.getpid()
+
+    def _cleanup_loop(self):
+        while not self._stopped.wait(self.cleanup_interval):
+            try:
+                self.cleanup()
+            except Exception:  # noqa: BLE001
+                logger.exception("Ошибка очистки каталога заданий:")
+
+    def stop(self):
+        """Останавливает поток очистки текущего процесса."""
+        self._stopped.set()
+        self._cleaner_pid = None
+
+    def cleanup(self):
+        """
+        Удаляет завершённые задания старше ttl, брошенные (процесс-владелец завершился)
+        и давно не запрашивавшиеся сверх max_completed. Выполняется потоком очистки.
+        """
+        now = time.time()
+        try:
+            job_ids = [name for name in os.listdir(self.directory) if _JOB_ID.fullmatch(name)]
+        except OSError:
+            return
+        expire_before = now - self.ttl
+        completed = []
+        for job_id in job_ids:
+            record = self._read(job_id)
+            try:
+                if record is None:
+                    # status.json ещё не записан или повреждён — удаляется, только если каталог устарел
+                    if os.path.getmtime(self._job_dir(job_id)) < expire_before:
+                        self._remove(job_id)
+                elif record.status in FINISHED_STATUSES:
+                    if record.finished_at is not None and record.finished_at < expire_before:
+                        self._remove(job_id)
+                    else:
+                        completed.append((os.path.getmtime(self._status_path(job_id)), job_id))
+                elif not _process_alive(record.pid) and (record.created_at or 0) < expire_before:
+                    self._remove(job_id)
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"Задание {job_id}: пропущено при очистке: {e}")
+        completed.sort()
+        for _, job_id in completed[:max(0, len(completed) - self.max_completed)]:
+            self._remove(job_id)
+
+    def _remove(self, job_id):
+        shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+
+
+job_registry = JobRegistry(os.path.join(BASE_DIR, "static", "downloads", "jobs"))
@@ -0,0 +1,332 @@
+# app/metrics.py
+
+"""
+Метрики сервера в текстовом формате Prometheus (GET /metrics).
+
+Без внешних зависимостей. Значения хранятся в разделяемой памяти (анонимный mmap, созданный
+при импорте модуля, как таблица ведер app.rate_limit): процессы-обработчики gunicorn,
+созданные fork после предзагрузки приложения (preload_app), пишут в одну таблицу, поэтому
+GET /metrics в любом из них отдаёт метрики всего сервера.
+- Счётчики и гистограммы — общие ячейки, в которые прибавляют все процессы; они переживают
+  перезапуск обработчика.
+- Gauge — ячейка на процесс (значение его пула рендеринга), при сборе суммируется по процессам.
+  Ячейки завершившегося обработчика удаляет главный процесс (child_exit в gunicorn_conf.py).
+
+Воркеры рендеринга сами метрики не ведут — время шагов генерации (timings) они возвращают
+вместе с результатом, а в гистограммы его заносит родительский процесс (app.render_pool).
+
+Таблица фиксированного размера (METRICS_SLOTS) с открытой адресацией; если места нет,
+новые наборы меток не учитываются (с предупреждением в журнале).
+"""
+
+import hashlib
+import json
+import mmap
+import multiprocessing
+import os
+import struct
+import threading
+
+from configs.config_log import logger
+from configs.config_server import METRICS_SLOTS
+
+# Границы корзин гистограмм по умолчанию, сек
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Ячейка таблицы: хеш ключа (0 — свободна, _DELETED — удалена), pid процесса (0 — общая),
+# значение, ключ (JSON [имя метрики, значения меток, поле])
+_KEY_SIZE = 184
+_CELL = struct.Struct(f"=QId{_KEY_SIZE}s")
+_DELETED = 2 ** 64 - 1
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+
+class SharedValues:
+    """Таблица значений метрик в разделяемой между процессами памяти."""
+
+    def __init__(self, slots):
+        self.slots = max(16, int(slots))
+        # mmap(-1, ...) — анонимная память MAP_SHARED: после fork дочерние процессы видят те же данные
+        self._mem = mmap.mmap(-1, self.slots * _CELL.size)
+        self._lock = multiprocessing.Lock()
+        # Индексы ячеек, уже найденных этим процессом: ячейка не переезжает, пока её не удалили,
+        # а удаляются только ячейки завершившихся процессов
+        self._indexes = {}
+        self._full_warned = False
+
+    @staticmethod
+    def _cell_hash(key, pid) -> int:
+        digest = hashlib.blake2b(key + pid.to_bytes(4, "little"), digest_size=8).digest()
+        return int.from_bytes(digest, "little") % (_DELETED - 1) + 1
+
+    def _locate_locked(self, key, pid):
+        """Индекс ячейки ключа; новая ячейка занимает первую свободную или удалённую. None — таблица заполнена."""
+        cached = self._indexes.get((key, pid))
+        if cached is not None:
+            return cached
+        cell_hash = self._cell_hash(key, pid)
+        start = cell_hash % self.slots
+        free = None
+        for probe in range(self.slots):
+            index = (start + probe) % self.slots
+            slot_hash, slot_pid, _, slot_key = _CELL.unpack_from(self._mem, index * _CELL.size)
+            if slot_hash == cell_hash and slot_pid == pid and slot_key.rstrip(b"\0") == key:
+                break
+            if slot_hash == _DELETED:
+                free = index if free is None else free
+                continue
+            if slot_hash == 0:
+                index = index if free is None else free
+                _CELL.pack_into(self._mem, index * _CELL.size, cell_hash, pid, 0.0, key)
+                break
+        else:
+            if free is None:
+                return None
+            index = free
+            _CELL.pack_into(self._mem, index * _CELL.size, cell_hash, pid, 0.0, key)
+        self._indexes[(key, pid)] = index
+        return index
+
+    def _update(self, updates, pid, add):
+        """updates — пары (ключ, число): прибавляет (add) или записывает значения под одной блокировкой."""
+        with self._lock:
+            for key, value in updates:
+                index = self._locate_locked(key, pid)
+                if index is None:
+                    if not self._full_warned:
+                        self._full_warned = True
+                        logger.warning(f"Таблица метрик заполнена (METRICS_SLOTS={self.slots}), "
+                                       f"новые наборы меток не учитываются")
+                    continue
+                offset = index * _CELL.size + 12
+                if add:
+                    value += struct.unpack_from("=d", self._mem, offset)[0]
+                struct.pack_into("=d", self._mem, offset, value)
+
+    def add(self, updates):
+        """Прибавляет к общим ячейкам (счётчики, гистограммы)."""
+        self._update(updates, 0, add=True)
+
+    def set(self, updates):
+        """Записывает значения в ячейки текущего процесса (gauge)."""
+        self._update(updates, os.getpid(), add=False)
+
+    def forget_process(self, pid):
+        """Удаляет ячейки процесса pid (после его завершения)."""
+        with self._lock:
+            for index in range(self.slots):
+                slot_hash, slot_pid, _, _ = _CELL.unpack_from(self._mem, index * _CELL.size)
+                if slot_pid == pid and slot_hash not in (0, _DELETED):
+                    _CELL.pack_into(self._mem, index * _CELL.size, _DELETED, 0, 0.0, b"")
+            self._indexes = {cell: index for cell, index in self._indexes.items() if cell[1] != pid}
+
+    def snapshot(self) -> dict:
+        """Значения всех ячеек, просуммированные по процессам: {имя метрики: {(значения меток, поле): число}}."""
+        with self._lock:
+            data = bytes(self._mem)
+        values = {}
+        for slot_hash, _, value, key in _CELL.iter_unpack(data):
+            if slot_hash in (0, _DELETED):
+                continue
+            name, labelvalues, field = json.loads(key.rstrip(b"\0"))
+            series = values.setdefault(name, {})
+            series_key = (tuple(labelvalues), field)
+            series[series_key] = series.get(series_key, 0) + value
+        return values
+
+
+class _Metric:
+    """Общая часть метрик: имя, описание, имена меток; значения — в таблице реестра (store)."""
+
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.store = None
+
+    def _labelvalues(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: ожидаются метки {self.labelnames}, получены {tuple(labels)}")
+        return [str(labels[name]) for name in self.labelnames]
+
+    def _key(self, labelvalues, field=""):
+        key = json.dumps([self.name, labelvalues, field], ensure_ascii=False).encode("utf-8")
+        if len(key) > _KEY_SIZE:
+            raise ValueError(f"{self.name}: слишком длинные значения меток {labelvalues}")
+        return key
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def collect(self, values) -> list[str]:
+        """Строки метрики; values — её значения из SharedValues.snapshot()."""
+        lines = self._header()
+        for (labelvalues, _), value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Монотонно растущий счётчик (общий для всех процессов)."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        self.store.add([(self._key(self._labelvalues(labels)), amount)])
+
+
+class Gauge(_Metric):
+    """Текущее значение процесса; в /metrics — сумма по всем процессам сервера."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        self.store.set([(self._key(self._labelvalues(labels)), value)])
+
+
+class Histogram(_Metric):
+    """Гистограмма с накопительными корзинами (_bucket), суммой (_sum) и количеством (_count)."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        labelvalues = self._labelvalues(labels)
+        index = next(index for index, bound in enumerate(self.buckets) if value <= bound)
+        self.store.add([
+            (self._key(labelvalues, f"bucket:{index}"), 1),
+            (self._key(labelvalues, "sum"), value),
+            (self._key(labelvalues, "count"), 1),
+        ])
+
+    def collect(self, values) -> list[str]:
+        lines = self._header()
+        series = {}
+        for (labelvalues, field), value in values.items():
+            state = series.setdefault(labelvalues, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            if field.startswith("bucket:"):
+                state["buckets"][int(field[len("bucket:"):])] = value
+            else:
+                state[field] = value
+        for labelvalues, state in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["buckets"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, labelvalues, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(state['count'])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Набор метрик сервера, отдаётся целиком в формате Prometheus."""
+
+    def __init__(self, slots=METRICS_SLOTS):
+        self.store = SharedValues(slots)
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+            metric.store = self.store
+            self._metrics[metric.name] = metric
+        return metric
+
+    def forget_process(self, pid):
+        """Убирает gauge завершившегося процесса pid из суммы."""
+        self.store.forget_process(pid)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        values = self.store.snapshot()
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect(values.get(metric.name, {})))
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Время шагов генерации внутри воркера: add_* из frame_calculations, draw_views,
+# draw_title_block и draw_table (надписи рамки и значения таблицы), draw_base_sheet (постоянная часть листа:
+# примечания, линии рамки, сетка таблицы), fonts (подключение шрифта), tostring (dwg.tostring()), svg2pdf, write (запись файла);
+# при render_backend='cairo' вместо fonts, tostring и svg2pdf — optimize (оптимизация списка отображения),
+# replay (рисование списка на PDF-поверхности) и finish (её завершение)
+RENDER_STEP_SECONDS = registry.register(Histogram(
+    "frame_render_step_seconds", "Время шага генерации чертежа в воркере", ("step",)))
+
+# Полное время задания в воркере (от приёма до результата)
+RENDER_JOB_SECONDS = registry.register(Histogram(
+    "frame_render_job_seconds", "Время выполнения задания рендеринга", ("task",)))
+
+# Время ожидания задания в очереди до передачи воркеру
+RENDER_QUEUE_WAIT_SECONDS = registry.register(Histogram(
+    "frame_render_queue_wait_seconds", "Время ожидания задания в очереди пула", ("priority",)))
+
+# Задания, не принятые в очередь (ответ 429): queue_full, client_limit, slo
+RENDER_JOBS_REJECTED_TOTAL = registry.register(Counter(
+    "frame_render_jobs_rejected_total", "Задания, отклонённые при постановке в очередь", ("priority", "reason")))
+
+RENDER_JOBS_TOTAL = registry.register(Counter(
+    "frame_render_jobs_total", "Завершённые задания рендеринга по результату", ("task", "status")))
+
+# Суммарное время занятости воркеров: rate(...) / число воркеров — загрузка пула
+RENDER_WORKER_BUSY_SECONDS_TOTAL = registry.register(Counter(
+    "frame_render_worker_busy_seconds_total", "Суммарное время выполнения заданий воркерами"))
+
+# Состояние пулов рендеринга (у каждого процесса-обработчика свой пул, в /metrics — сумма):
+# ожидающие задания по классам приоритета, занятые воркеры и размер пулов;
+# загрузка — frame_render_workers_busy / frame_render_workers
+RENDER_QUEUE_DEPTH = registry.register(Gauge(
+    "frame_render_queue_depth", "Задания, ожидающие свободного воркера", ("priority",)))
+
+RENDER_WORKERS_BUSY = registry.register(Gauge(
+    "frame_render_workers_busy", "Воркеры, занятые заданием"))
+
+RENDER_POOL_SIZE = registry.register(Gauge(
+    "frame_render_workers", "Размер пула рендеринга"))
+
+RENDER_WORKER_RESTARTS_TOTAL = registry.register(Counter(
+    "frame_render_worker_restarts_total", "Перезапуски воркеров по причине", ("reason",)))
+
+PDF_SIZE_BYTES = registry.register(Histogram(
+    "frame_pdf_size_bytes", "Размер сформированного PDF", ("task",),
+    buckets=(16e3, 32e3, 64e3, 128e3, 256e3, 512e3, 1e6, 2e6, 4e6, 8e6, 16e6)))
+
+HTTP_REQUESTS_TOTAL = registry.register(Counter(
+    "frame_http_requests_total", "HTTP-запросы по эндпоинту и коду ответа", ("endpoint", "method", "status")))
+
+HTTP_REQUEST_SECONDS = registry.register(Histogram(
+    "frame_http_request_seconds", "Время обработки HTTP-запроса (без потоковой передачи тела)", ("endpoint",)))
+
+# Перезагрузки настроек без перезапуска (app.runtime_config): ok / error
+CONFIG_RELOADS_TOTAL = registry.register(Counter(
+    "frame_config_reloads_total", "Перезагрузки настроек без перезапуска сервера", ("result",)))
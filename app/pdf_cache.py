@@ -0,0 +1,234 @@
+# app/pdf_cache.py
+
+"""
+Кэш готовых PDF-чертежей с адресацией по содержимому входных данных.
+
+Ключ — sha256 от версии рендерера и канонического представления объединённых значений
+(значения по умолчанию из ALL_BLOCKS + значения пользователя), где:
+- числа и числовые строки нормализованы (3000, "3000", " 3000 " -> "3000");
+- имя файла (filename) не учитывается — оно влияет только на имя при скачивании.
+Версия рендерера (RENDER_VERSION) меняется при изменении кода и настроек чертежа,
+шрифта или версий CairoSVG/cairocffi — PDF, сформированные старой версией, не отдаются.
+В ключ входит и версия настроек чертежа (app.runtime_config) — после перезагрузки
+configs/config.py без перезапуска сервера старые PDF тоже не отдаются.
+Тот же ключ служит сильным ETag ответа (If-None-Match -> 304 без рендеринга).
+
+Два уровня:
+- память: ограниченный по объёму LRU (OrderedDict);
+- диск: файлы <ключ>.pdf в static/downloads/cache, при превышении объёма
+  удаляются давно не использованные (по mtime, обновляется при каждом попадании).
+
+Попадание в кэш отдаёт сохранённый PDF без участия воркеров рендеринга.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from importlib import metadata
+
+from app.runtime_config import runtime_config
+from configs.config import ALL_BLOCKS
+from configs.config_log import logger
+from configs.config_server import PDF_CACHE_ENABLED, PDF_CACHE_MEMORY_MB, PDF_CACHE_DISK_MB
+
+# Поля, которые не влияют на содержимое чертежа
+NON_RENDER_FIELDS = ("filename",)
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Файлы, от которых зависит содержимое PDF (пути от корня проекта, допускаются шаблоны glob)
+RENDER_SOURCES = (
+    "generate_drawing.py", "frame_calculations.py", "font_embedder.py",
+    "drawers/*.py", "utils/*.py", "configs/config.py", "configs/config_title_block.py", "assets/*.TTF",
+)
+# Библиотеки, от версий которых зависит PDF (SVG пишет SvgCanvas, версия svgwrite на него не влияет)
+RENDER_PACKAGES = ("CairoSVG", "cairocffi")
+
+
+def _render_version() -> str:
+    """Хеш содержимого файлов рендерера и версий библиотек (16 hex-символов)."""
+    digest = hashlib.sha256()
+    for pattern in RENDER_SOURCES:
+        for path in sorted(glob.glob(os.path.join(BASE_DIR, pattern))):
+            digest.update(os.path.relpath(path, BASE_DIR).encode("utf-8"))
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    for package in RENDER_PACKAGES:
+        try:
+            version = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            version = "-"
+        digest.update(f"{package}=={version}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+RENDER_VERSION = _render_version()
+
+
+def _normalize_value(value):
+    """
+    Нормализует значение для ключа так, чтобы равные ключи давали одинаковый чертёж:
+    - числа и числовые строки приводятся к одной строке (3000, "3000", " 3000 " -> "3000");
+    - у прочих строк убираются пробелы по краям (в SVG они всё равно не видны).
+    Строки вида "3000.0" или "03000" не сворачиваются в "3000": в таблице чертежа
+    значение печатается как введено, и PDF будет отличаться.
+    """
+    if isinstance(value, bool) or value is None:
+        return value
+    return str(value).strip()
+
+
+def canonical_values(values: dict) -> dict:
+    """Объединяет значения по умолчанию с пользовательскими и нормализует их для ключа кэша."""
+    default_values = {key: value[1] for key, value in ALL_BLOCKS.items()}
+    combined_values = {**default_values, **(values or {})}
+    return {
+        key: _normalize_value(value)
+        for key, value in combined_values.items()
+        if key not in NON_RENDER_FIELDS
+    }
+
+
+def values_hash(values: dict) -> str:
+    """Канонический хеш параметров чертежа с учётом версий рендерера и настроек (sha256, hex)."""
+    payload = json.dumps(canonical_values(values), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(f"{RENDER_VERSION}:{runtime_config.version}:{payload}".encode("utf-8")).hexdigest()
+
+
+def multipage_hash(values_list) -> str:
+    """Ключ многостраничного PDF: хеш от упорядоченного списка ключей страниц."""
+    payload = "multipage:" + ",".join(values_hash(values) for values in values_list)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    """Двухуровневый (память + диск) LRU-кэш PDF по ключу values_hash."""
+
+    def __init__(self, directory, memory_limit_bytes, disk_limit_bytes, enabled=True):
+        self.enabled = enabled
+        self.directory = directory
+        self.memory_limit = memory_limit_bytes
+        self.disk_limit = disk_limit_bytes
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _disk_path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key) -> bytes | None:
+        """Возвращает PDF из кэша (сначала память, затем диск) или None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return data
+
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # отмечаем использование для LRU на диске
+        except OSError:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        with self._lock:
+            self._stats["disk_hits"] += 1
+            self._put_memory_locked(key, data)
+        return data
+
+    def put(self, key, data: bytes):
+        """Сохраняет PDF в оба уровня кэша."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._put_memory_locked(key, data)
+            self._stats["stores"] += 1
+
+        if self.disk_limit <= 0:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self._disk_path(key) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._disk_path(key))
+            self._evict_disk()
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить PDF в дисковый кэш: {e}")
+
+    def put_file(self, key, pdf_path):
+        """Сохраняет в кэш уже записанный на диск PDF."""
+        if not self.enabled:
+            return
+        try:
+            with open(pdf_path, "rb") as f:
+                self.put(key, f.read())
+        except OSError as e:
+            logger.warning(f"Не удалось прочитать PDF для кэша: {e}")
+
+    def _put_memory_locked(self, key, data):
+        if len(data) > self.memory_limit:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_limit:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self._stats["evictions"] += 1
+
+    def _evict_disk(self):
+        """Удаляет самые давно использованные файлы, пока объём кэша на диске больше лимита."""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".pdf"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        if total <= self.disk_limit:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.disk_limit:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                with self._lock:
+                    self._stats["evictions"] += 1
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        """Статистика попаданий/промахов и текущий объём кэша в памяти."""
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_size,
+            }
+
+
+pdf_cache = PdfCache(
+    directory=os.path.join(BASE_DIR, "static", "downloads", "cache"),
+    memory_limit_bytes=PDF_CACHE_MEMORY_MB * 1024 * 1024,
+    disk_limit_bytes=PDF_CACHE_DISK_MB * 1024 * 1024,
+    enabled=PDF_CACHE_ENABLED,
+)
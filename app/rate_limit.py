@@ -0,0 +1,174 @@
+# app/rate_limit.py
+
+"""
+Ограничение частоты запросов и процессорного времени рендеринга (token bucket).
+
+У каждого ключа (токен API или IP клиента) два «ведра»:
+- запросы: ёмкость burst, пополняется со скоростью rps в секунду, запрос забирает 1;
+- процессорное время рендеринга: ёмкость cpu_burst секунд, пополняется на cpu_per_minute
+  секунд в минуту. После завершения задания списывается процессорное время воркера
+  (time.process_time, без ожидания в очереди и передачи результата); ведро может уйти
+  в минус — тогда новые запросы отклоняются, пока долг не погасится.
+
+Состояние ведер хранится в разделяемой памяти (анонимный mmap, созданный при импорте модуля):
+процессы-обработчики gunicorn, созданные fork после предзагрузки приложения (preload_app),
+работают с одной и той же таблицей, поэтому лимит общий для всего сервера, а не для процесса.
+Таблица фиксированного размера (RATE_LIMIT_SLOTS) с открытой адресацией; если места нет,
+вытесняется ведро, которое дольше всех не использовалось.
+"""
+
+import hashlib
+import math
+import mmap
+import multiprocessing
+import struct
+import time
+
+from configs.config_server import (
+    RATE_LIMIT_ENABLED, RATE_LIMIT_SLOTS,
+    RATE_LIMIT_RPS, RATE_LIMIT_BURST, RATE_LIMIT_CPU_PER_MINUTE, RATE_LIMIT_CPU_BURST,
+    RATE_LIMIT_IP_RPS, RATE_LIMIT_IP_BURST, RATE_LIMIT_IP_CPU_PER_MINUTE, RATE_LIMIT_IP_CPU_BURST,
+)
+
+# Слот таблицы: хеш ключа (0 — свободен), время обновления, остаток запросов, остаток CPU-секунд
+_SLOT = struct.Struct("=Qddd")
+
+# Сколько соседних слотов просматривается при поиске ключа
+_PROBES = 16
+
+# Лимиты по умолчанию: для токенов и для IP клиентов
+TOKEN_LIMITS = {
+    "rps": RATE_LIMIT_RPS,
+    "burst": RATE_LIMIT_BURST,
+    "cpu_per_minute": RATE_LIMIT_CPU_PER_MINUTE,
+    "cpu_burst": RATE_LIMIT_CPU_BURST,
+}
+IP_LIMITS = {
+    "rps": RATE_LIMIT_IP_RPS,
+    "burst": RATE_LIMIT_IP_BURST,
+    "cpu_per_minute": RATE_LIMIT_IP_CPU_PER_MINUTE,
+    "cpu_burst": RATE_LIMIT_IP_CPU_BURST,
+}
+
+
+class RateDecision:
+    """
+    Результат проверки ключа: allowed, остаток запросов в ведре (remaining), время до
+    полного пополнения (reset, сек) и пауза перед повтором при отказе (retry_after, сек).
+    """
+
+    def __init__(self, key, limits, allowed, remaining, cpu_remaining, reset, retry_after=0):
+        self.key = key
+        self.limits = limits
+        self.allowed = allowed
+        self.remaining = remaining
+        self.cpu_remaining = cpu_remaining
+        self.reset = reset
+        self.retry_after = retry_after
+
+
+class SharedTokenBuckets:
+    """Таблица ведер в разделяемой между процессами памяти."""
+
+    def __init__(self, slots):
+        self.slots = max(_PROBES, int(slots))
+        # mmap(-1, ...) — анонимная память MAP_SHARED: после fork дочерние процессы видят те же данные
+        self._mem = mmap.mmap(-1, self.slots * _SLOT.size)
+        self._lock = multiprocessing.Lock()
+
+    @staticmethod
+    def _key_hash(key) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+
+    def _locate_locked(self, key_hash):
+        """Индекс слота ключа и его состояние (None для нового ключа — слот свободный или вытесняемый)."""
+        start = key_hash % self.slots
+        victim, victim_updated = None, None
+        for probe in range(_PROBES):
+            index = (start + probe) % self.slots
+            slot_key, updated, requests, cpu = _SLOT.unpack_from(self._mem, index * _SLOT.size)
+            if slot_key == key_hash:
+                return index, (updated, requests, cpu)
+            if slot_key == 0:
+                return index, None
+            if victim is None or updated < victim_updated:
+                victim, victim_updated = index, updated
+        return victim, None
+
+    @staticmethod
+    def _refill(state, limits, now):
+        if state is None:
+            return limits["burst"], limits["cpu_burst"]
+        updated, requests, cpu = state
+        elapsed = max(0.0, now - updated)
+        requests = min(limits["burst"], requests + elapsed * limits["rps"])
+        cpu = min(limits["cpu_burst"], cpu + elapsed * limits["cpu_per_minute"] / 60)
+        return requests, cpu
+
+    def acquire(self, key, limits) -> RateDecision:
+        """Забирает один запрос из ведра ключа, если в ведре запросов он есть и нет долга по CPU."""
+        key_hash = self._key_hash(key)
+        now = time.monotonic()
+        with self._lock:
+            index, state = self._locate_locked(key_hash)
+            requests, cpu = self._refill(state, limits, now)
+            allowed = requests >= 1 and cpu > 0
+            if allowed:
+                requests -= 1
+            _SLOT.pack_into(self._mem, index * _SLOT.size, key_hash, now, requests, cpu)
+
+        retry_after = 0
+        if not allowed:
+            waits = []
+            if requests < 1:
+                waits.append((1 - requests) / limits["rps"] if limits["rps"] > 0 else 60)
+            if cpu <= 0:
+                waits.append(-cpu / (limits["cpu_per_minute"] / 60) if limits["cpu_per_minute"] > 0 else 60)
+            retry_after = max(1, math.ceil(max(waits)))
+        reset = (limits["burst"] - requests) / limits["rps"] if limits["rps"] > 0 else 0
+        return RateDecision(key, limits, allowed, int(requests), cpu, max(0, math.ceil(reset)), retry_after)
+
+    def charge(self, key, limits, cpu_seconds):
+        """Списывает процессорное время рендеринга (может увести ведро CPU в минус)."""
+        key_hash = self._key_hash(key)
+        now = time.monotonic()
+        with self._lock:
+            index, state = self._locate_locked(key_hash)
+            requests, cpu = self._refill(state, limits, now)
+            cpu = max(-limits["cpu_burst"], cpu - cpu_seconds)
+            _SLOT.pack_into(self._mem, index * _SLOT.size, key_hash, now, requests, cpu)
+
+
+class RateLimiter:
+    """Проверка и учёт лимитов для набора ключей запроса (токен и IP)."""
+
+    def __init__(self, slots=RATE_LIMIT_SLOTS, enabled=RATE_LIMIT_ENABLED):
+        self.enabled = enabled
+        self.buckets = SharedTokenBuckets(slots) if enabled else None
+
+    @staticmethod
+    def request_keys(token, client_ip) -> list[tuple[str, dict]]:
+        """
+        Ключи и лимиты запроса: IP клиента всегда, токен — если он известен и не общий.
+        Общим токеном формы (SECRET_TOKEN) пользуются все посетители: общее ведро на него
+        позволило бы одному IP исчерпать лимит всех остальных, поэтому их различают только по IP
+        (как render_client_key в app.server).
+        """
+        keys = [(f"ip:{client_ip}", IP_LIMITS)]
+        if token is not None and not token.shared:
+            keys.append((f"token:{token.name}", {**TOKEN_LIMITS, **token.limits}))
+        return keys
+
+    def check(self, keys) -> list[RateDecision]:
+        """Проверяет все ключи запроса. Запрос разрешён, если разрешены все решения."""
+        if not self.enabled:
+            return []
+        return [self.buckets.acquire(key, limits) for key, limits in keys]
+
+    def charge(self, keys, cpu_seconds):
+        if self.enabled and cpu_seconds > 0:
+            for key, limits in keys:
+                self.buckets.charge(key, limits, cpu_seconds)
+
+
+rate_limiter = RateLimiter()
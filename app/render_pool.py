@@ -0,0 +1,837 @@
+# app/render_pool.py
+
+"""
+Пул долгоживущих процессов для генерации PDF-чертежей.
+
+Раньше на каждый запрос /generate запускался новый `multiprocessing.Process`,
+и каждый чертёж платил за создание процесса и повторный импорт svgwrite,
+cairosvg, numpy и всех модулей drawers/. Теперь процессы-воркеры создаются
+один раз при старте сервера:
+- каждый воркер один раз импортирует `generate_drawing.generate_pdf` со всеми зависимостями;
+- при включённом прогреве рендерит чертёж со значениями по умолчанию;
+- затем получает задания по собственному каналу (Pipe) и возвращает по нему результат.
+
+Очередь заданий ограничена (RENDER_QUEUE_SIZE): задания ждут в памяти родительского
+процесса и передаются воркерам только когда есть свободный воркер. При переполнении
+`submit` выбрасывает `RenderQueueFull` с оценкой времени, через которое стоит повторить.
+
+Задания делятся на классы приоритета (PRIORITY_CLASSES): интерактивные выбираются из очереди
+раньше пакетных, пакетные занимают не больше RENDER_BULK_MAX_WORKERS воркеров. Внутри класса
+задания разных клиентов выдаются по кругу, у каждого клиента ограничено число ожидающих
+заданий (RENDER_CLIENT_MAX_QUEUED), а задание, которое по прогнозу прождёт дольше целевого
+времени класса (RENDER_QUEUE_SLO), отклоняется сразу — один клиент не может занять пул
+или очередь целиком.
+
+Задание передаётся воркеру вместе с версией настроек (app.runtime_config), с которой его
+поставили в очередь: воркер с устаревшими настройками перезагружает их перед заданием.
+
+Изоляция CairoSVG от процесса Flask сохраняется — рендеринг по-прежнему
+выполняется в отдельных процессах. Каждый этап (расчёты, SVG, PDF) ограничен
+по времени (RENDER_STAGE_TIMEOUTS): зависший или упавший воркер завершается
+и заменяется новым, а задание получает результат со статусом "timeout" / "error".
+
+Использование:
+    pool = get_render_pool()
+    result = pool.render(pdf_path="...", values={...})      # синхронно
+    job = pool.submit(pdf_path="...", values={...})         # асинхронно, job.future / job.status
+"""
+
+import atexit
+import math
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from app.metrics import (
+    PDF_SIZE_BYTES, RENDER_JOB_SECONDS, RENDER_JOBS_REJECTED_TOTAL, RENDER_JOBS_TOTAL, RENDER_QUEUE_DEPTH,
+    RENDER_QUEUE_WAIT_SECONDS, RENDER_STEP_SECONDS, RENDER_WORKER_BUSY_SECONDS_TOTAL, RENDER_WORKER_RESTARTS_TOTAL,
+    RENDER_POOL_SIZE, RENDER_WORKERS_BUSY,
+)
+from app.runtime_config import runtime_config
+from configs.config import ALL_BLOCKS, checkbox_fields
+from configs.config_log import logger
+from configs.config_server import (
+    RENDER_WORKERS, RENDER_WARMUP, RENDER_QUEUE_SIZE, RENDER_STAGE_TIMEOUTS,
+    RENDER_BULK_MAX_WORKERS, RENDER_CLIENT_MAX_QUEUED, RENDER_QUEUE_SLO,
+    RENDER_RESPAWN_DELAY, RENDER_RESPAWN_MAX_DELAY, RENDER_START_MAX_FAILURES, RENDER_START_TIMEOUT,
+)
+
+
+class RenderQueueFull(Exception):
+    """
+    Задание не принято в очередь рендеринга. retry_after — рекомендуемая пауза перед повтором, сек.
+    reason: "queue_full" — очередь заполнена, "client_limit" — у клиента слишком много
+    ожидающих заданий, "slo" — прогноз ожидания больше целевого времени класса.
+    """
+
+    MESSAGES = {
+        "queue_full": "Очередь рендеринга переполнена",
+        "client_limit": "Слишком много заданий клиента в очереди рендеринга",
+        "slo": "Ожидание в очереди рендеринга превысит допустимое",
+    }
+
+    def __init__(self, retry_after, reason="queue_full"):
+        super().__init__(self.MESSAGES.get(reason, self.MESSAGES["queue_full"]))
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class RenderPoolError(Exception):
+    """Пул рендеринга неисправен: воркеры не запускаются подряд или не готовы за RENDER_START_TIMEOUT."""
+
+
+# Функции generate_drawing, которые можно выполнить в воркере
+RENDER_TASKS = ("generate_pdf", "generate_multipage_pdf")
+
+# Классы приоритета заданий, от высшего к низшему
+PRIORITY_CLASSES = ("interactive", "bulk")
+
+
+def default_render_values() -> dict:
+    """
+    Значения формы по умолчанию в том виде, в каком их присылает сервер:
+    чекбоксы уже преобразованы в True/False (как после обработки в /generate).
+    """
+    values = {key: value[1] for key, value in ALL_BLOCKS.items()}
+    for field, checked_value in checkbox_fields.items():
+        values[field] = values.get(field) == checked_value
+    return values
+
+
+def _render_worker(worker_id, conn, warmup):
+    """
+    Основной цикл процесса-воркера.
+
+    Импорт generate_drawing выполняется здесь один раз на весь срок жизни процесса.
+    conn — собственный канал воркера (multiprocessing.Pipe) для заданий и сообщений.
+    Задание — кортеж (job_id, имя функции из RENDER_TASKS, kwargs, версия настроек),
+    None — сигнал завершения. Если версия отличается от версии воркера, настройки
+    перезагружаются до начала задания (app.runtime_config).
+    Если pdf_path не задан, PDF возвращается в результате в виде байтов (ключ "pdf").
+    В результат также добавляются время шагов генерации (timings), размер PDF (pdf_size) —
+    метрики по ним ведёт родительский процесс, — и процессорное время задания в воркере
+    (cpu_seconds, по time.process_time), которое списывается с лимитов CPU клиента (app.rate_limit).
+    Сообщения в conn: ("ready", worker_id, None), ("start", job_id, worker_id),
+    ("stage", job_id, имя этапа), ("done", job_id, результат).
+    """
+    import generate_drawing
+    from generate_drawing import generate_pdf
+
+    if warmup:
+        try:
+            generate_pdf(pdf_path=os.devnull, values=default_render_values(),
+                         disable_svg_debug=True, save_pdf=True)
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"Воркер {worker_id}: ошибка прогрева: {e}")
+
+    conn.send(("ready", worker_id, None))
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+
+        job_id, task_name, kwargs, config_version = task
+        runtime_config.sync(config_version)
+        conn.send(("start", job_id, worker_id))
+        timings = {}
+        cpu_started = time.process_time()
+        try:
+            render = getattr(generate_drawing, task_name)
+            pdf_bytes = render(**kwargs, on_stage=lambda stage: conn.send(("stage", job_id, stage)),
+                               timings=timings)
+            result = {"status": "OK", "path": kwargs.get("pdf_path")}
+            if pdf_bytes is not None:
+                # Режим без записи на диск: PDF возвращается через канал воркера
+                result["pdf"] = pdf_bytes
+                result["pdf_size"] = len(pdf_bytes)
+            elif result["path"] and os.path.exists(result["path"]):
+                result["pdf_size"] = os.path.getsize(result["path"])
+        except Exception as e:  # noqa: BLE001
+            result = {
+                "status": "error",
+                "message": str(e),
+                "trace": traceback.format_exc(),
+            }
+        result["timings"] = timings
+        result["cpu_seconds"] = time.process_time() - cpu_started
+        conn.send(("done", job_id, result))
+
+
+class RenderJob:
+    """
+    Задание на рендеринг.
+
+    status: "queued" -> "running" -> "done" | "error" | "timeout"
+    stage: текущий этап генерации ("calculations", "svg", "pdf"), пока задание выполняется;
+    после ошибки или таймаута — этап, на котором задание было прервано.
+    priority: класс приоритета из PRIORITY_CLASSES; client — ключ клиента для справедливой очереди.
+    future: concurrent.futures.Future с итоговым результатом (dict, как у generate_pdf).
+    on_update: вызывается с заданием при смене status/stage до завершения (в потоке приёма
+    результатов пула, вне его блокировки) — app.jobs записывает по нему состояние на диск.
+    """
+
+    def __init__(self, kwargs, task="generate_pdf", priority="interactive", client=None):
+        self.id = uuid.uuid4().hex
+        self.task = task
+        self.kwargs = kwargs
+        self.priority = priority
+        self.client = client
+        self.filename = None
+        self.etag = None  # ключ кэша PDF результата (сильный ETag при скачивании)
+        self.config_version = runtime_config.version  # версия настроек, с которой задание поставлено
+        self.status = "queued"
+        self.stage = None
+        self.result = None
+        self.created_at = time.time()
+        self.dispatched_at = None
+        self.started_at = None
+        self.finished_at = None
+        self.future = Future()
+        self.on_update = None
+
+    def to_dict(self) -> dict:
+        """Состояние задания для JSON-ответа API."""
+        data = {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status in ("error", "timeout") and self.result:
+            data["error"] = self.result.get("message")
+        return data
+
+
+class _FairQueue:
+    """
+    Очередь заданий одного класса приоритета: у каждого клиента своя очередь FIFO,
+    задания выдаются по кругу — по одному от каждого клиента, у которого они есть.
+    """
+
+    def __init__(self):
+        self._clients = OrderedDict()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def push(self, job):
+        self._clients.setdefault(job.client, deque()).append(job)
+        self._size += 1
+
+    def pop(self) -> RenderJob:
+        client, jobs = next(iter(self._clients.items()))
+        job = jobs.popleft()
+        if jobs:
+            self._clients.move_to_end(client)
+        else:
+            del self._clients[client]
+        self._size -= 1
+        return job
+
+    def count(self, client) -> int:
+        """Кол-во ожидающих заданий клиента."""
+        jobs = self._clients.get(client)
+        return len(jobs) if jobs else 0
+
+    def position(self, client) -> int:
+        """Сколько заданий класса будет выдано раньше нового задания клиента (при выдаче по кругу)."""
+        own = self.count(client)
+        return sum(min(len(jobs), own + 1) for key, jobs in self._clients.items() if key != client) + own
+
+    def clients(self) -> int:
+        return len(self._clients)
+
+
+class _WorkerSlot:
+    """Состояние одного процесса-воркера в родительском процессе."""
+
+    def __init__(self, worker_id, process, conn):
+        self.worker_id = worker_id
+        self.process = process
+        self.conn = conn
+        self.ready = False
+        self.job = None
+        self.stage = None
+        self.deadline = None  # time.monotonic(), к которому должен завершиться текущий этап
+        # Процесс завершился до готовности: time.monotonic() повторного запуска (inf — запусков больше нет)
+        self.respawn_at = None
+
+
+class RenderPool:
+    """
+    Пул процессов рендеринга с ограниченной очередью заданий.
+
+    У каждого воркера свой канал (Pipe): задание отдаётся конкретному свободному воркеру,
+    поэтому зависший или упавший воркер можно завершить, не затрагивая остальные.
+    Отдельный поток родительского процесса принимает сообщения воркеров, следит
+    за лимитами времени этапов (RENDER_STAGE_TIMEOUTS) и завершением процессов:
+    - этап не уложился в лимит — воркер принудительно завершается, задание получает
+      результат {"status": "timeout", "stage": ..., "message": ...};
+    - процесс завершился аварийно (например, segfault в cairo) — задание получает
+      {"status": "error", "stage": ..., "message": ...}.
+    В обоих случаях на место воркера сразу запускается новый. Воркер, завершившийся до готовности
+    (ошибка импорта или прогрева), перезапускается с паузой, растущей вдвое с каждой неудачей подряд;
+    после start_max_failures неудач подряд пул неисправен: ожидающие задания получают ошибку,
+    submit и start выбрасывают RenderPoolError.
+
+    Ошибка при обработке сообщений воркера не останавливает поток приёма результатов:
+    она записывается в журнал, задание этого воркера завершается с ошибкой, воркер заменяется.
+
+    Ожидающие задания хранятся по классам приоритета (_FairQueue на класс). Свободный воркер
+    получает задание высшего класса, у которого не исчерпан лимит одновременно занятых
+    воркеров (class_limits), внутри класса — следующего по кругу клиента.
+    """
+
+    def __init__(self, size=RENDER_WORKERS, warmup=RENDER_WARMUP, max_queue=RENDER_QUEUE_SIZE,
+                 stage_timeouts=None, bulk_max_workers=RENDER_BULK_MAX_WORKERS,
+                 client_max_queued=RENDER_CLIENT_MAX_QUEUED, queue_slo=None,
+                 respawn_delay=RENDER_RESPAWN_DELAY, respawn_max_delay=RENDER_RESPAWN_MAX_DELAY,
+                 start_max_failures=RENDER_START_MAX_FAILURES, start_timeout=RENDER_START_TIMEOUT):
+        self.size = max(1, int(size))
+        self.warmup = warmup
+        self.respawn_delay = respawn_delay
+        self.respawn_max_delay = respawn_max_delay
+        self.start_max_failures = max(1, int(start_max_failures))
+        self.start_timeout = start_timeout
+        self.max_queue = max(0, int(max_queue))
+        self.stage_timeouts = dict(RENDER_STAGE_TIMEOUTS if stage_timeouts is None else stage_timeouts)
+        self.class_limits = {
+            "interactive": self.size,
+            "bulk": min(self.size, int(bulk_max_workers) or max(1, self.size - 1)),
+        }
+        self.client_max_queued = int(client_max_queued) or max(1, self.max_queue // 4)
+        self.queue_slo = dict(RENDER_QUEUE_SLO if queue_slo is None else queue_slo)
+        self._workers = []
+        self._pending = {priority: _FairQueue() for priority in PRIORITY_CLASSES}
+        self._running = {}
+        self._running_by_class = dict.fromkeys(PRIORITY_CLASSES, 0)
+        self._idle = deque()
+        self._avg_duration = 1.0  # скользящее среднее времени рендеринга, сек
+        self._restarts = 0
+        self._start_failures = 0  # воркеры, завершившиеся до готовности, подряд
+        self._error = None  # причина неисправности пула
+        self._lock = threading.Lock()
+        self._ready_cond = threading.Condition(self._lock)
+        self._wakeup_reader, self._wakeup_writer = multiprocessing.Pipe(duplex=False)
+        self._listener = None
+        self._started = False
+
+    def _spawn_worker_locked(self, worker_id, warmup) -> _WorkerSlot:
+        """Запускает процесс-воркер в слоте worker_id. Вызывается под self._lock (или до старта потока)."""
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(
+            target=_render_worker,
+            args=(worker_id, child_conn, warmup),
+            name=f"render-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        slot = _WorkerSlot(worker_id, process, parent_conn)
+        self._workers[worker_id] = slot
+        return slot
+
+    def start(self, wait_ready=True):
+        """
+        Запускает воркеры и поток приёма результатов. При wait_ready ждёт окончания прогрева
+        (не дольше start_timeout); если воркеры не запустились, останавливает пул и выбрасывает RenderPoolError.
+        """
+        if self._started:
+            return
+        self._started = True
+
+        self._workers = [None] * self.size
+        for worker_id in range(self.size):
+            self._spawn_worker_locked(worker_id, self.warmup)
+
+        self._listener = threading.Thread(target=self._listen, name="render-pool-listener", daemon=True)
+        self._listener.start()
+        with self._lock:
+            self._publish_gauges_locked()
+
+        if wait_ready:
+            # Ждём сигнал готовности от каждого воркера (после импорта и прогрева)
+            with self._ready_cond:
+                ready = self._ready_cond.wait_for(
+                    lambda: self._error is not None or all(slot.ready for slot in self._workers),
+                    self.start_timeout)
+                error = self._error or (None if ready else
+                                        f"Воркеры рендеринга не готовы за {self.start_timeout:g} с")
+            if error is not None:
+                self.shutdown()
+                raise RenderPoolError(error)
+
+        logger.info(f"Пул рендеринга запущен: воркеров {self.size}, очередь {self.max_queue}, "
+                    f"прогрев {'вкл' if self.warmup else 'выкл'}")
+
+    def _listen(self):
+        """
+        Принимает сообщения от воркеров, отслеживает лимиты времени этапов
+        и аварийное завершение процессов.
+        """
+        while self._started:
+            finished = []
+            try:
+                self._poll(finished)
+            except Exception:  # noqa: BLE001
+                logger.exception("Пул рендеринга: ошибка в потоке приёма результатов")
+                # Не крутим цикл вхолостую, если ошибка повторяется
+                time.sleep(0.1)
+            for job, result in finished:
+                if not job.future.done():
+                    job.future.set_result(result)
+
+    def _poll(self, finished):
+        """Одна итерация потока приёма: ждёт событий воркеров и добавляет завершённые задания в finished."""
+        with self._lock:
+            self._respawn_due_locked()
+            slots = [slot for slot in self._workers if slot.respawn_at is None]
+            timeout = self._next_deadline_locked()
+
+        sentinels = {slot.process.sentinel: slot for slot in slots}
+        connections = {slot.conn: slot for slot in slots}
+        ready = multiprocessing.connection.wait(
+            [self._wakeup_reader, *connections, *sentinels], timeout
+        )
+
+        if self._wakeup_reader in ready:
+            self._wakeup_reader.recv()
+
+        for obj in ready:
+            if obj in connections:
+                slot = connections[obj]
+                try:
+                    self._drain(slot, finished)
+                except Exception as e:  # noqa: BLE001
+                    logger.exception(f"Воркер {slot.worker_id}: ошибка обработки сообщения")
+                    finished.extend(self._fail_worker(slot, f"Ошибка обработки результата воркера: {e}"))
+        for obj in ready:
+            if obj in sentinels:
+                finished.extend(self._on_worker_exit(sentinels[obj]))
+        finished.extend(self._check_timeouts())
+
+    def _next_deadline_locked(self):
+        """Сколько секунд ждать до ближайшего истечения лимита этапа или перезапуска воркера (None — не ждать)."""
+        deadlines = [slot.deadline for slot in self._workers if slot.job is not None and slot.deadline]
+        deadlines += [slot.respawn_at for slot in self._workers
+                      if slot.respawn_at is not None and slot.respawn_at != math.inf]
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    def _stage_timeout(self, job, stage):
+        """Лимит времени этапа для задания, сек (0 — без ограничения)."""
+        limit = self.stage_timeouts.get(stage) or 0
+        if stage == "pdf" and job.task == "generate_multipage_pdf":
+            limit *= max(1, len(job.kwargs.get("values_list") or ()))
+        return limit
+
+    def _enter_stage_locked(self, slot, stage):
+        """Отмечает начало этапа задания воркера и выставляет срок его окончания."""
+        slot.stage = stage
+        limit = self._stage_timeout(slot.job, stage)
+        slot.deadline = time.monotonic() + limit if limit > 0 else None
+
+    def _drain(self, slot, finished):
+        """Обрабатывает все доступные сообщения воркера, завершённые задания [(job, result)] добавляет в finished."""
+        while True:
+            try:
+                if not slot.conn.poll():
+                    break
+                kind, key, payload = slot.conn.recv()
+            except (EOFError, OSError):
+                # Процесс завершился — обработается по его sentinel
+                break
+
+            updated = None
+            with self._lock:
+                if kind == "ready":
+                    slot.ready = True
+                    self._start_failures = 0
+                    self._idle.append(slot)
+                    self._ready_cond.notify_all()
+                    self._dispatch_locked()
+                    continue
+
+                job = slot.job
+                if job is None or job.id != key:
+                    continue
+
+                if kind == "start":
+                    job.status = "running"
+                    job.started_at = time.time()
+                    updated = job
+                elif kind == "stage":
+                    job.stage = payload
+                    self._enter_stage_locked(slot, payload)
+                    updated = job
+                elif kind == "done":
+                    self._finish_job_locked(slot, payload, "done" if payload.get("status") == "OK" else "error")
+                    self._idle.append(slot)
+                    self._dispatch_locked()
+                    finished.append((job, payload))
+            if updated is not None and updated.on_update is not None:
+                try:
+                    updated.on_update(updated)
+                except Exception:  # noqa: BLE001
+                    logger.exception(f"Задание {updated.id}: ошибка on_update")
+
+    def _finish_job_locked(self, slot, result, status):
+        """Переводит задание воркера в завершённое состояние. Вызывается под self._lock."""
+        job = slot.job
+        del self._running[job.id]
+        self._running_by_class[job.priority] -= 1
+        slot.job = None
+        slot.stage = None
+        slot.deadline = None
+        job.result = result
+        job.status = status
+        if status == "done":
+            job.stage = None
+        job.finished_at = time.time()
+        if status == "done" and job.started_at:
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * (job.finished_at - job.started_at)
+        self._record_metrics(job, result, status)
+        self._publish_gauges_locked()
+
+    @staticmethod
+    def _record_metrics(job, result, status):
+        """Заносит в метрики время шагов и задания, размер PDF и итог завершённого задания."""
+        RENDER_JOBS_TOTAL.inc(task=job.task, status=status)
+        for step, seconds in (result.get("timings") or {}).items():
+            RENDER_STEP_SECONDS.observe(seconds, step=step)
+        if job.dispatched_at:
+            busy_seconds = job.finished_at - job.dispatched_at
+            RENDER_JOB_SECONDS.observe(busy_seconds, task=job.task)
+            RENDER_WORKER_BUSY_SECONDS_TOTAL.inc(busy_seconds)
+        if result.get("pdf_size"):
+            PDF_SIZE_BYTES.observe(result["pdf_size"], task=job.task)
+
+    def _replace_worker_locked(self, slot, warmup, reason):
+        """Закрывает канал слота и запускает на его месте новый воркер. reason — "timeout", "crash" или "error"."""
+        slot.conn.close()
+        if slot in self._idle:
+            self._idle.remove(slot)
+        self._restarts += 1
+        RENDER_WORKER_RESTARTS_TOTAL.inc(reason=reason)
+        self._spawn_worker_locked(slot.worker_id, warmup)
+
+    def _fail_worker(self, slot, message) -> list:
+        """Ошибка обработки сообщений воркера: его задание завершается с ошибкой, воркер заменяется."""
+        finished = []
+        with self._lock:
+            if not self._started or self._workers[slot.worker_id] is not slot or slot.respawn_at is not None:
+                return finished
+            slot.process.kill()
+            slot.process.join(timeout=5)
+            job = slot.job
+            if job is not None:
+                result = {"status": "error", "stage": slot.stage or "calculations", "message": message}
+                job.stage = result["stage"]
+                self._finish_job_locked(slot, result, "error")
+                finished.append((job, result))
+            self._replace_worker_locked(slot, self.warmup and slot.ready, "error")
+        return finished
+
+    def _respawn_due_locked(self):
+        """Запускает воркеры, у которых истекла пауза перед повторным запуском."""
+        now = time.monotonic()
+        for slot in list(self._workers):
+            if slot.respawn_at is None or slot.respawn_at > now:
+                continue
+            self._restarts += 1
+            RENDER_WORKER_RESTARTS_TOTAL.inc(reason="crash")
+            try:
+                # Упавший при прогреве воркер перезапускаем без прогрева
+                self._spawn_worker_locked(slot.worker_id, False)
+            except OSError as e:
+                self._schedule_respawn_locked(slot, f"ошибка запуска процесса: {e}")
+
+    def _schedule_respawn_locked(self, slot, reason) -> list:
+        """
+        Воркер завершился до готовности: повторный запуск через respawn_delay · 2^(неудач подряд − 1) сек.
+        После start_max_failures неудач подряд пул объявляется неисправным. Возвращает завершённые задания.
+        """
+        if slot in self._idle:
+            self._idle.remove(slot)
+        self._start_failures += 1
+        if self._start_failures >= self.start_max_failures:
+            slot.respawn_at = math.inf
+            return self._fail_pool_locked(f"Воркеры рендеринга не запускаются: {self._start_failures} неудач "
+                                          f"подряд, последняя — {reason}")
+        delay = min(self.respawn_max_delay, self.respawn_delay * 2 ** (self._start_failures - 1))
+        slot.respawn_at = time.monotonic() + delay
+        logger.error(f"Воркер {slot.worker_id} не запустился ({reason}), повторный запуск через {delay:g} с")
+        return []
+
+    def _fail_pool_locked(self, message) -> list:
+        """Пул неисправен: ожидающие задания завершаются с ошибкой, новые не принимаются."""
+        logger.error(f"Пул рендеринга неисправен: {message}")
+        self._error = message
+        self._ready_cond.notify_all()
+        finished = []
+        for queue in self._pending.values():
+            while queue:
+                job = queue.pop()
+                job.result = {"status": "error", "message": message}
+                job.status = "error"
+                job.finished_at = time.time()
+                finished.append((job, job.result))
+        self._publish_gauges_locked()
+        return finished
+
+    def _on_worker_exit(self, slot) -> list:
+        """Процесс воркера завершился сам (падение): сообщает об ошибке заданию и заменяет воркер."""
+        finished = []
+        with self._lock:
+            if not self._started or self._workers[slot.worker_id] is not slot:
+                return finished
+            slot.process.join(timeout=1)
+            exitcode = slot.process.exitcode
+            job = slot.job
+            if job is not None:
+                stage = slot.stage or "calculations"
+                result = {
+                    "status": "error",
+                    "stage": stage,
+                    "message": f"Процесс рендеринга аварийно завершился (код {exitcode}) на этапе «{stage}»",
+                }
+                logger.error(f"Воркер {slot.worker_id}: {result['message']}, задание {job.id}")
+                job.stage = stage
+                self._finish_job_locked(slot, result, "error")
+                finished.append((job, result))
+            else:
+                logger.error(f"Воркер {slot.worker_id} аварийно завершился (код {exitcode})")
+            if slot.ready:
+                self._replace_worker_locked(slot, self.warmup, "crash")
+            else:
+                # До готовности (импорт, прогрев) — с паузой, чтобы не уйти в цикл перезапусков
+                slot.conn.close()
+                finished.extend(self._schedule_respawn_locked(slot, f"код {exitcode}"))
+        return finished
+
+    def _check_timeouts(self) -> list:
+        """Завершает воркеры, у которых истёк лимит времени текущего этапа."""
+        finished = []
+        now = time.monotonic()
+        with self._lock:
+            for slot in list(self._workers):
+                if slot.job is None or slot.deadline is None or now < slot.deadline:
+                    continue
+                job = slot.job
+                stage = slot.stage or "calculations"
+                limit = self._stage_timeout(job, stage)
+                slot.process.kill()
+                slot.process.join(timeout=5)
+                result = {
+                    "status": "timeout",
+                    "stage": stage,
+                    "message": f"Превышено время этапа «{stage}» ({limit:g} с), процесс рендеринга перезапущен",
+                }
+                logger.error(f"Воркер {slot.worker_id}: {result['message']}, задание {job.id}")
+                job.stage = stage
+                self._finish_job_locked(slot, result, "timeout")
+                finished.append((job, result))
+                self._replace_worker_locked(slot, self.warmup, "timeout")
+        return finished
+
+    def _next_job_locked(self):
+        """Следующее задание для свободного воркера: высший класс, у которого не исчерпан лимит воркеров."""
+        for priority in PRIORITY_CLASSES:
+            queue = self._pending[priority]
+            if queue and self._running_by_class[priority] < self.class_limits[priority]:
+                return queue.pop()
+        return None
+
+    def _dispatch_locked(self):
+        """Передаёт ожидающие задания свободным воркерам. Вызывается под self._lock."""
+        while self._idle:
+            job = self._next_job_locked()
+            if job is None:
+                break
+            slot = self._idle.popleft()
+            slot.job = job
+            self._running[job.id] = job
+            self._running_by_class[job.priority] += 1
+            job.dispatched_at = time.time()
+            RENDER_QUEUE_WAIT_SECONDS.observe(job.dispatched_at - job.created_at, priority=job.priority)
+            # Время ожидания приёма задания воркером входит в первый этап
+            self._enter_stage_locked(slot, "calculations")
+            try:
+                slot.conn.send((job.id, job.task, job.kwargs, job.config_version))
+            except OSError:
+                # Воркер уже завершился: задание получит ошибку при обработке его sentinel
+                pass
+        self._publish_gauges_locked()
+
+    def _publish_gauges_locked(self):
+        """Записывает состояние очереди и воркеров в gauge процесса (app.metrics). Вызывается под self._lock."""
+        started = self._started
+        for priority in PRIORITY_CLASSES:
+            RENDER_QUEUE_DEPTH.set(len(self._pending[priority]) if started else 0, priority=priority)
+        RENDER_WORKERS_BUSY.set(len(self._running) if started else 0)
+        RENDER_POOL_SIZE.set(self.size if started else 0)
+
+    def _queued_locked(self) -> int:
+        return sum(len(queue) for queue in self._pending.values())
+
+    def retry_after(self) -> int:
+        """Оценка (сек), через сколько освободится место в очереди."""
+        waiting = self._queued_locked() + len(self._running)
+        return max(1, math.ceil(self._avg_duration * waiting / self.size))
+
+    def _expected_wait_locked(self, priority, client) -> float:
+        """
+        Прогноз ожидания нового задания клиента в очереди, сек: задания высших классов
+        и задания класса, выдаваемые по кругу раньше, делятся на доступные классу воркеры.
+        """
+        capacity = self.class_limits[priority]
+        if self._idle and self._running_by_class[priority] < capacity:
+            return 0.0
+        ahead = 0
+        for name in PRIORITY_CLASSES:
+            if name == priority:
+                ahead += self._pending[name].position(client)
+                break
+            ahead += len(self._pending[name])
+        # Плюс ожидание освобождения воркера, занятого сейчас
+        return self._avg_duration * (ahead / capacity + 0.5)
+
+    def _check_admission_locked(self, priority, client):
+        """Выбрасывает RenderQueueFull, если новое задание нельзя принять в очередь."""
+        if self._idle and self._running_by_class[priority] < self.class_limits[priority]:
+            return
+        reason = None
+        if self._queued_locked() >= self.max_queue:
+            reason = "queue_full"
+        elif self._pending[priority].count(client) >= self.client_max_queued:
+            reason = "client_limit"
+        else:
+            slo = self.queue_slo.get(priority) or 0
+            if slo > 0 and self._expected_wait_locked(priority, client) > slo:
+                reason = "slo"
+        if reason is not None:
+            RENDER_JOBS_REJECTED_TOTAL.inc(priority=priority, reason=reason)
+            raise RenderQueueFull(self.retry_after(), reason)
+
+    def submit(self, task="generate_pdf", priority="interactive", client=None, **kwargs) -> RenderJob:
+        """
+        Ставит задание в очередь. task — имя функции из RENDER_TASKS, аргументы — те же,
+        что у этой функции (кроме queue и on_stage). Возвращает RenderJob; его future завершится результатом вида
+        {"status": "OK", "path": ...} (при pdf_path=None — ещё и "pdf": bytes),
+        {"status": "error", "message": ...} или {"status": "timeout", "stage": ..., "message": ...}.
+
+        priority — класс приоритета из PRIORITY_CLASSES, client — ключ клиента (токен или IP),
+        между клиентами класса задания распределяются по очереди.
+
+        Выбрасывает RenderQueueFull, если очередь заполнена, у клиента слишком много ожидающих
+        заданий или прогноз ожидания больше целевого времени класса (RENDER_QUEUE_SLO),
+        и RenderPoolError, если пул неисправен.
+        """
+        if task not in RENDER_TASKS:
+            raise ValueError(f"Неизвестная задача рендеринга: {task}")
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Неизвестный класс приоритета: {priority}")
+        if not self._started:
+            self.start()
+        job = RenderJob(kwargs, task, priority, client)
+        with self._lock:
+            if self._error is not None:
+                raise RenderPoolError(self._error)
+            self._check_admission_locked(priority, client)
+            self._pending[priority].push(job)
+            self._dispatch_locked()
+        return job
+
+    def render(self, **kwargs) -> dict:
+        """Синхронная обёртка: ставит задание и ждёт результат."""
+        return self.submit(**kwargs).future.result()
+
+    def stats(self) -> dict:
+        """Текущее состояние пула (для health-check)."""
+        with self._lock:
+            return {
+                "workers": self.size,
+                "busy": len(self._running),
+                "queued": self._queued_locked(),
+                "queue_limit": self.max_queue,
+                "avg_render_seconds": round(self._avg_duration, 3),
+                "worker_restarts": self._restarts,
+                "error": self._error,
+                "classes": {
+                    priority: {
+                        "busy": self._running_by_class[priority],
+                        "queued": len(self._pending[priority]),
+                        "clients": self._pending[priority].clients(),
+                        "max_workers": self.class_limits[priority],
+                        "queue_slo_seconds": self.queue_slo.get(priority) or 0,
+                    }
+                    for priority in PRIORITY_CLASSES
+                },
+            }
+
+    def shutdown(self):
+        """Останавливает воркеры и поток приёма результатов."""
+        if not self._started:
+            return
+        with self._lock:
+            self._started = False
+            slots = list(self._workers)
+            self._publish_gauges_locked()
+        self._wakeup_writer.send(None)
+        for slot in slots:
+            try:
+                slot.conn.send(None)
+            except OSError:
+                pass
+        for slot in slots:
+            slot.process.join(timeout=5)
+            if slot.process.is_alive():
+                slot.process.terminate()
+            slot.conn.close()
+        self._listener.join(timeout=5)
+        self._workers.clear()
+        self._idle.clear()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_render_pool(**options) -> RenderPool:
+    """
+    Возвращает общий для процесса пул рендеринга, при первом вызове запускает его.
+    options (size, warmup, max_queue, ...) передаются в RenderPool только при первом вызове —
+    например, процесс-обработчик gunicorn запускает пул со своей долей RENDER_WORKERS.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            pool = RenderPool(**options)
+            # Если воркеры не запустились, start выбрасывает RenderPoolError — следующий вызов попробует снова
+            pool.start()
+            atexit.register(pool.shutdown)
+            _pool = pool
+        return _pool
+
+
+def shutdown_render_pool():
+    """Останавливает пул рендеринга процесса, если он был запущен."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
@@ -0,0 +1,226 @@
+# app/runtime_config.py
+
+"""
+Перезагрузка настроек без перезапуска сервера.
+
+Что перечитывается:
+- .env: ALLOWED_IPS и SECRET_TOKEN (RELOADABLE_ENV) — белый список IP и реестр токенов
+  собираются заново и подменяют прежние целиком. Значения, заданные в окружении процесса
+  в обход .env, как и при запуске, главнее файла;
+- TOKENS_FILE — реестр токенов;
+- настройки чертежа (CONFIG_MODULES: configs/config.py, configs/config_title_block.py) —
+  модули выполняются заново (importlib.reload), и имена, импортированные из них в модулях
+  проекта (`from configs.config import material_density`), указывают на новые значения.
+
+Когда:
+- по сигналу SIGHUP (режимы dev и asgi, обработчик ставит run.py);
+- при изменении файлов: перед обработкой запроса не чаще раза в CONFIG_RELOAD_SECONDS
+  сравнивается время их изменения;
+- в режиме production SIGHUP получает мастер gunicorn и перезапускает процессы-обработчики,
+  а те при старте (post_fork) перечитывают файлы, изменившиеся после предзагрузки приложения.
+
+Версия настроек (version) — хеш файлов CONFIG_MODULES. Она входит в ключ кэша PDF (и в ETag),
+поэтому PDF, построенные со старыми настройками, не отдаются. Задание рендеринга несёт версию,
+с которой его поставили в очередь: воркер с другой версией перезагружает модули настроек
+перед заданием — между заданиями, без перезапуска процессов и повторного прогрева.
+"""
+
+import hashlib
+import importlib
+import os
+import signal
+import sys
+import threading
+import time
+
+from dotenv import dotenv_values
+
+from app.ip_allowlist import ip_allowlist
+from app.metrics import CONFIG_RELOADS_TOTAL
+from app.tokens import token_registry
+from configs.config_log import logger
+from configs.config_server import CONFIG_RELOAD_SECONDS
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+ENV_FILE = os.path.join(BASE_DIR, ".env")
+
+# Переменные .env, которые применяются без перезапуска
+RELOADABLE_ENV = ("ALLOWED_IPS", "SECRET_TOKEN")
+
+# Модули настроек чертежа в порядке перезагрузки (config_title_block строится из config)
+CONFIG_MODULES = ("configs.config", "configs.config_title_block")
+
+
+def _module_path(name) -> str:
+    return os.path.join(BASE_DIR, *name.split(".")) + ".py"
+
+
+def config_version() -> str:
+    """Хеш файлов CONFIG_MODULES (16 hex-символов)."""
+    digest = hashlib.sha256()
+    for name in CONFIG_MODULES:
+        with open(_module_path(name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _project_modules() -> list:
+    """Загруженные модули из каталога проекта (библиотеки не затрагиваются)."""
+    prefix = BASE_DIR + os.sep
+    return [
+        module for module in list(sys.modules.values())
+        if os.path.abspath(getattr(module, "__file__", None) or "").startswith(prefix)
+    ]
+
+
+def reload_config_modules() -> str:
+    """
+    Выполняет модули CONFIG_MODULES заново и перепривязывает импортированные из них имена
+    в модулях проекта (имя указывает на тот же объект, что был в модуле настроек). Возвращает версию.
+    """
+    for name in CONFIG_MODULES:
+        module = sys.modules.get(name)
+        if module is None:
+            continue
+        old = {key: value for key, value in vars(module).items() if not key.startswith("__")}
+        try:
+            importlib.reload(module)
+        except Exception:
+            # Ошибка в файле настроек: прежние значения остаются в силе
+            vars(module).update(old)
+            raise
+        new = vars(module)
+        for other in _project_modules():
+            if other is module:
+                continue
+            namespace = vars(other)
+            for key, value in old.items():
+                if key in new and namespace.get(key) is value:
+                    namespace[key] = new[key]
+    return config_version()
+
+
+class RuntimeConfig:
+    """Отслеживание файлов настроек, их перезагрузка и текущая версия."""
+
+    def __init__(self, reload_seconds=CONFIG_RELOAD_SECONDS):
+        self.reload_seconds = reload_seconds
+        self.version = config_version()
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        self._mtimes = self._file_mtimes()
+        self._env = self._read_env()
+        # Переменные, заданные в окружении процесса, а не в .env: их .env не переопределяет
+        self._external = {
+            key for key in RELOADABLE_ENV
+            if key in os.environ and os.environ[key] != self._env.get(key)
+        }
+
+    def _watched_files(self) -> list[str]:
+        return [ENV_FILE, token_registry.path, *(_module_path(name) for name in CONFIG_MODULES)]
+
+    def _file_mtimes(self) -> dict:
+        mtimes = {}
+        for path in self._watched_files():
+            try:
+                mtimes[path] = os.stat(path).st_mtime if path else None
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+
+    @staticmethod
+    def _read_env() -> dict:
+        values = dotenv_values(ENV_FILE) if os.path.exists(ENV_FILE) else {}
+        return {key: values[key] for key in RELOADABLE_ENV if values.get(key) is not None}
+
+    def _apply_env_locked(self):
+        """Переносит изменившиеся значения RELOADABLE_ENV из .env в os.environ."""
+        values = self._read_env()
+        for key in RELOADABLE_ENV:
+            if key in self._external or values.get(key) == self._env.get(key):
+                continue
+            if key in values:
+                os.environ[key] = values[key]
+            else:
+                os.environ.pop(key, None)  # переменную убрали из .env
+        self._env = values
+
+    def reload(self, reason="") -> bool:
+        """
+        Перечитывает .env, реестр токенов, белый список IP и модули настроек чертежа.
+        Возвращает True, если изменилась версия настроек чертежа.
+
+        Ошибка в любом из файлов не прерывает запрос: прежний реестр, список или настройки
+        остаются в силе, а время изменения файлов не запоминается — check() попробует снова
+        и после исправления файла перечитает его.
+        """
+        with self._lock:
+            # Время изменения — до чтения: правка во время перезагрузки будет замечена следующей проверкой
+            mtimes = self._file_mtimes()
+            previous = self.version
+            try:
+                self._apply_env_locked()
+                loaded = token_registry.load(token_registry.path, os.getenv("SECRET_TOKEN", ""))
+                loaded = ip_allowlist.reload(os.getenv("ALLOWED_IPS", "")) and loaded
+                self.version = reload_config_modules()
+            except Exception as e:  # noqa: BLE001
+                CONFIG_RELOADS_TOTAL.inc(result="error")
+                logger.error(f"Не удалось перезагрузить настройки ({reason}): {e}")
+                return False
+            if not loaded:
+                CONFIG_RELOADS_TOTAL.inc(result="error")
+                logger.error(f"Реестр токенов или белый список IP не перечитаны ({reason}), действуют прежние")
+                return self.version != previous
+            self._mtimes = mtimes
+            self.reloads += 1
+        CONFIG_RELOADS_TOTAL.inc(result="ok")
+        logger.info(f"Настройки перечитаны{f' ({reason})' if reason else ''}, версия {self.version}"
+                    f"{'' if self.version == previous else f' (была {previous})'}")
+        return self.version != previous
+
+    def check(self, force=False):
+        """Перечитывает настройки, если файлы изменились (проверка не чаще раза в reload_seconds)."""
+        if not force:
+            if self.reload_seconds < 0:
+                return
+            now = time.monotonic()
+            if now - self._checked_at < self.reload_seconds:
+                return
+            self._checked_at = now
+        if self._file_mtimes() != self._mtimes:
+            self.reload("файлы изменены")
+
+    def sync(self, version):
+        """
+        Для воркера рендеринга: перезагружает модули настроек, если задание поставлено
+        в очередь с другой версией. Вызывается между заданиями.
+        """
+        if version is None or version == self.version:
+            return
+        with self._lock:
+            try:
+                self.version = reload_config_modules()
+            except Exception as e:  # noqa: BLE001
+                logger.error(f"Воркер рендеринга: не удалось перезагрузить настройки чертежа: {e}")
+                return
+        if self.version != version:
+            logger.warning(f"Воркер рендеринга: версия настроек {self.version}, задание поставлено с {version}")
+
+    def install_signal_handler(self) -> bool:
+        """
+        SIGHUP -> перезагрузка в отдельном потоке (в обработчике сигнала не берутся блокировки).
+        Вызывать из главного потока; на Windows SIGHUP нет — возвращает False.
+        """
+        if not hasattr(signal, "SIGHUP"):
+            return False
+
+        def handle(signum, frame):
+            threading.Thread(target=self.reload, args=("SIGHUP",), name="config-reload", daemon=True).start()
+
+        signal.signal(signal.SIGHUP, handle)
+        return True
+
+
+runtime_config = RuntimeConfig()
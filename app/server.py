@@ -8,15 +8,35 @@ Flask-сервер для генерации PDF-чертежей по данн
 - Выполняет проверку авторизации по токену (через заголовок Authorization).
 - Обрабатывает чекбоксы: если передано "on" — преобразует в True, иначе False.
 - Создаёт уникальное имя PDF-файла с учётом текущей даты и времени.
-- Сохраняет файлы в папке static/downloads/YYYY-MM-DD/.
-- Вызывает функцию `generate_pdf_safe`, которая запускает генерацию PDF в отдельном процессе
-  (изолировано от основного потока Flask, надёжнее при использовании CairoSVG).
+- Сохраняет файлы в папке static/downloads/YYYY-MM-DD/. В режиме RENDER_IN_MEMORY PDF возвращается
+  из воркера байтами и сразу отдаётся клиенту, а архивная копия пишется фоновым потоком
+  (или не пишется вовсе при PDF_ARCHIVE=0).
+- Передаёт задание в пул долгоживущих процессов рендеринга (изолировано от основного
+  потока Flask, надёжнее при использовании CairoSVG). Логика /generate написана генератором
+  (generate_pdf_flow), чтобы её же выполнял ASGI-режим (app.asgi) без потока на ожидающий запрос.
 - По завершении отдаёт PDF-файл пользователю с заголовками Content-Disposition.
-- При ошибке возвращает JSON-ответ с описанием исключения.
+- Готовые PDF кэшируются по хешу параметров чертежа (app.pdf_cache): повторный запрос
+  с теми же параметрами отдаётся из кэша без рендеринга (заголовок X-Cache: HIT).
+- Пакетная генерация: POST /generate/batch принимает JSON-массив или CSV с наборами параметров
+  и отдаёт потоковый ZIP с PDF по мере их готовности и manifest.json со статусом каждого элемента.
+- Многостраничный PDF: POST /generate/multipage (те же входные данные, что у пакета) —
+  все чертежи заказа одним документом на одной cairo-поверхности.
+- Асинхронный API заданий: POST /jobs возвращает id задания сразу, GET /jobs/<id> — статус и этап,
+  GET /jobs/<id>/pdf — готовый файл. При переполненной очереди — 429 с Retry-After. Состояние и PDF
+  заданий хранятся на диске (app.jobs), поэтому их отдаёт любой процесс-обработчик gunicorn.
+- Каждый вызов /generate записывается JSON-строкой в журнал запросов (app.capture,
+  logs/requests.jsonl) — для воспроизведения нагрузки и аналитики.
+- Метрики в формате Prometheus: GET /metrics (время шагов генерации, задания и запросы
+  по статусу, глубина очереди, загрузка воркеров, размеры PDF) — сумма по всем процессам-обработчикам.
+- При ошибке возвращает JSON-ответ с описанием исключения; если этап рендеринга
+  (calculations/svg/pdf) не уложился в лимит времени — 504 с именем этапа.
 
 Особенности:
-- Используется `multiprocessing` для предотвращения проблем с CairoSVG в однопоточном сервере.
-- Переменные окружения загружаются через `dotenv`, включая SECRET_TOKEN.
+- Используется пул процессов (`app.render_pool`) для предотвращения проблем с CairoSVG в однопоточном сервере.
+  Воркеры один раз импортируют зависимости и прогреваются при старте, размер пула задаётся RENDER_WORKERS.
+- Переменные окружения загружаются через `dotenv`, включая SECRET_TOKEN. ALLOWED_IPS, SECRET_TOKEN,
+  реестр токенов и настройки чертежа (configs/config.py) перечитываются без перезапуска
+  по SIGHUP или при изменении файлов (app.runtime_config).
 - Структура гибкая: путь сохранения и имя файла формируются динамически.
 - Поддержка CORS включена (`flask_cors.CORS`) для работы с фронтендом, запущенным отдельно.
 - Уникальность файлов обеспечивается за счёт добавления временной метки.
@@ -30,16 +50,31 @@ Flask-сервер для генерации PDF-чертежей по данн
 - Не совместим напрямую с Drupal Form API — требует доработки, если интеграция планируется напрямую в CMS.
 """
 
-from flask import Flask, request, jsonify, send_file, render_template
+from flask import Flask, Response, g, request, jsonify, send_file, render_template, url_for, stream_with_context
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
+import io
 import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
 from datetime import datetime
-from multiprocessing import Process, Queue
-from generate_drawing import generate_pdf
-from configs.config import DEFAULT_FILENAME, checkbox_fields
+from app.render_pool import get_render_pool, RenderQueueFull
+from app.capture import request_capture
+from app.form_page import FormPage
+from app.ip_allowlist import ip_allowlist
+from app.rate_limit import rate_limiter
+from app.runtime_config import runtime_config
+from app.tokens import token_registry
+from app.metrics import registry as metrics_registry, HTTP_REQUESTS_TOTAL, HTTP_REQUEST_SECONDS
+from app.jobs import job_registry
+from app.pdf_cache import pdf_cache, values_hash, multipage_hash
+from app.background import run_in_background, archive_pdf
+from app.batch import BatchError, parse_batch_payload, stream_zip
+from configs.config_server import RENDER_IN_MEMORY, PDF_ARCHIVE, BATCH_MAX_ITEMS
+from configs.config import DEFAULT_FILENAME, RENDER_BACKENDS, checkbox_fields
 from configs.config_log import logger
 from dotenv import load_dotenv
-import ipaddress
 
 load_dotenv()
 
@@ -52,41 +87,20 @@ CORS(app)
 
 # Конфигурация
 
-SECRET_TOKEN = os.getenv("SECRET_TOKEN", "")
+# SECRET_TOKEN читается из окружения: после перезагрузки .env (app.runtime_config)
+# форма собирается заново с новым токеном, без перезапуска.
 
 
-# Белый список IP, которым разрешён доступ к сервису.
+# Белый список IP, которым разрешён доступ к сервису (app.ip_allowlist).
 # Формат переменной окружения ALLOWED_IPS:
-# "127.0.0.1,31.207.75.93,10.0.0.0/24"
-ALLOWED_IPS_RAW = os.getenv("ALLOWED_IPS", "").strip()
-ALLOW_ALL_IPS = False
-ALLOWED_NETWORKS = []
-
-if ALLOWED_IPS_RAW:
-    # Явный режим "всех пускаем"
-    if ALLOWED_IPS_RAW == "*":
-        logger.info("IP-фильтрация отключена: ALLOWED_IPS='*' — разрешены все IP.")
-    else:
-        for part in ALLOWED_IPS_RAW.split(","):
-            part = part.strip()
-            if not part:
-                continue
-            try:
-                # Если в записи есть "/", считаем это подсетью (CIDR),
-                # иначе интерпретируем как одиночный адрес /32
-                if "/" in part:
-                    net = ipaddress.ip_network(part, strict=False)
-                else:
-                    net = ipaddress.ip_network(part + "/32", strict=False)
-                ALLOWED_NETWORKS.append(net)
-            except ValueError:
-                logger.error(f"Некорректная запись в ALLOWED_IPS: {part}")
+# "127.0.0.1,31.207.75.93,10.0.0.0/24,2001:db8::/32"
+# Дополнительно — файл ALLOWED_IPS_FILE, перечитывается без перезапуска.
 
 
 def generate_pdf_safe(svg_path, pdf_path, values, disable_svg_debug, save_pdf, draw_debug_grid):
     """
-    Безопасно запускает процесс генерации PDF-файла в отдельном процессе с поддержкой
-    возврата результата через очередь.
+    Безопасно выполняет генерацию PDF-файла в одном из процессов пула рендеринга
+    и дожидается результата.
 
     Аргументы:
         svg_path (str): Путь к SVG-файлу, который нужно отрендерить.
@@ -102,18 +116,17 @@ def generate_pdf_safe(svg_path, pdf_path, values, disable_svg_debug, save_pdf, d
               или {"status": "error", "message": "..."}).
 
     Примечание:
-        Использует multiprocessing для изоляции и предотвращения ошибок,
-        связанных с рендерингом PDF через CairoSVG.
+        Рендеринг выполняется в долгоживущих процессах пула (app.render_pool) для изоляции
+        и предотвращения ошибок, связанных с рендерингом PDF через CairoSVG.
     """
-    queue = Queue()
-    process = Process(
-        target=generate_pdf,
-        args=(svg_path, pdf_path, values, disable_svg_debug, save_pdf, draw_debug_grid, queue),
+    return get_render_pool().render(
+        svg_path=svg_path,
+        pdf_path=pdf_path,
+        values=values,
+        disable_svg_debug=disable_svg_debug,
+        save_pdf=save_pdf,
+        draw_debug_grid=draw_debug_grid,
     )
-    process.start()
-    process.join()
-    # logger.debug(f"Процесс завершился с кодом: {process.exitcode}")
-    return queue.get()
 
 
 def get_client_ip() -> str:
@@ -133,103 +146,443 @@ def get_client_ip() -> str:
     return request.remote_addr or "0.0.0.0"
 
 
+def current_token():
+    """Токен запроса из реестра (app.tokens) по заголовку Authorization: Bearer <токен> или None."""
+    if "api_token" not in g:
+        auth_header = request.headers.get("Authorization", "")
+        scheme, _, value = auth_header.partition(" ")
+        g.api_token = token_registry.lookup(value.strip()) if scheme == "Bearer" else None
+    return g.api_token
+
+
+def render_client_key() -> str:
+    """
+    Ключ клиента для справедливой очереди рендеринга (app.render_pool): задания
+    разных клиентов одного класса приоритета выдаются воркерам по очереди.
+    Клиент — токен API; для общего токена формы (SECRET_TOKEN) — IP.
+    """
+    token = current_token()
+    if token is not None and not token.shared:
+        return f"token:{token.name}"
+    return f"ip:{get_client_ip()}"
+
+
 def is_ip_allowed(ip: str) -> bool:
     """
     Проверяет, разрешён ли IP.
 
     Логика:
-    - Если ALLOW_ALL_IPS=True  -> всегда True (проверка отключена явно через "*").
-    - Если ALLOWED_NETWORKS пуст -> считаем, что ограничений нет (поведение по умолчанию).
-    - Иначе проверяем, попадает ли IP в одну из подсетей.
+    - "*" в списке -> всегда True (проверка отключена явно).
+    - Если список пуст -> считаем, что ограничений нет (поведение по умолчанию).
+    - Иначе проверяем, попадает ли IP в одну из подсетей (двоичный поиск по интервалам,
+      последние решения кэшируются). Невалидный IP запрещён.
     """
-    if ALLOW_ALL_IPS:
-        return True
+    return ip_allowlist.is_allowed(ip)
 
-    if not ALLOWED_NETWORKS:
-        # Белый список не задан — пропускаем всех
-        return True
 
-    try:
-        addr = ipaddress.ip_address(ip)
-    except ValueError:
-        # Невалидный IP — считаем, что ему доступ запрещён
-        return False
+@app.errorhandler(Exception)
+def handle_exception(e):
+    """
+    Глобальный обработчик ошибок: логируем все неожиданные исключения.
+    HTTP-исключения (404, 405 и т.п.) отдаём как есть.
+    Зарегистрирован здесь, а не в run.py, чтобы работать при любом способе запуска
+    (run.py, ASGI, WSGI-сервер).
+    """
+    if isinstance(e, HTTPException):
+        return e
+
+    logger.exception("Unhandled exception:")
+    response = {
+        "error": str(e),
+        "type": type(e).__name__,
+    }
+    return jsonify(response), 500
+
 
-    for net in ALLOWED_NETWORKS:
-        if addr in net:
-            return True
+# Эндпоинты, к которым применяется фильтрация по IP
+PROTECTED_ENDPOINTS = ("index", "generate_pdf_route", "generate_batch_route", "generate_multipage_route", "create_job", "get_job", "get_job_pdf",
+                       "metrics")
 
-    return False
 
+@app.before_request
+def check_runtime_config():
+    """Перечитывает настройки, если изменились их файлы (проверка не чаще раза в CONFIG_RELOAD_SECONDS)."""
+    runtime_config.check()
 
 
 @app.before_request
 def limit_remote_addr():
     """
     Глобальный фильтр запросов: ограничение по IP.
-    Применяем только к "боевым" эндпоинтам: index и generate_pdf_route.
+    Применяем только к "боевым" эндпоинтам из PROTECTED_ENDPOINTS (форма, генерация, задания).
     Остальное (static, health-check и т.п.) не трогаем.
     """
     # request.endpoint = имя view-функции ("index", "generate_pdf_route", "static", ...)
-    if request.endpoint in ("index", "generate_pdf_route"):
+    if request.endpoint in PROTECTED_ENDPOINTS:
         client_ip = get_client_ip()
         if not is_ip_allowed(client_ip):
             logger.warning(f"Доступ запрещён для IP: {client_ip}")
             return jsonify({"error": "Forbidden: IP not allowed"}), 403
 
 
+# Эндпоинты, запускающие рендеринг: к ним применяются лимиты app.rate_limit
+RATE_LIMITED_ENDPOINTS = ("generate_pdf_route", "generate_batch_route", "generate_multipage_route", "create_job")
+
+
+@app.before_request
+def enforce_rate_limits():
+    """
+    Лимиты частоты запросов и процессорного времени рендеринга по токену и по IP клиента.
+    Запрос без действительного токена учитывается только по IP (ограничивает и перебор токенов).
+    """
+    if request.endpoint not in RATE_LIMITED_ENDPOINTS:
+        return None
+    g.rate_keys = rate_limiter.request_keys(current_token(), get_client_ip())
+    g.rate_decisions = rate_limiter.check(g.rate_keys)
+    denied = [decision for decision in g.rate_decisions if not decision.allowed]
+    if not denied:
+        return None
+    retry_after = max(decision.retry_after for decision in denied)
+    logger.warning(f"Превышен лимит запросов: {', '.join(decision.key for decision in denied)}")
+    response = jsonify({
+        "error": "Too Many Requests: rate limit exceeded",
+        "limit": denied[0].key.split(":", 1)[0],
+        "retry_after": retry_after,
+    })
+    response.status_code = 429
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+@app.after_request
+def add_rate_limit_headers(response):
+    """Заголовки X-RateLimit-*: по самому строгому из лимитов запроса (токен или IP)."""
+    decisions = g.get("rate_decisions")
+    if decisions:
+        decision = min(decisions, key=lambda item: item.remaining)
+        response.headers["X-RateLimit-Limit"] = str(int(decision.limits["burst"]))
+        response.headers["X-RateLimit-Remaining"] = str(decision.remaining)
+        response.headers["X-RateLimit-Reset"] = str(decision.reset)
+        cpu_remaining = min(item.cpu_remaining for item in decisions)
+        response.headers["X-RateLimit-CPU-Remaining"] = f"{max(0.0, cpu_remaining):.1f}"
+    return response
+
+
+def track_render_cost(job):
+    """
+    После завершения задания списывает с лимитов CPU токена и IP запроса процессорное время,
+    которое воркер потратил на задание (cpu_seconds в результате). Воркер, остановленный по таймауту
+    или упавший, его не сообщает — тогда списывается время занятости воркера заданием.
+    """
+    keys = g.get("rate_keys")
+    if not keys:
+        return
+
+    def charge(future):
+        cpu_seconds = future.result().get("cpu_seconds")
+        if cpu_seconds is None and job.dispatched_at and job.finished_at:
+            cpu_seconds = job.finished_at - job.dispatched_at
+        if cpu_seconds is not None:
+            rate_limiter.charge(keys, cpu_seconds)
+
+    job.future.add_done_callback(charge)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Считает запросы по эндпоинту и коду ответа, замеряет время обработки."""
+    endpoint = request.endpoint or "unmatched"
+    HTTP_REQUESTS_TOTAL.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    started = g.get("request_started")
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+    return response
+
+
+@app.after_request
+def capture_generate_request(response):
+    """
+    Записывает вызов /generate в журнал запросов (app.capture): входные данные,
+    клиент, статус, кэш, время шагов генерации и размер PDF. Запись — в фоновом потоке.
+    """
+    if request.endpoint != "generate_pdf_route":
+        return response
+    started = g.get("request_started")
+    request_capture.record(
+        endpoint=request.path,
+        client_ip=get_client_ip(),
+        token=current_token().name if current_token() is not None else None,
+        user_agent=request.user_agent.string,
+        status=response.status_code,
+        duration_ms=round((time.perf_counter() - started) * 1000, 1) if started is not None else None,
+        **g.get("capture", {}),
+    )
+    return response
+
+
+def is_authorized() -> bool:
+    """Проверка токена из заголовка Authorization: Bearer <токен> по реестру токенов (app.tokens)."""
+    return current_token() is not None
+
+
+class FormError(ValueError):
+    """Некорректное значение поля формы (ответ 400)."""
+
+
+def parse_form_values(form) -> tuple[dict, str]:
+    """
+    Приводит данные формы к виду, который ожидает generate_pdf.
+
+    Возвращает (values, filename):
+    - checkbox-поля: "on" -> True, иначе (или если поле не передано) -> False;
+    - filename — имя файла без расширения (или DEFAULT_FILENAME).
+    Выбрасывает FormError при недопустимом render_backend — до постановки задания в очередь
+    и до вычисления ключа кэша PDF.
+    """
+    form_data = form.to_dict()
+    filename = form_data.get("filename") or DEFAULT_FILENAME
+
+    # Пустой render_backend — способ вывода по умолчанию (RENDER_BACKEND), в ключ кэша не входит
+    if not form_data.get("render_backend"):
+        form_data.pop("render_backend", None)
+    elif form_data["render_backend"] not in RENDER_BACKENDS:
+        raise FormError(f"Неизвестный render_backend: {form_data['render_backend']!r} "
+                        f"(допустимо: {', '.join(RENDER_BACKENDS)})")
+
+    # Обработка checkbox-полей
+    for field in checkbox_fields:
+        if field in form_data:
+            # Если в форме значение 'on', меняем на True
+            form_data[field] = form_data[field] == "on"
+        else:
+            # Если чекбокс не передан — устанавливаем False
+            form_data[field] = False
+
+    return form_data, filename
+
+
+def build_pdf_path(filename, create_dir=True) -> str:
+    """
+    Уникальный путь для сохранения PDF: static/downloads/YYYY-MM-DD/<filename>_<время>.pdf
+    create_dir=False — каталог не создаётся (его создаст фоновая запись архива).
+    """
+    today = datetime.now().strftime("%Y-%m-%d")
+    save_dir = os.path.join(BASE_DIR, "static", "downloads", today)
+    if create_dir:
+        os.makedirs(save_dir, exist_ok=True)
+
+    # Уникальное имя файла
+    current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    return os.path.join(save_dir, f"{filename}_{current_time}.pdf")
+
+
+# Ответы с PDF можно хранить, но перед использованием нужно перепроверить по ETag
+PDF_CACHE_CONTROL = "private, no-cache"
+
+
+def send_pdf(pdf, filename, cache_status, etag=None, last_modified=None):
+    """
+    Отдаёт PDF (путь к файлу или байты) как вложение с заголовком X-Cache.
+    etag — ключ кэша PDF (сильный ETag). Для GET werkzeug сам отвечает 304 на
+    If-None-Match / If-Modified-Since и 206 на Range.
+    """
+    response = send_file(
+        io.BytesIO(pdf) if isinstance(pdf, bytes) else pdf,
+        as_attachment=True,
+        download_name=f"{filename}.pdf",
+        mimetype="application/pdf",
+        etag=etag if etag is not None else True,
+        last_modified=last_modified,
+        conditional=True,
+    )
+    response.headers["X-Cache"] = cache_status
+    response.headers["Cache-Control"] = PDF_CACHE_CONTROL
+    return response
+
+
+def not_modified_response(etag):
+    """
+    Ответ 304, если у клиента уже есть PDF с этим ETag (If-None-Match), иначе None.
+    Проверяется до постановки задания в очередь — повторная загрузка не стоит рендеринга.
+    Для POST werkzeug заголовки условного запроса не обрабатывает, поэтому проверка здесь.
+    """
+    if not request.if_none_match.contains(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = PDF_CACHE_CONTROL
+    return response
+
+
+def finish_render(cache_key, result, filename):
+    """
+    Обработка успешного рендера вне пути ответа: запись в кэш и (в режиме в памяти) в архив.
+    Все операции с диском выполняются фоновым потоком.
+    """
+    if result.get("status") != "OK":
+        return
+    pdf_bytes = result.get("pdf")
+    if pdf_bytes is None:
+        if result.get("path"):
+            run_in_background(pdf_cache.put_file, cache_key, result["path"])
+        return
+    if PDF_ARCHIVE:
+        run_in_background(archive_pdf, build_pdf_path(filename, create_dir=False), pdf_bytes)
+    run_in_background(pdf_cache.put, cache_key, pdf_bytes)
+
+
+def render_pdf_path(filename):
+    """Путь для PDF при рендере: None в режиме в памяти (PDF вернётся байтами), иначе файл в архиве."""
+    return None if RENDER_IN_MEMORY else build_pdf_path(filename)
+
+
+def render_error_response(result, what="PDF"):
+    """
+    JSON-ответ для неуспешного результата рендера: 504 с этапом, если этап
+    не уложился в лимит времени, иначе 500.
+    """
+    logger.error(f"Ошибка при генерации {what}: {result.get('message')}")
+    status_code = 504 if result.get("status") == "timeout" else 500
+    return jsonify({"error": result.get("message"), "stage": result.get("stage")}), status_code
+
+
+def job_accepted_response(job):
+    """Ответ 202 на создание задания: состояние задания и ссылки на статус/результат."""
+    response = jsonify({
+        **job.to_dict(),
+        "status_url": url_for("get_job", job_id=job.id),
+        "pdf_url": url_for("get_job_pdf", job_id=job.id),
+    })
+    response.status_code = 202
+    response.headers["Location"] = url_for("get_job", job_id=job.id)
+    return response
+
+
+QUEUE_REJECT_MESSAGES = {
+    "queue_full": "Too Many Requests: render queue is full",
+    "client_limit": "Too Many Requests: too many queued renders for this client",
+    "slo": "Too Many Requests: expected render queue wait is too long",
+}
+
+
+def queue_full_response(e: RenderQueueFull):
+    """Ответ 429 с заголовком Retry-After, если задание не принято в очередь рендеринга."""
+    response = jsonify({
+        "error": QUEUE_REJECT_MESSAGES.get(e.reason, QUEUE_REJECT_MESSAGES["queue_full"]),
+        "reason": e.reason,
+        "retry_after": e.retry_after,
+    })
+    response.status_code = 429
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response
+
+
+# HTML-форма собирается один раз (и после перезагрузки настроек), хранится сжатой (app.form_page)
+form_page = FormPage(lambda api_token: render_template("form.html", api_token=api_token))
+
 
 @app.route("/", methods=["GET"])
 def index():
-    """Отдаёт HTML-форму для ввода данных."""
-    # Для отладки, чтобы точно видеть, что этот код выполняется
-    print(">>> index() called, rendering form.html")
-    return render_template("form.html", api_token=SECRET_TOKEN)
+    """Отдаёт HTML-форму для ввода данных: готовый вариант по Accept-Encoding, 304 по If-None-Match."""
+    variant = form_page.select(request.accept_encodings)
+    if request.if_none_match.contains(variant.etag):
+        response = Response(status=304)
+    else:
+        response = Response(variant.body, mimetype="text/html")
+        if variant.encoding:
+            response.headers["Content-Encoding"] = variant.encoding
+    response.set_etag(variant.etag)
+    response.headers["Cache-Control"] = form_page.cache_control
+    response.vary.add("Accept-Encoding")
+    return response
 
 
-@app.route("/generate", methods=["POST"])
-def generate_pdf_route():
-    """Маршрут, принимающий данные формы и возвращающий PDF-файл."""
+# Сборка формы при запуске (в режиме production — в главном процессе, до fork)
+with app.app_context():
+    form_page.variants()
+
+
+def run_flow(flow):
+    """
+    Выполняет обработчик-генератор синхронно: каждый отданный им Future
+    ожидается в текущем потоке, результат передаётся обратно в генератор.
+    Возвращает ответ, которым завершился генератор.
+    """
+    try:
+        future = next(flow)
+        while True:
+            future = flow.send(future.result())
+    except StopIteration as stop:
+        return stop.value
+
+
+def generate_pdf_flow():
+    """
+    Логика /generate в виде генератора: отдаёт наружу Future задания рендеринга
+    и получает обратно его результат (dict, как у RenderPool.submit).
+
+    Один и тот же код обслуживает синхронный маршрут Flask (run_flow ждёт Future в потоке
+    запроса) и ASGI-режим (app.asgi ждёт Future в цикле событий, без потока на запрос).
+    Выполняется в контексте запроса Flask, возвращает ответ.
+    """
     try:
         # Проверка токена
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or auth_header != f"Bearer {SECRET_TOKEN}":
+        if not is_authorized():
             return jsonify({"error": "Unauthorized"}), 401
 
         # Получаем все поля из формы
-        form_data = request.form.to_dict()
-        filename = form_data.get("filename") or DEFAULT_FILENAME
-
-        # Обработка checkbox-полей
-        for field in checkbox_fields:
-            if field in form_data:
-                # Если в форме значение 'on', меняем на True
-                form_data[field] = form_data[field] == "on"
-            else:
-                # Если чекбокс не передан — устанавливаем False
-                form_data[field] = False
+        try:
+            form_data, filename = parse_form_values(request.form)
+        except FormError as e:
+            return jsonify({"error": str(e)}), 400
 
         # logger.debug(form_data)
 
-        today = datetime.now().strftime("%Y-%m-%d")
-        save_dir = os.path.join(BASE_DIR, "static", "downloads", today)
-        os.makedirs(save_dir, exist_ok=True)
-
-        # Уникальное имя файла
-        current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        pdf_path = os.path.join(save_dir, f"{filename}_{current_time}.pdf")
-
+        # Повторный запрос с теми же параметрами отдаём из кэша без рендеринга
+        cache_key = values_hash(form_data)
+        g.capture = {"values": form_data, "filename": filename, "cache_key": cache_key}
+        not_modified = not_modified_response(cache_key)
+        if not_modified is not None:
+            g.capture.update(cache="NOT_MODIFIED")
+            return not_modified
+        cached_pdf = pdf_cache.get(cache_key)
+        if cached_pdf is not None:
+            g.capture.update(cache="HIT", pdf_size=len(cached_pdf))
+            return send_pdf(cached_pdf, filename, "HIT", etag=cache_key)
 
+        pdf_path = render_pdf_path(filename)
 
         # Генерация
-        generate_pdf_safe(
-            svg_path=None,
-            pdf_path=pdf_path,
-            values=form_data,
-            disable_svg_debug=True,
-            save_pdf=True,
-            draw_debug_grid=False,
-        )
+        try:
+            job = get_render_pool().submit(
+                priority="interactive",
+                client=render_client_key(),
+                svg_path=None,
+                pdf_path=pdf_path,
+                values=form_data,
+                disable_svg_debug=True,
+                save_pdf=True,
+                draw_debug_grid=False,
+            )
+        except RenderQueueFull as e:
+            return queue_full_response(e)
+        track_render_cost(job)
+        result = yield job.future
+
+        g.capture.update(cache="MISS", timings=result.get("timings"), pdf_size=result.get("pdf_size"))
+        if result.get("status") != "OK":
+            g.capture.update(error=result.get("message"), stage=result.get("stage"))
+            return render_error_response(result)
+
+        # В режиме в памяти PDF пришёл байтами — отдаём сразу, архив и кэш пишутся в фоне
+        if result.get("pdf") is not None:
+            finish_render(cache_key, result, filename)
+            return send_pdf(result["pdf"], filename, "MISS", etag=cache_key)
 
         # Проверка существования файла
         if not os.path.exists(pdf_path):
@@ -238,14 +591,275 @@ def generate_pdf_route():
 
         # logger.debug(f"pdf_path = {pdf_path}")
 
+        finish_render(cache_key, result, filename)
+
         # Отдаём файл
-        return send_file(
-            pdf_path,
-            as_attachment=True,
-            download_name=f"{filename}.pdf",
-            mimetype="application/pdf",
-        )
+        return send_pdf(pdf_path, filename, "MISS", etag=cache_key)
 
     except Exception as e:  # noqa: BLE001
         logger.exception("Ошибка при генерации PDF:")
         return jsonify({"error": str(e), "type": type(e).__name__}), 500
+
+
+@app.route("/generate", methods=["POST"])
+def generate_pdf_route():
+    """
+    Маршрут, принимающий данные формы и возвращающий PDF-файл.
+    Синхронная обёртка над тем же пулом рендеринга, что и /jobs.
+    """
+    return run_flow(generate_pdf_flow())
+
+
+def result_pdf_bytes(result) -> bytes:
+    """PDF из результата рендера: байты (режим в памяти) или содержимое файла."""
+    if result.get("pdf") is not None:
+        return result["pdf"]
+    with open(result["path"], "rb") as f:
+        return f.read()
+
+
+def iter_batch_results(items, client):
+    """
+    Рендерит наборы параметров параллельно в пуле и выдаёт результаты по мере готовности:
+    (index, filename, result, cache_status).
+
+    Задания ставятся с приоритетом "bulk" от имени client, одновременно в пуле держится
+    не больше заданий, чем воркеров доступно классу bulk, — пакет не забивает очередь
+    и не вытесняет интерактивные запросы. Попадания в кэш выдаются сразу, без рендеринга.
+    """
+    pool = get_render_pool()
+    pending = deque(enumerate(items))
+    in_flight = {}
+
+    while pending or in_flight:
+        while pending and len(in_flight) < pool.class_limits["bulk"]:
+            index, (values, filename) = pending.popleft()
+            cache_key = values_hash(values)
+            cached_pdf = pdf_cache.get(cache_key)
+            if cached_pdf is not None:
+                yield index, filename, {"status": "OK", "pdf": cached_pdf}, "HIT"
+                continue
+            try:
+                job = pool.submit(
+                    priority="bulk",
+                    client=client,
+                    svg_path=None,
+                    pdf_path=render_pdf_path(filename),
+                    values=values,
+                    disable_svg_debug=True,
+                    save_pdf=True,
+                    draw_debug_grid=False,
+                )
+            except RenderQueueFull as e:
+                pending.appendleft((index, (values, filename)))
+                if not in_flight:
+                    time.sleep(min(e.retry_after, 1))
+                break
+            track_render_cost(job)
+            in_flight[job.future] = (index, filename, cache_key)
+
+        if not in_flight:
+            continue
+
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            index, filename, cache_key = in_flight.pop(future)
+            result = future.result()
+            finish_render(cache_key, result, filename)
+            yield index, filename, result, "MISS"
+
+
+def batch_zip_entries(items, client):
+    """Элементы ZIP-архива для stream_zip: (имя файла, PDF, запись манифеста)."""
+    for index, filename, result, cache_status in iter_batch_results(items, client):
+        record = {"index": index, "filename": filename, "status": result.get("status"), "cache": cache_status}
+        if result.get("status") != "OK":
+            record["error"] = result.get("message")
+            if result.get("stage"):
+                record["stage"] = result["stage"]
+            yield None, None, record
+            continue
+        name = f"{index + 1:03d}_{filename.replace('/', '_').replace(chr(92), '_')}.pdf"
+        record["file"] = name
+        try:
+            yield name, result_pdf_bytes(result), record
+        except OSError as e:
+            record.update(status="error", error=str(e))
+            del record["file"]
+            yield None, None, record
+
+
+def read_batch_request():
+    """
+    Наборы параметров из тела запроса: JSON-массив или CSV (тело или файл в поле "file").
+    Возвращает список (values, filename), выбрасывает BatchError при ошибке.
+    """
+    upload = request.files.get("file")
+    if upload is not None:
+        body = upload.read()
+        content_type = "text/csv" if upload.filename.lower().endswith(".csv") else upload.mimetype
+    else:
+        body = request.get_data()
+        content_type = request.content_type
+    return parse_batch_payload(body, content_type, BATCH_MAX_ITEMS)
+
+
+@app.route("/generate/batch", methods=["POST"])
+def generate_batch_route():
+    """
+    Пакетная генерация: JSON-массив или CSV с наборами параметров (файл можно передать
+    полем "file" в multipart/form-data). Ответ — потоковый ZIP: PDF добавляются
+    по мере готовности, в конце — manifest.json со статусом/ошибкой каждого элемента.
+    """
+    if not is_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+
+    try:
+        items = read_batch_request()
+    except (BatchError, UnicodeDecodeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    logger.info(f"Пакетная генерация: {len(items)} чертежей")
+    archive_name = f"drawings_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.zip"
+    return Response(
+        stream_with_context(stream_zip(batch_zip_entries(items, render_client_key()))),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={archive_name}"},
+    )
+
+
+@app.route("/generate/multipage", methods=["POST"])
+def generate_multipage_route():
+    """
+    Многостраничный PDF: по листу A3 на каждый набор параметров, один документ.
+    Входные данные — как у /generate/batch. Имя файла — из параметра ?filename= или по умолчанию.
+    """
+    if not is_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+
+    try:
+        items = read_batch_request()
+    except (BatchError, UnicodeDecodeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    filename = request.args.get("filename") or DEFAULT_FILENAME
+    values_list = [values for values, _ in items]
+
+    cache_key = multipage_hash(values_list)
+    not_modified = not_modified_response(cache_key)
+    if not_modified is not None:
+        return not_modified
+    cached_pdf = pdf_cache.get(cache_key)
+    if cached_pdf is not None:
+        return send_pdf(cached_pdf, filename, "HIT", etag=cache_key)
+
+    try:
+        job = get_render_pool().submit(
+            "generate_multipage_pdf",
+            priority="bulk",
+            client=render_client_key(),
+            values_list=values_list,
+            pdf_path=render_pdf_path(filename),
+        )
+    except RenderQueueFull as e:
+        return queue_full_response(e)
+
+    track_render_cost(job)
+    result = job.future.result()
+    if result.get("status") != "OK":
+        return render_error_response(result, "многостраничного PDF")
+
+    finish_render(cache_key, result, filename)
+    return send_pdf(result["pdf"] if result.get("pdf") is not None else result["path"], filename, "MISS",
+                    etag=cache_key)
+
+
+@app.route("/jobs", methods=["POST"])
+def create_job():
+    """
+    Асинхронная генерация: ставит задание в очередь и сразу возвращает его id (202).
+    Поля формы — те же, что у /generate. При переполненной очереди — 429 с Retry-After.
+    """
+    if not is_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+
+    try:
+        form_data, filename = parse_form_values(request.form)
+    except FormError as e:
+        return jsonify({"error": str(e)}), 400
+
+    cache_key = values_hash(form_data)
+    cached_pdf = pdf_cache.get(cache_key)
+    if cached_pdf is not None:
+        job = job_registry.add_completed(filename, {"status": "OK", "pdf": cached_pdf, "cache": "HIT"},
+                                         etag=cache_key)
+        return job_accepted_response(job)
+
+    pdf_path = render_pdf_path(filename)
+
+    try:
+        job = job_registry.submit(
+            filename,
+            etag=cache_key,
+            priority="interactive",
+            client=render_client_key(),
+            svg_path=None,
+            pdf_path=pdf_path,
+            values=form_data,
+            disable_svg_debug=True,
+            save_pdf=True,
+            draw_debug_grid=False,
+        )
+    except RenderQueueFull as e:
+        return queue_full_response(e)
+
+    track_render_cost(job)
+    job.future.add_done_callback(lambda future: finish_render(cache_key, future.result(), filename))
+    return job_accepted_response(job)
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Состояние задания: status (queued/running/done/error/timeout) и текущий этап stage."""
+    if not is_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+
+    job = job_registry.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route("/jobs/<job_id>/pdf", methods=["GET"])
+def get_job_pdf(job_id):
+    """Отдаёт PDF завершённого задания. Пока задание не готово — 409."""
+    if not is_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+
+    job = job_registry.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job.status in ("error", "timeout"):
+        status_code = 504 if job.status == "timeout" else 500
+        return jsonify({"error": job.error, "status": job.status, "stage": job.stage}), status_code
+    if job.status != "done":
+        return jsonify({"error": "Job is not finished", "status": job.status, "stage": job.stage}), 409
+
+    if not job.pdf_path or not os.path.exists(job.pdf_path):
+        logger.error(f"Файл PDF не найден: {job.pdf_path}")
+        return jsonify({"error": "Файл не найден"}), 500
+
+    return send_pdf(job.pdf_path, job.filename, job.cache, etag=job.etag, last_modified=job.finished_at)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Метрики в текстовом формате Prometheus (доступ ограничивается ALLOWED_IPS, без токена)."""
+    return Response(metrics_registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.route("/health", methods=["GET"])
+def health():
+    """Health-check: состояние пула рендеринга, очереди и кэша PDF."""
+    return jsonify({"status": "ok", "render_pool": get_render_pool().stats(), "pdf_cache": pdf_cache.stats(),
+                    "config_version": runtime_config.version})
@@ -0,0 +1,141 @@
+# app/tokens.py
+
+"""
+Реестр токенов доступа к API.
+
+Токены хранятся только в виде хешей SHA-256 (TOKENS_FILE, JSON-массив):
+
+    [
+      {"name": "crm", "sha256": "<hex>", "rps": 10, "burst": 30, "cpu_per_minute": 120, "cpu_burst": 240},
+      {"name": "partner-a", "sha256": "<hex>"}
+    ]
+
+Поля лимитов необязательны — по умолчанию используются RATE_LIMIT_* (app.rate_limit).
+SECRET_TOKEN из окружения, если задан, добавляется в реестр под именем "default"
+(им пользуется HTML-форма). Хеш нового токена:
+
+    python -m app.tokens hash <токен>
+"""
+
+import hashlib
+import json
+import math
+import os
+import sys
+
+from configs.config_log import logger
+from configs.config_server import TOKENS_FILE
+
+# Имя токена SECRET_TOKEN в реестре
+DEFAULT_TOKEN_NAME = "default"
+
+# Поля записи токена, задающие лимиты
+LIMIT_FIELDS = ("rps", "burst", "cpu_per_minute", "cpu_burst")
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class ApiToken:
+    """Токен из реестра: имя (для лимитов, журнала и очереди) и собственные лимиты (или None)."""
+
+    def __init__(self, name, limits=None):
+        self.name = name
+        self.limits = limits or {}
+
+    @property
+    def shared(self) -> bool:
+        """Общий токен (SECRET_TOKEN формы): клиентов под ним различают по IP."""
+        return self.name == DEFAULT_TOKEN_NAME
+
+
+class TokenRegistry:
+    """Поиск токена по хешу. Исходные значения токенов в памяти не хранятся."""
+
+    def __init__(self):
+        self.path = None
+        self._tokens = {}
+        self._loaded = False
+
+    def load(self, path=None, secret_token="") -> bool:
+        """
+        Загружает реестр из файла path (если есть) и добавляет secret_token как "default".
+        Новый реестр подменяет прежний целиком — повторный вызов перечитывает токены без перезапуска.
+        Некорректные записи пропускаются (с сообщением в журнале). Если файл не читается или это
+        не JSON-массив, остаётся прежний реестр (при первой загрузке — только secret_token)
+        и возвращается False.
+        """
+        self.path = path
+        tokens = {}
+        if secret_token:
+            tokens[hash_token(secret_token)] = ApiToken(DEFAULT_TOKEN_NAME)
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    entries = json.load(f)
+                if not isinstance(entries, list):
+                    raise ValueError("ожидается JSON-массив записей")
+            except (OSError, ValueError) as e:
+                logger.error(f"Не удалось прочитать реестр токенов {path}: {e}")
+                if self._loaded:
+                    return False
+                entries = []
+            for number, entry in enumerate(entries, 1):
+                token = self._parse_entry(entry)
+                if token is None:
+                    logger.error(f"Некорректная запись №{number} в реестре токенов {path}: пропущена")
+                    continue
+                digest, api_token = token
+                tokens[digest] = api_token
+        self._tokens = tokens
+        self._loaded = True
+        logger.info(f"Реестр токенов: {len(tokens)} шт.")
+        return True
+
+    @staticmethod
+    def _parse_entry(entry) -> tuple[str, ApiToken] | None:
+        """(хеш, ApiToken) из записи файла или None, если запись некорректна."""
+        if not isinstance(entry, dict) or not entry.get("name"):
+            return None
+        digest = str(entry.get("sha256", "")).strip().lower()
+        if len(digest) != 64 or any(char not in "0123456789abcdef" for char in digest):
+            return None
+        limits = {}
+        for field in LIMIT_FIELDS:
+            if entry.get(field) is None:
+                continue
+            try:
+                value = float(entry[field])
+            except (TypeError, ValueError):
+                return None
+            if not math.isfinite(value) or value < 0:
+                return None
+            limits[field] = value
+        return digest, ApiToken(str(entry["name"]), limits)
+
+    def lookup(self, token) -> ApiToken | None:
+        """Токен по его значению из заголовка Authorization или None."""
+        if not token:
+            return None
+        return self._tokens.get(hash_token(token))
+
+    def __len__(self):
+        return len(self._tokens)
+
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+token_registry = TokenRegistry()
+token_registry.load(
+    TOKENS_FILE if os.path.isabs(TOKENS_FILE) else os.path.join(BASE_DIR, TOKENS_FILE),
+    os.getenv("SECRET_TOKEN", ""),
+)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "hash":
+        print(hash_token(sys.argv[2]))
+    else:
+        print("Использование: python -m app.tokens hash <токен>")
+        sys.exit(2)
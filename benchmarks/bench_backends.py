@@ -0,0 +1,166 @@
+# benchmarks/bench_backends.py
+# Сравнение способов вывода в PDF: SVG + CairoSVG и прямое рисование на cairo (render_backend)
+
+"""
+Для каждого случая матрицы параметров (как в bench_generate_pdf.py):
+
+1. Визуальное совпадение. Лист растрируется обоими способами в одинаковый ImageSurface
+   (96 dpi, как svg2png): CairoSVG — по строке SVG из build_svg, CairoCanvas — воспроизведением
+   списка отображения из build_display_list (с оптимизациями DISPLAY_LIST_OPTIMIZE). Пиксель считается отличающимся, если какой-то канал отличается
+   больше чем на --tolerance; случай не проходит, если таких пикселей больше --max-diff
+   (доля). С --diff-dir для непрошедших случаев сохраняются оба PNG и маска отличий.
+2. Время генерации PDF от параметров до байтов (медиана по --repeat прогонам):
+   svg — prepare_values + build_svg + svg2pdf, cairo — prepare_values + build_display_list +
+   serialize(..., "pdf").
+
+Завершается с кодом 1, если хоть один случай не прошёл проверку совпадения.
+Нужна libcairo (как и для самой генерации PDF).
+
+Пример:
+    python benchmarks/bench_backends.py --quick --repeat 5 --diff-dir /tmp/backend_diff
+"""
+
+import argparse
+import gc
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import cairocffi  # noqa: E402
+import cairosvg  # noqa: E402
+from cairosvg.parser import Tree  # noqa: E402
+from cairosvg.surface import PNGSurface  # noqa: E402
+
+from app.render_pool import default_render_values  # noqa: E402
+from benchmarks.bench_generate_pdf import DEFAULT_LENGTHS, build_cases  # noqa: E402
+from configs.config import PDF_FONT_MODE  # noqa: E402
+from drawers.cairo_canvas import CairoCanvas, page_size  # noqa: E402
+from generate_drawing import (SHEET_SIZE, SHEET_VIEWBOX, build_display_list, build_svg, prepare_values,  # noqa: E402
+                              serialize)
+
+
+def render_svg_png(combined, defaults):
+    """Растр листа через SVG и CairoSVG (как svg2png, без записи PNG)."""
+    svg_string = build_svg(combined, defaults, font_mode=PDF_FONT_MODE)
+    page = PNGSurface(Tree(bytestring=svg_string.encode("utf-8")), None, 96)
+    page.cairo.flush()
+    return page.cairo
+
+
+def render_cairo_png(combined, defaults):
+    """Растр листа из списка отображения через CairoCanvas. Размер — целые пиксели, как у PNGSurface CairoSVG."""
+    width, height = (int(value) for value in page_size(SHEET_SIZE))
+    surface = cairocffi.ImageSurface(cairocffi.FORMAT_ARGB32, width, height)
+    canvas = CairoCanvas.page(surface, SHEET_SIZE, SHEET_VIEWBOX, device_units_per_user_units=1)
+    build_display_list(combined, defaults).replay(canvas)
+    surface.flush()
+    return surface
+
+
+def diff_pixels(first, second, tolerance):
+    """Кол-во пикселей, у которых какой-то канал отличается больше чем на tolerance, и маска отличий."""
+    width, height = first.get_width(), first.get_height()
+    if (width, height) != (second.get_width(), second.get_height()):
+        raise ValueError(f"Разный размер растров: {width}x{height} и {second.get_width()}x{second.get_height()}")
+    stride = first.get_stride()
+    data_first, data_second = bytes(first.get_data()), bytes(second.get_data())
+    mask = cairocffi.ImageSurface(cairocffi.FORMAT_A8, width, height)
+    mask_data, mask_stride = mask.get_data(), mask.get_stride()
+    changed = 0
+    for row in range(height):
+        start = row * stride
+        row_first = data_first[start:start + width * 4]
+        row_second = data_second[start:start + width * 4]
+        if row_first == row_second:
+            continue
+        for column in range(width):
+            offset = column * 4
+            if any(abs(row_first[offset + channel] - row_second[offset + channel]) > tolerance
+                   for channel in range(4)):
+                changed += 1
+                mask_data[row * mask_stride + column:row * mask_stride + column + 1] = b"\xff"
+    mask.mark_dirty()
+    return changed, mask
+
+
+def median_seconds(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def pdf_via_svg(values):
+    combined, defaults = prepare_values(values)
+    svg_string = build_svg(combined, defaults, font_mode=PDF_FONT_MODE)
+    return cairosvg.svg2pdf(bytestring=svg_string.encode("utf-8"))
+
+
+def pdf_via_cairo(values):
+    combined, defaults = prepare_values(values)
+    return serialize(build_display_list(combined, defaults), "pdf")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Совпадение и время render_backend svg / cairo")
+    parser.add_argument("--quick", action="store_true", help="сокращённый набор rod_count (6, среднее, 24)")
+    parser.add_argument("--lengths", default=",".join(DEFAULT_LENGTHS), help="длины каркаса через запятую, мм")
+    parser.add_argument("--repeat", type=int, default=3, help="прогонов на случай для медианы времени")
+    parser.add_argument("--filter", default="", help="только случаи, в id которых есть эта подстрока")
+    parser.add_argument("--tolerance", type=int, default=64, help="допустимое отличие канала пикселя (0..255)")
+    parser.add_argument("--max-diff", type=float, default=0.0005, help="допустимая доля отличающихся пикселей")
+    parser.add_argument("--diff-dir", help="каталог для PNG непрошедших случаев")
+    parser.add_argument("--no-timing", action="store_true", help="только проверка совпадения")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in build_cases(args.quick, tuple(args.lengths.split(","))) if args.filter in case[0]]
+
+    # Прогрев: импорты, кэши шрифтов и cairo не должны попадать в первый случай
+    pdf_via_svg(default_render_values())
+    pdf_via_cairo(default_render_values())
+
+    header = f"{'case':<44} {'diff px':>8} {'parity':>6} {'svg ms':>8} {'cairo ms':>9} {'speedup':>7}"
+    print(header)
+    print("-" * len(header))
+    failed, speedups = [], []
+    for case_id, _, values in cases:
+        combined, defaults = prepare_values(values)
+        expected, actual = render_svg_png(combined, defaults), render_cairo_png(combined, defaults)
+        changed, mask = diff_pixels(expected, actual, args.tolerance)
+        passed = changed <= args.max_diff * expected.get_width() * expected.get_height()
+        if not passed:
+            failed.append(case_id)
+            if args.diff_dir:
+                directory = Path(args.diff_dir)
+                directory.mkdir(parents=True, exist_ok=True)
+                expected.write_to_png(str(directory / f"{case_id}-svg.png"))
+                actual.write_to_png(str(directory / f"{case_id}-cairo.png"))
+                mask.write_to_png(str(directory / f"{case_id}-diff.png"))
+
+        line = f"{case_id:<44} {changed:8d} {'ok' if passed else 'FAIL':>6}"
+        if not args.no_timing:
+            svg_seconds = median_seconds(lambda: pdf_via_svg(values), args.repeat)
+            cairo_seconds = median_seconds(lambda: pdf_via_cairo(values), args.repeat)
+            speedups.append(svg_seconds / cairo_seconds)
+            line += f" {svg_seconds * 1000:8.1f} {cairo_seconds * 1000:9.1f} {svg_seconds / cairo_seconds:6.2f}x"
+        print(line)
+
+    if speedups:
+        print(f"\nУскорение cairo относительно svg: медиана {statistics.median(speedups):.2f}x, "
+              f"мин. {min(speedups):.2f}x, макс. {max(speedups):.2f}x")
+    if failed:
+        print(f"\nНе совпали ({len(failed)}): {', '.join(failed)}")
+        return 1
+    print(f"\nВсе {len(cases)} случаев совпадают (допуск {args.tolerance}, доля {args.max_diff})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+# benchmarks/bench_fonts.py
+# Бенчмарк подключения шрифта ГОСТ к SVG чертежа
+
+"""
+Сравнивает режимы подключения шрифта (FontEmbedder) на одних и тех же чертежах:
+- размер блока @font-face (style) и всего SVG, байт;
+- время build_svg: первый прогон (CSS шрифта строится: чтение TTF, подмножество, base64)
+  и медиана повторных по --repeat прогонам (CSS из кэша FontEmbedder процесса);
+- время разбора стилей так, как это делает CairoSVG (tinycss2.parse_stylesheet);
+- время svg2pdf и размер PDF — если CairoSVG может загрузить libcairo.
+
+Пример:
+    python benchmarks/bench_fonts.py --modes embed,subset,link,system --lengths 1000,3000,10000
+
+Режим 'system' (PDF_FONT_MODE) — SVG без встроенного шрифта, как его строит generate_pdf для PDF.
+"""
+
+import argparse
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import tinycss2  # noqa: E402
+
+import font_embedder  # noqa: E402
+from app.render_pool import default_render_values  # noqa: E402
+from generate_drawing import build_svg, prepare_values  # noqa: E402
+
+try:
+    import cairosvg
+except (ImportError, OSError):  # нет libcairo — PDF не меряется
+    cairosvg = None
+
+STYLE_RE = re.compile(r"<style[^>]*>(.*?)</style>", re.S)
+
+
+def median_ms(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def bench_mode(mode, combined, defaults, repeat):
+    row = {"mode": mode}
+    font_embedder.get_font_embedder.cache_clear()
+    start = time.perf_counter()
+    svg = build_svg(combined, defaults, font_mode=mode)
+    row["first_ms"] = (time.perf_counter() - start) * 1000
+    row["build_ms"], svg = median_ms(lambda: build_svg(combined, defaults, font_mode=mode), repeat)
+
+    styles = STYLE_RE.findall(svg)
+    row["style_bytes"] = sum(len(style.encode("utf-8")) for style in styles)
+    row["svg_bytes"] = len(svg.encode("utf-8"))
+    row["css_ms"], _ = median_ms(
+        lambda: [tinycss2.parse_stylesheet(style, skip_comments=True, skip_whitespace=True) for style in styles], repeat)
+
+    row["pdf_ms"] = row["pdf_bytes"] = None
+    if cairosvg is not None:
+        row["pdf_ms"], pdf = median_ms(lambda: cairosvg.svg2pdf(bytestring=svg.encode("utf-8")), repeat)
+        row["pdf_bytes"] = len(pdf)
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк подключения шрифта к SVG")
+    parser.add_argument("--modes", default="embed,subset,link,system", help="режимы FontEmbedder через запятую")
+    parser.add_argument("--lengths", default="3000", help="длины каркаса через запятую, мм")
+    parser.add_argument("--repeat", type=int, default=5, help="прогонов для медианы")
+    args = parser.parse_args(argv)
+
+    if font_embedder.font_subset is None:
+        print("fontTools не установлен: режим 'subset' встраивает шрифт целиком")
+    if cairosvg is None:
+        print("CairoSVG/libcairo недоступны: svg2pdf не меряется")
+
+    header = (f"{'length':>6} {'mode':>8} {'style B':>9} {'svg B':>9} {'first ms':>9} {'build ms':>9} "
+              f"{'css ms':>7} {'pdf ms':>7} {'pdf B':>9}")
+    print(header)
+    for length in args.lengths.split(","):
+        combined, defaults = prepare_values({**default_render_values(), "frame_length_mm": length})
+        for mode in args.modes.split(","):
+            row = bench_mode(mode, combined, defaults, args.repeat)
+            pdf_ms = f"{row['pdf_ms']:.1f}" if row["pdf_ms"] is not None else "-"
+            pdf_bytes = row["pdf_bytes"] if row["pdf_bytes"] is not None else "-"
+            print(f"{length:>6} {mode:>8} {row['style_bytes']:>9} {row['svg_bytes']:>9} {row['first_ms']:>9.1f} "
+                  f"{row['build_ms']:>9.1f} {row['css_ms']:>7.2f} {pdf_ms:>7} {pdf_bytes:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
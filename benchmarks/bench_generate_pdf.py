@@ -0,0 +1,237 @@
+# benchmarks/bench_generate_pdf.py
+# Бенчмарк конвейера generate_pdf по пространству параметров чертежа
+
+"""
+Прогоняет этапы generate_drawing в текущем процессе (без сервера и пула) по матрице параметров:
+frame_parts_count 1/2/3 × Вентури да/нет × донышко да/нет × rod_count 6..24 × длины каркаса
+(включая крайние). Для каждого случая и этапа (calculations, svg, pdf) меряет:
+- время (wall, медиана по --repeat прогонам) и процессорное время (cpu);
+- пиковую память Python-аллокаций (tracemalloc, отдельный прогон — чтобы не искажать время);
+- размер SVG в байтах, кол-во элементов SVG, размер PDF;
+- время отдельных шагов (add_*, draw_views, draw_title_block, draw_table, draw_base_sheet, tostring, svg2pdf).
+
+Базовая линия — JSON с результатами (--save-baseline). При сравнении (--baseline) скрипт
+завершается с кодом 1, если какой-то показатель вырос больше чем на --threshold.
+Память cairo (C-аллокации) tracemalloc не видит — пик для этапа pdf занижен.
+
+Примеры:
+    python benchmarks/bench_generate_pdf.py --quick --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_generate_pdf.py --quick --baseline benchmarks/baseline.json --threshold 0.15
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import cairosvg  # noqa: E402
+
+from app.render_pool import default_render_values  # noqa: E402
+from configs.config import PDF_FONT_MODE, dropdown_fields  # noqa: E402
+from generate_drawing import build_svg, prepare_values  # noqa: E402
+
+STAGES = ("calculations", "svg", "pdf")
+
+# Длины каркаса, мм: короткий, по умолчанию, длинный (много колец — самый «тяжёлый» чертёж)
+DEFAULT_LENGTHS = ("1000", "3000", "10000")
+
+# Минимальный абсолютный прирост, который считается регрессией (отсекает шум на быстрых этапах)
+MIN_DELTA = {"wall": 0.002, "cpu": 0.002, "peak_kib": 64}
+
+
+def build_cases(quick=False, lengths=DEFAULT_LENGTHS):
+    """Матрица параметров. quick — сокращённый набор rod_count (крайние и среднее значение)."""
+    rod_counts = dropdown_fields["rod_count"]
+    if quick:
+        rod_counts = [rod_counts[0], rod_counts[len(rod_counts) // 2], rod_counts[-1]]
+    base = default_render_values()
+    cases = []
+    for parts, rods, length, venturi, bottom in itertools.product(
+            dropdown_fields["frame_parts_count"], rod_counts, lengths, (False, True), (False, True)):
+        params = {
+            "frame_parts_count": parts,
+            "rod_count": rods,
+            "frame_length_mm": length,
+            "venturi_presence": venturi,
+            "bottom_presence": bottom,
+        }
+        case_id = f"parts{parts}-rods{rods}-len{length}-venturi{int(venturi)}-bottom{int(bottom)}"
+        cases.append((case_id, params, {**base, **params}))
+    return cases
+
+
+def run_pipeline(values, measure):
+    """
+    Один прогон этапов generate_pdf. measure(stage, fn) выполняет fn и замеряет этап.
+    Возвращает (svg_string, pdf_bytes, timings шагов).
+    """
+    timings = {}
+    combined, defaults = measure("calculations", lambda: prepare_values(values, timings))
+    # Шрифт подключается так же, как в generate_pdf для PDF
+    svg_string = measure("svg", lambda: build_svg(combined, defaults, timings=timings, font_mode=PDF_FONT_MODE))
+
+    def to_pdf():
+        start = time.perf_counter()
+        pdf = cairosvg.svg2pdf(bytestring=svg_string.encode("utf-8"))
+        timings["svg2pdf"] = time.perf_counter() - start
+        return pdf
+
+    pdf_bytes = measure("pdf", to_pdf)
+    return svg_string, pdf_bytes, timings
+
+
+def bench_case(values, repeat):
+    """Замеры одного случая: медианы времени по repeat прогонам и пик памяти по отдельному прогону."""
+    samples = {stage: {"wall": [], "cpu": []} for stage in STAGES}
+    step_samples = {}
+
+    def timed(stage, fn):
+        wall, cpu = time.perf_counter(), time.process_time()
+        result = fn()
+        samples[stage]["wall"].append(time.perf_counter() - wall)
+        samples[stage]["cpu"].append(time.process_time() - cpu)
+        return result
+
+    for _ in range(repeat):
+        gc.collect()
+        svg_string, pdf_bytes, timings = run_pipeline(values, timed)
+        for step, seconds in timings.items():
+            step_samples.setdefault(step, []).append(seconds)
+
+    peaks = {}
+
+    def traced(stage, fn):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        result = fn()
+        peaks[stage] = (tracemalloc.get_traced_memory()[1] - before) / 1024
+        return result
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run_pipeline(values, traced)
+    finally:
+        tracemalloc.stop()
+
+    stages = {
+        stage: {
+            "wall": statistics.median(samples[stage]["wall"]),
+            "cpu": statistics.median(samples[stage]["cpu"]),
+            "peak_kib": round(peaks[stage], 1),
+        }
+        for stage in STAGES
+    }
+    return {
+        "stages": stages,
+        "total": {
+            "wall": sum(stage["wall"] for stage in stages.values()),
+            "cpu": sum(stage["cpu"] for stage in stages.values()),
+            "peak_kib": max(stage["peak_kib"] for stage in stages.values()),
+        },
+        "steps": {step: statistics.median(values) for step, values in sorted(step_samples.items())},
+        "svg_bytes": len(svg_string.encode("utf-8")),
+        "svg_elements": sum(1 for _ in ET.fromstring(svg_string).iter()),
+        "pdf_bytes": len(pdf_bytes),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Сравнивает результаты с базовой линией. Возвращает список строк с регрессиями."""
+    regressions = []
+    for case_id, current in results["cases"].items():
+        previous = baseline["cases"].get(case_id)
+        if previous is None or "error" in current or "error" in previous:
+            continue
+        scopes = [("total", current["total"], previous["total"])]
+        scopes += [(stage, current["stages"][stage], previous["stages"][stage]) for stage in STAGES]
+        for scope, new, old in scopes:
+            for metric, min_delta in MIN_DELTA.items():
+                delta = new[metric] - old[metric]
+                if old[metric] > 0 and delta > min_delta and delta / old[metric] > threshold:
+                    regressions.append(
+                        f"{case_id} {scope}.{metric}: {old[metric]:.4g} -> {new[metric]:.4g} "
+                        f"(+{delta / old[metric]:.0%})"
+                    )
+    return regressions
+
+
+def print_table(results):
+    header = f"{'case':<44} {'wall ms':>8} {'cpu ms':>8} {'peak KiB':>9} {'svg KB':>7} {'elems':>6} {'pdf KB':>7}"
+    print(header)
+    print("-" * len(header))
+    for case_id, case in results["cases"].items():
+        if "error" in case:
+            print(f"{case_id:<44} ОШИБКА: {case['error']}")
+            continue
+        total = case["total"]
+        print(f"{case_id:<44} {total['wall'] * 1000:8.1f} {total['cpu'] * 1000:8.1f} {total['peak_kib']:9.0f} "
+              f"{case['svg_bytes'] / 1024:7.1f} {case['svg_elements']:6d} {case['pdf_bytes'] / 1024:7.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк generate_pdf по матрице параметров")
+    parser.add_argument("--quick", action="store_true", help="сокращённый набор rod_count (6, среднее, 24)")
+    parser.add_argument("--lengths", default=",".join(DEFAULT_LENGTHS), help="длины каркаса через запятую, мм")
+    parser.add_argument("--repeat", type=int, default=3, help="прогонов на случай для медианы времени")
+    parser.add_argument("--filter", default="", help="только случаи, в id которых есть эта подстрока")
+    parser.add_argument("--output", help="сохранить результаты в JSON")
+    parser.add_argument("--save-baseline", metavar="PATH", help="сохранить результаты как базовую линию")
+    parser.add_argument("--baseline", metavar="PATH", help="сравнить с базовой линией")
+    parser.add_argument("--threshold", type=float, default=0.15, help="допустимый относительный прирост (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in build_cases(args.quick, tuple(args.lengths.split(","))) if args.filter in case[0]]
+
+    # Прогрев: импорты, кэши шрифтов и cairo не должны попадать в первый случай
+    run_pipeline(default_render_values(), lambda stage, fn: fn())
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "cases": {},
+    }
+    for index, (case_id, params, values) in enumerate(cases, start=1):
+        print(f"[{index}/{len(cases)}] {case_id}", file=sys.stderr)
+        try:
+            results["cases"][case_id] = {"params": params, **bench_case(values, args.repeat)}
+        except Exception as e:  # noqa: BLE001
+            results["cases"][case_id] = {"params": params, "error": str(e)}
+
+    print_table(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+            print(f"Результаты сохранены: {path}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nРегрессии (порог {args.threshold:.0%}):")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print(f"\nРегрессий относительно {args.baseline} нет (порог {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
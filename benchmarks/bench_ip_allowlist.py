@@ -0,0 +1,117 @@
+# benchmarks/bench_ip_allowlist.py
+# Бенчмарк проверки IP по белому списку в зависимости от числа подсетей
+
+"""
+Сравнивает стоимость одной проверки адреса:
+- linear — прежний способ: ipaddress.ip_address + перебор подсетей (`addr in net`);
+- intervals — app.ip_allowlist без кэша решений (двоичный поиск по слитым интервалам);
+- cached — app.ip_allowlist с кэшем решений (адреса клиентов повторяются).
+
+Подсети — случайные IPv4 /16../28 и IPv6 /32../64 (--seed), адреса запросов — половина из
+подсетей списка, половина случайные. Линейный перебор меряется только до --linear-max подсетей.
+
+Пример:
+    python benchmarks/bench_ip_allowlist.py --sizes 10,100,1000,10000,100000
+"""
+
+import argparse
+import ipaddress
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from app.ip_allowlist import IpAllowlist  # noqa: E402
+
+
+def random_networks(count, rng) -> list[str]:
+    networks = []
+    for _ in range(count):
+        if rng.random() < 0.7:
+            prefix = rng.randint(16, 28)
+            address = ipaddress.IPv4Address(rng.getrandbits(32))
+        else:
+            prefix = rng.randint(32, 64)
+            address = ipaddress.IPv6Address(rng.getrandbits(128))
+        networks.append(str(ipaddress.ip_network(f"{address}/{prefix}", strict=False)))
+    return networks
+
+
+def random_addresses(networks, count, rng) -> list[str]:
+    addresses = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            network = ipaddress.ip_network(rng.choice(networks))
+            offset = rng.randrange(network.num_addresses)
+            addresses.append(str(network.network_address + offset))
+        elif rng.random() < 0.7:
+            addresses.append(str(ipaddress.IPv4Address(rng.getrandbits(32))))
+        else:
+            addresses.append(str(ipaddress.IPv6Address(rng.getrandbits(128))))
+    return addresses
+
+
+def linear_is_allowed(networks):
+    parsed = [ipaddress.ip_network(network) for network in networks]
+
+    def check(ip):
+        addr = ipaddress.ip_address(ip)
+        for net in parsed:
+            if addr in net:
+                return True
+        return False
+
+    return check
+
+
+def per_lookup_us(check, addresses, repeat) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for ip in addresses:
+            check(ip)
+        best = min(best, time.perf_counter() - start)
+    return best / len(addresses) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк белого списка IP")
+    parser.add_argument("--sizes", default="10,100,1000,10000,100000", help="кол-во подсетей через запятую")
+    parser.add_argument("--lookups", type=int, default=2000, help="адресов на замер")
+    parser.add_argument("--clients", type=int, default=200, help="разных адресов клиентов для замера с кэшем")
+    parser.add_argument("--linear-max", type=int, default=10000, help="макс. подсетей для линейного перебора")
+    parser.add_argument("--repeat", type=int, default=3, help="повторов замера (берётся лучший)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    print(f"{'subnets':>8} {'intervals':>9} {'build ms':>9} {'linear us':>10} {'intervals us':>13} {'cached us':>10}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        networks = random_networks(size, rng)
+        addresses = random_addresses(networks, args.lookups, rng)
+        clients = random_addresses(networks, args.clients, rng)
+        requests = [rng.choice(clients) for _ in range(args.lookups)]
+
+        start = time.perf_counter()
+        allowlist = IpAllowlist(networks)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        linear = "-"
+        if size <= args.linear_max:
+            check = linear_is_allowed(networks)
+            linear_addresses = addresses[:max(50, args.lookups * 100 // max(size, 100))]
+            linear = f"{per_lookup_us(check, linear_addresses, args.repeat):.2f}"
+            assert all(check(ip) == allowlist._lookup(ip) for ip in linear_addresses), "результаты расходятся"
+
+        intervals_us = per_lookup_us(allowlist._lookup, addresses, args.repeat)
+        cached_us = per_lookup_us(allowlist.is_allowed, requests, args.repeat)
+        total = allowlist.intervals(4) + allowlist.intervals(6)
+        print(f"{size:>8} {total:>9} {build_ms:>9.1f} {linear:>10} {intervals_us:>13.2f} {cached_us:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# benchmarks/bench_svg_writer.py
+# Сравнение SvgCanvas (потоковая запись SVG) с svgwrite.Drawing: совпадение строк и время
+
+"""
+Для каждого случая матрицы параметров (как в bench_generate_pdf.py) и режима шрифта (--font-modes):
+
+1. Совпадение. Лист рисуется на svgwrite.Drawing (как до SvgCanvas: тот же размер, viewBox,
+   draw_sheet и add_fonts) и через build_svg (SvgCanvas); строки SVG должны совпасть побайтно.
+   Для непрошедшего случая печатается место первого отличия. У первого случая рисуется
+   и отладочная сетка (draw_grid).
+2. Время построения строки SVG от готовых значений (draw_sheet + fonts + tostring),
+   медиана по --repeat прогонам.
+
+Завершается с кодом 1, если хоть один случай не совпал.
+
+Пример:
+    python benchmarks/bench_svg_writer.py --quick --repeat 5
+"""
+
+import argparse
+import gc
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import svgwrite  # noqa: E402
+
+from app.render_pool import default_render_values  # noqa: E402
+from benchmarks.bench_generate_pdf import DEFAULT_LENGTHS, build_cases  # noqa: E402
+from configs.config import FONT_EMBED_MODE, PDF_FONT_MODE  # noqa: E402
+from font_embedder import add_fonts  # noqa: E402
+from generate_drawing import SHEET_SIZE, SHEET_VIEWBOX, build_svg, draw_sheet, prepare_values  # noqa: E402
+
+
+def build_svg_svgwrite(combined, defaults, draw_debug_grid=False, font_mode=None):
+    """Строка SVG через svgwrite.Drawing — как build_svg до SvgCanvas."""
+    dwg = svgwrite.Drawing(size=SHEET_SIZE, profile='full')
+    dwg.attribs['overflow'] = 'visible'
+    dwg.attribs['viewBox'] = SHEET_VIEWBOX
+    draw_sheet(dwg, combined, defaults, draw_debug_grid)
+    add_fonts(dwg, font_mode)
+    return dwg.tostring()
+
+
+def first_difference(expected, actual, context=80):
+    """Место первого отличия строк и их фрагменты вокруг него."""
+    index = next((i for i, (a, b) in enumerate(zip(expected, actual)) if a != b), min(len(expected), len(actual)))
+    start = max(index - context, 0)
+    return index, expected[start:index + context], actual[start:index + context]
+
+
+def median_seconds(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Совпадение и время SvgCanvas / svgwrite")
+    parser.add_argument("--quick", action="store_true", help="сокращённый набор rod_count (6, среднее, 24)")
+    parser.add_argument("--lengths", default=",".join(DEFAULT_LENGTHS), help="длины каркаса через запятую, мм")
+    parser.add_argument("--font-modes", default=",".join(dict.fromkeys((PDF_FONT_MODE, FONT_EMBED_MODE))),
+                        help="режимы шрифта через запятую (см. FontEmbedder)")
+    parser.add_argument("--repeat", type=int, default=3, help="прогонов на случай для медианы времени")
+    parser.add_argument("--filter", default="", help="только случаи, в id которых есть эта подстрока")
+    parser.add_argument("--no-timing", action="store_true", help="только проверка совпадения")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in build_cases(args.quick, tuple(args.lengths.split(","))) if args.filter in case[0]]
+    font_modes = args.font_modes.split(",")
+
+    # Прогрев: импорты и кэши шрифта не должны попадать в первый случай
+    combined, defaults = prepare_values(default_render_values())
+    for font_mode in font_modes:
+        build_svg_svgwrite(combined, defaults, font_mode=font_mode)
+        build_svg(combined, defaults, font_mode=font_mode)
+
+    header = f"{'case':<44} {'font':<8} {'bytes':>8} {'equal':>5} {'svgwrite ms':>11} {'canvas ms':>9} {'speedup':>7}"
+    print(header)
+    print("-" * len(header))
+    failed, speedups = [], []
+    for number, (case_id, _, values) in enumerate(cases):
+        combined, defaults = prepare_values(values)
+        grid = number == 0
+        for font_mode in font_modes:
+            expected = build_svg_svgwrite(combined, defaults, grid, font_mode)
+            actual = build_svg(combined, defaults, grid, font_mode=font_mode)
+            equal = expected == actual
+            line = f"{case_id:<44} {font_mode:<8} {len(actual):8d} {'ok' if equal else 'FAIL':>5}"
+            if not args.no_timing:
+                svgwrite_seconds = median_seconds(
+                    lambda: build_svg_svgwrite(combined, defaults, font_mode=font_mode), args.repeat)
+                canvas_seconds = median_seconds(
+                    lambda: build_svg(combined, defaults, font_mode=font_mode), args.repeat)
+                speedups.append(svgwrite_seconds / canvas_seconds)
+                line += (f" {svgwrite_seconds * 1000:11.1f} {canvas_seconds * 1000:9.1f}"
+                         f" {svgwrite_seconds / canvas_seconds:6.2f}x")
+            print(line)
+            if not equal:
+                failed.append(f"{case_id}/{font_mode}")
+                index, expected_part, actual_part = first_difference(expected, actual)
+                print(f"  первое отличие в символе {index}:\n  svgwrite: {expected_part!r}\n  canvas:   {actual_part!r}")
+
+    if speedups:
+        print(f"\nУскорение SvgCanvas относительно svgwrite: медиана {statistics.median(speedups):.2f}x, "
+              f"мин. {min(speedups):.2f}x, макс. {max(speedups):.2f}x")
+    if failed:
+        print(f"\nНе совпали ({len(failed)}): {', '.join(failed)}")
+        return 1
+    print(f"\nВсе {len(cases) * len(font_modes)} строк SVG совпадают побайтно")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
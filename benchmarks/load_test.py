@@ -0,0 +1,332 @@
+# benchmarks/load_test.py
+# Нагрузочный тест /generate: воспроизведение записанных запросов или синтетическая нагрузка
+
+"""
+Отправляет POST /generate с заданной параллельностью и считает:
+- пропускную способность (запросов/с), задержку p50/p95/p99, долю ошибок по кодам ответа;
+- долю ответов из кэша PDF (заголовок X-Cache);
+- загрузку пула рендеринга: раз в --sample-interval опрашивается /health
+  (занятые воркеры / всего, глубина очереди).
+
+Источник запросов:
+- --replay файл.jsonl — записанные запросы (журнал запросов сервера, по строке JSON на запрос).
+  Из строки берутся поля "values" (+ "filename") или "form"; строка без них считается полями формы;
+- иначе — синтетические запросы из dropdown_fields / checkbox_fields / numeric_fields (--seed).
+
+Цель:
+- по умолчанию — приложение в этом же процессе через Flask test client (app.server.app);
+- --url http://127.0.0.1:5000 — запущенный сервер (любой режим: dev, production, ASGI).
+
+Результаты (--output) сохраняются в JSON с меткой --label, чтобы сравнивать режимы сервера.
+
+Примеры:
+    python benchmarks/load_test.py --requests 200 --concurrency 8
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --replay logs/requests.jsonl --concurrency 32 --label gunicorn
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv  # noqa: E402
+
+from configs.config import ALL_BLOCKS, checkbox_fields, dropdown_fields, numeric_fields  # noqa: E402
+
+load_dotenv()
+
+
+def values_to_form(values: dict) -> dict:
+    """
+    Значения после обработки чекбоксов (True/False) -> поля HTML-формы:
+    включённый чекбокс передаётся как "on", выключенный не передаётся.
+    """
+    form = {}
+    for key, value in values.items():
+        if key in checkbox_fields or isinstance(value, bool):
+            if value is True or str(value).strip().lower() in ("on", "да", "true", "1"):
+                form[key] = "on"
+            continue
+        if value is not None:
+            form[key] = str(value)
+    return form
+
+
+def load_replay(path) -> list[dict]:
+    """Читает записанные запросы (JSONL) и возвращает список полей формы."""
+    payloads = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "values" in record:
+                form = values_to_form(record["values"])
+                if record.get("filename"):
+                    form["filename"] = record["filename"]
+            elif "form" in record:
+                form = {key: str(value) for key, value in record["form"].items()}
+            elif "ts" in record:
+                continue  # запись журнала без входных данных (например, ответ 401)
+            else:
+                form = values_to_form(record)
+            payloads.append(form)
+    if not payloads:
+        raise SystemExit(f"В {path} нет записанных запросов")
+    return payloads
+
+
+def synthetic_payloads(count, seed) -> list[dict]:
+    """
+    Синтетические запросы: случайные значения выпадающих списков и чекбоксов,
+    числовые поля — в пределах ±20 % от значения по умолчанию, длина каркаса — 1000..10000 мм.
+    """
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(count):
+        values = {key: value[1] for key, value in ALL_BLOCKS.items()}
+        for field, options in dropdown_fields.items():
+            values[field] = rng.choice(options)
+        for field in checkbox_fields:
+            values[field] = rng.random() < 0.5
+        for field in numeric_fields:
+            try:
+                default = float(values.get(field))
+            except (TypeError, ValueError):
+                continue
+            values[field] = str(round(default * rng.uniform(0.8, 1.2)))
+        values["frame_length_mm"] = str(rng.randrange(1000, 10001, 10))
+        payloads.append(values_to_form(values))
+    return payloads
+
+
+class InProcessTarget:
+    """Приложение в этом же процессе через Flask test client."""
+
+    name = "inprocess"
+
+    def __init__(self, token):
+        from app.server import app
+
+        self._app = app
+        self._headers = {"Authorization": f"Bearer {token}"}
+        self._local = threading.local()
+
+    def _client(self):
+        # Отдельный клиент на поток: test client не рассчитан на одновременные запросы
+        if not hasattr(self._local, "client"):
+            self._local.client = self._app.test_client()
+        return self._local.client
+
+    def post_generate(self, form):
+        response = self._client().post("/generate", data=form, headers=self._headers)
+        return response.status_code, response.headers.get("X-Cache"), len(response.data)
+
+    def get_json(self, path):
+        return self._client().get(path).get_json()
+
+
+class HttpTarget:
+    """Запущенный сервер по HTTP (urllib, без сторонних зависимостей)."""
+
+    name = "http"
+
+    def __init__(self, base_url, token, timeout):
+        self.base_url = base_url.rstrip("/")
+        self._headers = {"Authorization": f"Bearer {token}"}
+        self.timeout = timeout
+
+    def post_generate(self, form):
+        request = urllib.request.Request(
+            self.base_url + "/generate",
+            data=urllib.parse.urlencode(form).encode("utf-8"),
+            headers=self._headers,
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.headers.get("X-Cache"), len(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, None, len(e.read())
+        except (urllib.error.URLError, OSError):
+            return 0, None, 0  # соединение не установлено / таймаут
+
+    def get_json(self, path):
+        with urllib.request.urlopen(self.base_url + path, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+
+class SaturationSampler(threading.Thread):
+    """Периодически опрашивает /health и собирает загрузку пула рендеринга."""
+
+    def __init__(self, target, interval):
+        super().__init__(name="saturation-sampler", daemon=True)
+        self.target = target
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                pool = self.target.get_json("/health")["render_pool"]
+            except Exception:  # noqa: BLE001
+                continue
+            self.samples.append((pool["busy"] / max(1, pool["workers"]), pool["queued"]))
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def summary(self) -> dict:
+        if not self.samples:
+            return {"samples": 0}
+        busy = [sample[0] for sample in self.samples]
+        queued = [sample[1] for sample in self.samples]
+        return {
+            "samples": len(self.samples),
+            "busy_ratio_mean": round(statistics.fmean(busy), 3),
+            "busy_ratio_max": round(max(busy), 3),
+            "queue_mean": round(statistics.fmean(queued), 2),
+            "queue_max": max(queued),
+        }
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(target, payloads, total, concurrency, duration, bust_cache):
+    """
+    Замкнутый цикл: concurrency потоков отправляют запросы подряд, пока не отправлено
+    total запросов (или не истекло duration секунд). Возвращает список (latency, status, cache, bytes).
+    """
+    results = []
+    lock = threading.Lock()
+    counter = iter(range(total if total else 10 ** 12))
+    deadline = time.monotonic() + duration if duration else None
+
+    def worker():
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            form = dict(payloads[index % len(payloads)])
+            if bust_cache:
+                # Уникальное поле основной надписи — другой хеш параметров, кэш PDF не срабатывает
+                form["designer"] = f"load-{index}"
+            start = time.perf_counter()
+            status, cache, size = target.post_generate(form)
+            latency = time.perf_counter() - start
+            with lock:
+                results.append((latency, status, cache, size))
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load") as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    return results
+
+
+def summarize(results, elapsed) -> dict:
+    latencies = sorted(result[0] for result in results)
+    statuses = Counter(result[1] for result in results)
+    errors = sum(count for status, count in statuses.items() if status != 200)
+    cache = Counter(result[2] for result in results if result[1] == 200)
+    ok = statuses.get(200, 0)
+    return {
+        "requests": len(results),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            name: round(value * 1000, 1) if value is not None else None
+            for name, value in (
+                ("p50", percentile(latencies, 0.50)),
+                ("p95", percentile(latencies, 0.95)),
+                ("p99", percentile(latencies, 0.99)),
+                ("max", latencies[-1] if latencies else None),
+            )
+        },
+        "error_rate": round(errors / len(results), 4) if results else 0.0,
+        "status_codes": {str(status): count for status, count in sorted(statuses.items())},
+        "cache_hit_ratio": round(cache.get("HIT", 0) / ok, 3) if ok else 0.0,
+        "mean_response_bytes": round(statistics.fmean(result[3] for result in results)) if results else 0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест POST /generate")
+    parser.add_argument("--url", help="адрес запущенного сервера (по умолчанию — приложение в этом процессе)")
+    parser.add_argument("--token", default=os.getenv("SECRET_TOKEN", ""), help="токен (по умолчанию SECRET_TOKEN)")
+    parser.add_argument("--replay", help="JSONL с записанными запросами")
+    parser.add_argument("--synthetic", type=int, default=50, help="кол-во разных синтетических запросов")
+    parser.add_argument("--seed", type=int, default=1, help="seed синтетической нагрузки")
+    parser.add_argument("--requests", type=int, default=100, help="всего запросов (0 — без ограничения, до --duration)")
+    parser.add_argument("--duration", type=float, default=0, help="ограничение по времени, сек")
+    parser.add_argument("--concurrency", type=int, default=4, help="одновременных клиентов")
+    parser.add_argument("--bust-cache", action="store_true", help="делать каждый запрос уникальным (без попаданий в кэш)")
+    parser.add_argument("--sample-interval", type=float, default=0.5, help="период опроса /health, сек")
+    parser.add_argument("--timeout", type=float, default=120, help="таймаут HTTP-запроса, сек")
+    parser.add_argument("--label", default="", help="метка режима сервера для сравнения результатов")
+    parser.add_argument("--output", help="сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    if not args.requests and not args.duration:
+        parser.error("нужно задать --requests или --duration")
+
+    payloads = load_replay(args.replay) if args.replay else synthetic_payloads(args.synthetic, args.seed)
+    target = HttpTarget(args.url, args.token, args.timeout) if args.url else InProcessTarget(args.token)
+
+    # Первый запрос — вне замеров (запуск пула в режиме inprocess, установка соединений)
+    target.post_generate(payloads[0])
+
+    sampler = SaturationSampler(target, args.sample_interval)
+    sampler.start()
+    started = time.perf_counter()
+    results = run_load(target, payloads, args.requests, args.concurrency, args.duration, args.bust_cache)
+    elapsed = time.perf_counter() - started
+    sampler.stop()
+
+    report = {
+        "meta": {
+            "label": args.label,
+            "target": args.url or target.name,
+            "source": args.replay or f"synthetic:{args.synthetic}:seed{args.seed}",
+            "concurrency": args.concurrency,
+            "bust_cache": args.bust_cache,
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        **summarize(results, elapsed),
+        "worker_saturation": sampler.summary(),
+    }
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -42,6 +42,30 @@ DEFAULT_FILENAME = "drawing"
 # Директория для хранения ресурсов, например, иконок
 ASSETS_DIR = "assets"
 
+# Подключение шрифта ГОСТ в SVG: 'subset' — только символы, использованные в чертеже
+# (нужен fontTools, без него — как 'embed'), 'embed' — весь файл шрифта, 'link' — ссылкой на файл
+FONT_EMBED_MODE = "subset"
+# Сколько подмножеств шрифта (по наборам символов) хранить в памяти процесса
+FONT_SUBSET_CACHE_SIZE = 64
+# Подключение шрифта в SVG, которое идёт только в PDF (не в отладочный просмотр): CairoSVG не использует
+# @font-face и берёт шрифт, установленный в системе (font_installer_linux.py), поэтому 'system' —
+# без встроенного шрифта: меньше SVG и разбора CSS. FONT_EMBED_MODE — чтобы встраивать как в SVG
+PDF_FONT_MODE = "system"
+# Вывод в PDF по умолчанию (поле render_backend в параметрах чертежа меняет его для запроса):
+# 'svg' — строка SVG через CairoSVG, 'cairo' — список отображения чертежа (drawers/display_list.py),
+# нарисованный сразу на PDF-поверхности (без SVG и его разбора).
+# 'cairo' экспериментальный: оставьте 'svg', пока tests/test_render_backends.py не выполняется
+# регулярно в окружении с libcairo (без неё тест пропускается)
+RENDER_BACKEND = "svg"
+# Допустимые значения render_backend (другие сервер отклоняет с ответом 400)
+RENDER_BACKENDS = ("svg", "cairo")
+# Оптимизация списка отображения (render_backend='cairo') перед выводом: 'dedupe' — повторы фигур,
+# 'cull' — фигуры вне листа, 'simplify' — промежуточные точки на прямой (отклонение до TOLERANCE, px).
+# По умолчанию выключена: 'dedupe' меняет растр — сглаженные края повторно нарисованной линии
+# темнее, чем у одной (на листе — стойки каркаса); проходы проверяет tests/test_display_list.py
+DISPLAY_LIST_OPTIMIZE = ()
+DISPLAY_LIST_SIMPLIFY_TOLERANCE = 0.01
+
 # Переменные нужные для расчёт, но не отображаются
 
 bottom_thickness_mm = 1 # Толщина донышка, мм
@@ -0,0 +1,200 @@
+# config_server.py
+# Настройки серверного режима (Flask): пул процессов рендеринга и т.п.
+# Значения читаются из переменных окружения (.env), здесь заданы значения по умолчанию.
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_int(name, default):
+    """Читает целое число из переменной окружения, при ошибке возвращает default."""
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
+def _env_float(name, default):
+    """Читает число с плавающей точкой из переменной окружения, при ошибке возвращает default."""
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+def _env_bool(name, default):
+    """Читает логический флаг из переменной окружения ("1", "true", "yes", "on" — True)."""
+    raw = os.getenv(name, "").strip().lower()
+    if not raw:
+        return default
+    return raw in ("1", "true", "yes", "on", "да")
+
+
+def _available_cores():
+    """Кол-во ядер, доступных процессу (с учётом привязки к CPU), а не всех ядер машины."""
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except AttributeError:  # Windows, macOS
+        return os.cpu_count() or 1
+
+
+# Режим запуска run.py: "dev" — встроенный сервер Flask, "production" — gunicorn
+# (несколько процессов, приложение загружено до fork), "asgi" — ASGI-приложение app.asgi (uvicorn)
+SERVER_MODE = os.getenv("SERVER_MODE", "dev").strip().lower()
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = _env_int("SERVER_PORT", 5000)
+
+# Режим production (configs/gunicorn_conf.py)
+# Кол-во процессов-обработчиков HTTP (0 — по числу доступных ядер, но не больше 8):
+# рендеринг идёт в пуле процессов, обработчики в основном ждут, много их не нужно
+SERVER_WORKERS = _env_int("SERVER_WORKERS", 0) or min(8, _available_cores())
+# Потоков на процесс-обработчик (gthread): столько запросов процесс ждёт одновременно
+SERVER_THREADS = _env_int("SERVER_THREADS", 16)
+# Сколько держать keep-alive соединение между запросами, сек
+SERVER_KEEPALIVE = _env_int("SERVER_KEEPALIVE", 5)
+# Процесс-обработчик, не отвечающий дольше этого времени, перезапускается, сек
+SERVER_TIMEOUT = _env_int("SERVER_TIMEOUT", 120)
+# Сколько ждать завершения текущих запросов при перезапуске/остановке, сек
+SERVER_GRACEFUL_TIMEOUT = _env_int("SERVER_GRACEFUL_TIMEOUT", 90)
+# Перезапуск процесса-обработчика после N запросов (0 — не перезапускать)
+SERVER_MAX_REQUESTS = _env_int("SERVER_MAX_REQUESTS", 0)
+
+# ASGI-режим: потоки для маршрутов, которые выполняются синхронным Flask-приложением
+# (/jobs, /generate/batch, /generate/multipage, static); /generate, / и health-маршруты
+# ждут рендеринг в цикле событий без отдельного потока на запрос
+ASGI_WSGI_THREADS = _env_int("ASGI_WSGI_THREADS", 32)
+# ASGI-режим: потоки для коротких блокирующих шагов /generate, / и health-маршрутов
+# (проверка настроек, лимиты, кэш PDF на диске, журнал запросов, чтение PDF для ответа)
+ASGI_REQUEST_THREADS = _env_int("ASGI_REQUEST_THREADS", 16)
+
+# Пул процессов рендеринга
+# Кол-во долгоживущих процессов-воркеров (0 — по числу доступных ядер).
+# В режиме production это общее число на сервер: оно делится между процессами-обработчиками
+RENDER_WORKERS = _env_int("RENDER_WORKERS", 0) or _available_cores()
+
+# Прогревать воркеры при старте (рендер чертежа со значениями по умолчанию)
+RENDER_WARMUP = _env_bool("RENDER_WARMUP", True)
+
+# Воркер, завершившийся до готовности (ошибка импорта или прогрева), перезапускается с паузой:
+# RENDER_RESPAWN_DELAY сек, удваивается с каждой неудачей подряд до RENDER_RESPAWN_MAX_DELAY.
+# После RENDER_START_MAX_FAILURES неудач подряд пул считается неисправным: задания получают ошибку
+RENDER_RESPAWN_DELAY = _env_float("RENDER_RESPAWN_DELAY", 0.5)
+RENDER_RESPAWN_MAX_DELAY = _env_float("RENDER_RESPAWN_MAX_DELAY", 30)
+RENDER_START_MAX_FAILURES = _env_int("RENDER_START_MAX_FAILURES", 5)
+# Макс. время запуска пула (импорт и прогрев воркеров), сек: дольше — запуск завершается ошибкой
+RENDER_START_TIMEOUT = _env_float("RENDER_START_TIMEOUT", 300)
+
+# Макс. кол-во заданий, ожидающих свободного воркера (сверх — ответ 429 с Retry-After).
+# В режиме production — в каждом процессе-обработчике (очередь у каждого своя)
+RENDER_QUEUE_SIZE = _env_int("RENDER_QUEUE_SIZE", 4 * RENDER_WORKERS)
+
+# Классы приоритета заданий: "interactive" (/generate, /jobs) всегда выбирается из очереди
+# раньше "bulk" (/generate/batch, /generate/multipage). Внутри класса задания разных
+# клиентов (токен / IP) выдаются по очереди, а не в порядке поступления.
+# В режиме production у каждого процесса-обработчика свои пул и очередь, поэтому приоритеты, очерёдность
+# клиентов и оба лимита ниже действуют внутри процесса, а не на весь сервер: клиент, чьи запросы
+# попадают в N обработчиков, может держать до N × RENDER_CLIENT_MAX_QUEUED ожидающих заданий,
+# а задания bulk — занять до N × RENDER_BULK_MAX_WORKERS воркеров (по умолчанию в каждом процессе
+# один воркер остаётся для интерактивных запросов).
+# Макс. воркеров, одновременно занятых заданиями bulk (0 — все, кроме одного:
+# один воркер всегда остаётся для интерактивных запросов)
+RENDER_BULK_MAX_WORKERS = _env_int("RENDER_BULK_MAX_WORKERS", 0)
+# Макс. ожидающих заданий одного клиента в классе (0 — четверть RENDER_QUEUE_SIZE)
+RENDER_CLIENT_MAX_QUEUED = _env_int("RENDER_CLIENT_MAX_QUEUED", 0)
+# Целевое время ожидания в очереди (SLO), сек: если прогноз ожидания нового задания больше,
+# оно сразу отклоняется ответом 429, а не ждёт заведомо дольше допустимого (0 — без ограничения)
+RENDER_QUEUE_SLO = {
+    "interactive": _env_float("RENDER_SLO_INTERACTIVE", 15),
+    "bulk": _env_float("RENDER_SLO_BULK", 0),
+}
+
+# Лимиты времени на этапы рендеринга, сек (0 — без ограничения).
+# При превышении воркер принудительно завершается и заменяется новым, клиент получает 504.
+# Для многостраничного PDF лимит этапа "pdf" умножается на число страниц.
+RENDER_STAGE_TIMEOUTS = {
+    "calculations": _env_float("RENDER_TIMEOUT_CALCULATIONS", 10),
+    "svg": _env_float("RENDER_TIMEOUT_SVG", 30),
+    "pdf": _env_float("RENDER_TIMEOUT_PDF", 60),
+}
+
+# Асинхронные задания (/jobs)
+# Сколько секунд хранить завершённое задание и его результат
+JOBS_TTL_SECONDS = _env_int("JOBS_TTL_SECONDS", 3600)
+# Сколько завершённых заданий хранить не дольше TTL: сверх лимита удаляются давно не запрошенные
+JOBS_MAX_COMPLETED = _env_int("JOBS_MAX_COMPLETED", 100)
+
+# Кэш готовых PDF (ключ — хеш параметров чертежа)
+PDF_CACHE_ENABLED = _env_bool("PDF_CACHE_ENABLED", True)
+# Лимит кэша в памяти, МБ
+PDF_CACHE_MEMORY_MB = _env_int("PDF_CACHE_MEMORY_MB", 64)
+# Лимит кэша на диске (static/downloads/cache), МБ
+PDF_CACHE_DISK_MB = _env_int("PDF_CACHE_DISK_MB", 1024)
+
+# PDF в памяти: воркер возвращает PDF байтами, ответ отдаётся без чтения/записи диска
+RENDER_IN_MEMORY = _env_bool("RENDER_IN_MEMORY", True)
+# Архивировать PDF в static/downloads/YYYY-MM-DD (в режиме в памяти — фоновой записью)
+PDF_ARCHIVE = _env_bool("PDF_ARCHIVE", True)
+
+# Журнал запросов /generate (JSON-строки для воспроизведения и аналитики)
+CAPTURE_ENABLED = _env_bool("CAPTURE_ENABLED", True)
+# Путь к файлу (относительный — от корня проекта)
+CAPTURE_FILE = os.getenv("CAPTURE_FILE", "logs/requests.jsonl")
+# Ротация: по размеру (МБ) и по времени (часы); 0 — без ротации по этому признаку
+CAPTURE_MAX_MB = _env_int("CAPTURE_MAX_MB", 50)
+CAPTURE_ROTATE_HOURS = _env_int("CAPTURE_ROTATE_HOURS", 24)
+# Сколько старых частей хранить и сжимать ли их gzip
+CAPTURE_BACKUPS = _env_int("CAPTURE_BACKUPS", 30)
+CAPTURE_COMPRESS = _env_bool("CAPTURE_COMPRESS", True)
+
+# Пакетная генерация (/generate/batch): макс. кол-во чертежей в одном запросе
+BATCH_MAX_ITEMS = _env_int("BATCH_MAX_ITEMS", 200)
+
+# Белый список IP: кроме ALLOWED_IPS (через запятую) — файл с записью (адрес или подсеть CIDR,
+# IPv4/IPv6) на строку; относительный путь — от корня проекта, пусто — без файла.
+# Файл перечитывается без перезапуска: его изменение проверяется не чаще раза в
+# ALLOWED_IPS_RELOAD_SECONDS секунд
+ALLOWED_IPS_FILE = os.getenv("ALLOWED_IPS_FILE", "")
+ALLOWED_IPS_RELOAD_SECONDS = _env_float("ALLOWED_IPS_RELOAD_SECONDS", 5)
+# Сколько последних решений «IP разрешён / запрещён» кэшировать
+IP_DECISION_CACHE_SIZE = _env_int("IP_DECISION_CACHE_SIZE", 4096)
+
+# Страница формы (GET /): собирается один раз и хранится в памяти в сжатых вариантах (gzip, brotli).
+# Сколько секунд браузер может не перепроверять её (0 — проверка по ETag при каждой загрузке)
+FORM_CACHE_MAX_AGE = _env_int("FORM_CACHE_MAX_AGE", 0)
+
+# Перезагрузка настроек без перезапуска (app.runtime_config): .env (ALLOWED_IPS, SECRET_TOKEN),
+# TOKENS_FILE, configs/config.py. Изменение файлов проверяется не чаще раза в
+# CONFIG_RELOAD_SECONDS секунд (отрицательное значение — только по сигналу SIGHUP)
+CONFIG_RELOAD_SECONDS = _env_float("CONFIG_RELOAD_SECONDS", 5)
+
+# Реестр токенов API: JSON-массив с хешами SHA-256 и лимитами (относительный путь — от корня проекта).
+# SECRET_TOKEN, если задан, тоже действует (под именем "default")
+TOKENS_FILE = os.getenv("TOKENS_FILE", "configs/tokens.json")
+
+# Размер таблицы метрик /metrics в разделяемой памяти (наборов меток, для gauge — на каждый процесс)
+METRICS_SLOTS = _env_int("METRICS_SLOTS", 4096)
+
+# Ограничение частоты запросов и процессорного времени рендеринга (token bucket)
+# для эндпоинтов генерации. Состояние общее для всех процессов-обработчиков
+RATE_LIMIT_ENABLED = _env_bool("RATE_LIMIT_ENABLED", True)
+# Размер таблицы ведер (ключей «токен» / «IP», одновременно отслеживаемых)
+RATE_LIMIT_SLOTS = _env_int("RATE_LIMIT_SLOTS", 4096)
+# Лимиты токена по умолчанию: запросов в секунду и запас запросов,
+# CPU-секунд рендеринга в минуту и запас CPU-секунд
+RATE_LIMIT_RPS = _env_float("RATE_LIMIT_RPS", 5)
+RATE_LIMIT_BURST = _env_float("RATE_LIMIT_BURST", 20)
+RATE_LIMIT_CPU_PER_MINUTE = _env_float("RATE_LIMIT_CPU_PER_MINUTE", 120)
+RATE_LIMIT_CPU_BURST = _env_float("RATE_LIMIT_CPU_BURST", 240)
+# Лимиты одного IP клиента (действуют вместе с лимитами токена)
+RATE_LIMIT_IP_RPS = _env_float("RATE_LIMIT_IP_RPS", 2)
+RATE_LIMIT_IP_BURST = _env_float("RATE_LIMIT_IP_BURST", 10)
+RATE_LIMIT_IP_CPU_PER_MINUTE = _env_float("RATE_LIMIT_IP_CPU_PER_MINUTE", 60)
+RATE_LIMIT_IP_CPU_BURST = _env_float("RATE_LIMIT_IP_CPU_BURST", 120)
@@ -0,0 +1,86 @@
+# gunicorn_conf.py
+# Настройки режима production: gunicorn, несколько процессов-обработчиков HTTP,
+# приложение загружается в главном процессе до fork.
+#
+# Запуск:
+#     python run.py --mode production
+#     gunicorn -c configs/gunicorn_conf.py app.server:app
+#
+# Перезапуск без обрыва соединений (новые процессы-обработчики, текущие запросы дорабатывают):
+#     kill -HUP <pid главного процесса>
+# При preload_app код приложения загружен в главном процессе — чтобы подхватить новый код,
+# нужна замена главного процесса: kill -USR2 <pid>, затем kill -TERM <старый pid>.
+
+import math
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from configs.config_server import (  # noqa: E402
+    SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_THREADS, SERVER_KEEPALIVE, SERVER_TIMEOUT,
+    SERVER_GRACEFUL_TIMEOUT, SERVER_MAX_REQUESTS, RENDER_WORKERS,
+)
+
+bind = f"{SERVER_HOST}:{SERVER_PORT}"
+workers = SERVER_WORKERS
+# Потоки: запрос /generate ждёт пул рендеринга, а не занимает CPU
+worker_class = "gthread"
+threads = SERVER_THREADS
+keepalive = SERVER_KEEPALIVE
+timeout = SERVER_TIMEOUT
+graceful_timeout = SERVER_GRACEFUL_TIMEOUT
+max_requests = SERVER_MAX_REQUESTS
+max_requests_jitter = SERVER_MAX_REQUESTS // 10
+
+# Импорт Flask, svgwrite, cairosvg, numpy и конфигов — один раз в главном процессе,
+# процессы-обработчики получают их через fork (copy-on-write)
+preload_app = True
+
+# Журнал gunicorn — в stdout/stderr, как и логгер приложения
+accesslog = "-"
+errorlog = "-"
+
+# Доля пула рендеринга на один процесс-обработчик: всего процессов рендеринга ≈ RENDER_WORKERS
+RENDER_WORKERS_PER_PROCESS = max(1, math.ceil(RENDER_WORKERS / max(1, workers)))
+
+
+def when_ready(server):
+    server.log.info(
+        f"Production: {workers} обработчиков × {threads} потоков, "
+        f"пул рендеринга {RENDER_WORKERS_PER_PROCESS} процессов на обработчик"
+    )
+
+
+def post_fork(server, worker):
+    """
+    Запуск пула рендеринга в процессе-обработчике. В главном процессе пул не запускается:
+    потоки и каналы пула не переживают fork.
+    Приложение загружено в главном процессе заранее (preload_app), поэтому настройки, изменённые
+    после загрузки, обработчик перечитывает сам — так SIGHUP мастеру применяет новые настройки.
+    """
+    from app.capture import request_capture
+    from app.render_pool import get_render_pool
+    from app.runtime_config import runtime_config
+
+    request_capture.use_process_file(worker.pid)
+    runtime_config.check(force=True)
+    get_render_pool(size=RENDER_WORKERS_PER_PROCESS)
+
+
+def worker_exit(server, worker):
+    """Остановка пула рендеринга и дозапись журнала запросов при завершении обработчика."""
+    from app.capture import request_capture
+    from app.render_pool import shutdown_render_pool
+
+    shutdown_render_pool()
+    request_capture.stop()
+
+
+def child_exit(server, worker):
+    """В главном процессе: gauge завершившегося обработчика (его пул рендеринга) больше не входят в /metrics."""
+    from app.metrics import registry
+
+    registry.forget_process(worker.pid)
@@ -0,0 +1,224 @@
+# drawers/base_sheet.py
+# Постоянная часть листа: строится один раз на процесс, в запросе заполняются только надписи
+
+"""
+BaseSheet — всё, что на листе не зависит от параметров чертежа: маркеры и штриховки (defs),
+примечания (draw_note), линии рамки и постоянные надписи основной надписи, сетка, заголовки
+и номера строк таблицы. Элементы строятся один раз теми же функциями drawers, что рисуют
+лист, и дальше добавляются на холст готовыми.
+
+Надписи, которые зависят от запроса, — слоты: функции (dwg, combined_values, default_values)
+-> [элементы]. Надписи рамки заполняются по заранее построенному индексу
+(title_block_slots: номер надписи -> ключ), значения таблицы — draw_table_values.
+Время заполнения слотов учитывается под шагами draw_title_block и draw_table (как при рисовании
+листа без шаблона), время вывода постоянных частей — под draw_base_sheet.
+
+Вывод на холст:
+- SvgCanvas — постоянные части заранее записаны строками SVG (и символы их текстов собраны),
+  в запросе строки добавляются в буфер как есть, а элементы строятся только для слотов;
+- DisplayList — подряд идущие постоянные элементы заранее записаны в списки отображения
+  и добавляются к чертежу целиком (DisplayList.extend);
+- прочие холсты drawers.canvas (CairoCanvas) получают готовые элементы.
+Элементы шаблона общие для всех чертежей процесса: холсты их не изменяют.
+
+get_base_sheet() строит лист заново, если настройки рамки перезагружены (app.runtime_config).
+"""
+
+import time
+
+from drawers.canvas import Canvas, Element
+from drawers.display_list import DisplayList
+from drawers.drawer_dimenstions import add_arrow_markers, add_hatch_patterns, draw_note
+from drawers.drawer_table import draw_table_grid, draw_table_numbers, draw_table_values, table_group
+from drawers.drawer_title_block import (title_block_lines, title_block_slots, title_block_sources, title_block_text,
+                                        title_block_text_content, title_block_text_count)
+from drawers.svg_canvas import SvgCanvas, start_tag
+from utils.utils_core import stage_timer
+
+
+class _Collector(Canvas):
+    """Холст, который только собирает элементы, добавленные в корень."""
+
+    def __init__(self):
+        super().__init__()
+        self.elements = []
+
+    def emit(self, element):
+        self.elements.append(element)
+
+
+class _Group:
+    """Группа шаблона: элемент с постоянными атрибутами и дочерние части (элементы и слоты)."""
+
+    __slots__ = ("element", "parts")
+
+    def __init__(self, element, parts):
+        self.element = element
+        self.parts = parts
+
+
+def _title_block_slot(i, key):
+    """Слот надписи рамки i, заполняемой значением key."""
+    def fill(dwg, combined_values, default_values):
+        return [title_block_text(dwg, i, title_block_text_content(i, key, combined_values, default_values))]
+    fill.step = "draw_title_block"
+    return fill
+
+
+def _table_values_slot(dwg, combined_values, default_values):
+    """Слот значений таблицы параметров."""
+    values = _Collector()
+    draw_table_values(dwg, values, combined_values)
+    return values.elements
+
+
+_table_values_slot.step = "draw_table"
+
+
+class BaseSheet:
+    """Постоянная часть листа A3 и слоты надписей, зависящих от запроса."""
+
+    def __init__(self):
+        self.sources = title_block_sources()
+        builder = _Collector()
+
+        add_arrow_markers(builder)
+        add_hatch_patterns(builder)
+        self.definitions = list(builder.defs.elements)
+
+        # Части листа в порядке рисования (после видов): примечания, рамка, таблица
+        draw_note(builder)
+        builder.elements.extend(title_block_lines(builder))
+        slots = title_block_slots()
+        for i in range(title_block_text_count()):
+            key = slots.get(i)
+            if key:
+                builder.elements.append(_title_block_slot(i, key))
+            else:
+                builder.add(title_block_text(builder, i, title_block_text_content(i, None, {}, {})))
+
+        table, grid, numbers = table_group(builder), _Collector(), _Collector()
+        draw_table_grid(builder, grid)
+        draw_table_numbers(builder, numbers)
+        builder.elements.append(_Group(table, [*grid.elements, _table_values_slot, *numbers.elements]))
+        self.parts = builder.elements
+
+        self._compile_svg()
+        self._compile_display_list()
+
+    def _compile_svg(self):
+        """Постоянные части -> строки SVG (соседние склеиваются), слоты остаются функциями."""
+        writer = SvgCanvas()
+        chunks = []
+        self.svg_parts = []
+
+        def flush():
+            if chunks:
+                self.svg_parts.append("".join(chunks))
+                chunks.clear()
+
+        def compile_parts(parts):
+            for part in parts:
+                if isinstance(part, Element):
+                    writer.write(part, chunks.append)
+                elif isinstance(part, _Group):
+                    chunks.append(start_tag(part.element) + ">")
+                    compile_parts(part.parts)
+                    chunks.append(f"</{part.element.elementname}>")
+                else:
+                    flush()
+                    self.svg_parts.append(part)
+
+        definitions = []
+        for element in self.definitions:
+            writer.write(element, definitions.append)
+        self.svg_definitions = "".join(definitions)
+        compile_parts(self.parts)
+        flush()
+        self.svg_chars = frozenset(writer.chars)
+
+    def _compile_display_list(self):
+        """Подряд идущие постоянные элементы верхнего уровня -> списки отображения."""
+        self.display_parts = []
+        for part in self.parts:
+            if isinstance(part, Element):
+                if not self.display_parts or not isinstance(self.display_parts[-1], DisplayList):
+                    self.display_parts.append(DisplayList())
+                self.display_parts[-1].add(part)
+            else:
+                self.display_parts.append(part)
+
+    def add_defs(self, dwg):
+        """Маркеры и штриховки в defs холста."""
+        if isinstance(dwg, SvgCanvas):
+            dwg.defs.elements.append(self.svg_definitions)
+            return
+        for element in self.definitions:
+            dwg.defs.add(element)
+
+    def draw(self, dwg, combined_values: dict, default_values: dict, timings=None):
+        """
+        Примечания, рамка и таблица с надписями из combined_values.
+        timings (dict, optional): Сюда добавляется время draw_title_block и draw_table (слоты)
+            и draw_base_sheet (постоянные части), сек.
+        """
+        started = time.perf_counter()
+        slot_timings = {} if timings is not None else None
+        self._draw(dwg, combined_values, default_values, slot_timings)
+        if timings is not None:
+            for step, seconds in slot_timings.items():
+                timings[step] = timings.get(step, 0.0) + seconds
+            base_seconds = time.perf_counter() - started - sum(slot_timings.values())
+            timings["draw_base_sheet"] = timings.get("draw_base_sheet", 0.0) + base_seconds
+
+    def _draw(self, dwg, combined_values, default_values, timings):
+        if isinstance(dwg, SvgCanvas):
+            dwg.chars.update(self.svg_chars)
+            for part in self.svg_parts:
+                if isinstance(part, str):
+                    dwg.add_fragment(part)
+                else:
+                    for element in self._fill_slot(part, dwg, combined_values, default_values, timings):
+                        dwg.emit(element)
+            return
+        if isinstance(dwg, DisplayList):
+            for part in self.display_parts:
+                if isinstance(part, DisplayList):
+                    dwg.extend(part)
+                else:
+                    for element in self._fill(dwg, [part], combined_values, default_values, timings):
+                        dwg.add(element)
+            return
+        for element in self._fill(dwg, self.parts, combined_values, default_values, timings):
+            dwg.add(element)
+
+    @staticmethod
+    def _fill_slot(slot, dwg, combined_values, default_values, timings):
+        """Элементы слота; время заполнения — под шагом слота (slot.step)."""
+        with stage_timer(timings, slot.step):
+            return slot(dwg, combined_values, default_values)
+
+    def _fill(self, dwg, parts, combined_values, default_values, timings):
+        """Элементы частей: постоянные — как есть, группы — копией с заполненными слотами."""
+        for part in parts:
+            if isinstance(part, Element):
+                yield part
+            elif isinstance(part, _Group):
+                group = Element(part.element.elementname)
+                group.attribs = part.element.attribs
+                group.elements = list(self._fill(dwg, part.parts, combined_values, default_values, timings))
+                yield group
+            else:
+                yield from self._fill_slot(part, dwg, combined_values, default_values, timings)
+
+
+_base_sheet = None
+
+
+def get_base_sheet() -> BaseSheet:
+    """BaseSheet процесса; строится при первом вызове и после перезагрузки настроек рамки."""
+    global _base_sheet
+    sources = title_block_sources()
+    if _base_sheet is None or any(old is not new for old, new in zip(_base_sheet.sources, sources)):
+        _base_sheet = BaseSheet()
+    return _base_sheet
@@ -0,0 +1,707 @@
+# drawers/cairo_canvas.py
+# Прямой вывод чертежа на поверхность cairo (PDF, PNG) — без SVG-строки и её разбора
+
+"""
+CairoCanvas — холст с API svgwrite.Drawing (drawers.canvas), который рисует элементы
+на контексте cairocffi в момент их добавления в корень (dwg.add). Модули drawers рисуют
+на нём без изменений: те же координаты, преобразования, маркеры, штриховки и шрифты.
+
+Правила вывода повторяют CairoSVG (cairosvg.surface.Surface.draw, модули path, shapes,
+text и defs), которым SVG-вариант переводит чертёж в PDF:
+- наследование атрибутов (всё, кроме NOT_INHERITED_ATTRIBUTES), заливка по умолчанию
+  чёрная, обводка — нет, stroke-miterlimit 4, font-size по умолчанию 12pt;
+- дуги путей, вершины и углы маркеров, обрезка маркера по его viewBox;
+- текст — по буквам: выравнивание text-anchor и dominant-baseline по размерам строки
+  узла, позиции x/y/dx/dy, пропуск пробелов; шрифт выбирается по имени (select_font_face),
+  то есть берётся установленный в системе, как и в PDF через CairoSVG;
+- паттерн штриховки (patternUnits="userSpaceOnUse") — плитка SVGSurface в pt с повтором,
+  которая строится заново для каждой заливки, как в cairosvg.defs.draw_pattern.
+Чего нет в drawers (фильтры, маски, градиенты, textPath, use, image), здесь тоже нет.
+
+Отличия от CairoSVG не влияют на изображение: прозрачные заливки и обводки не выводятся,
+разбор преобразований и шрифты кэшируются на холст/процесс.
+"""
+
+import re
+from math import pi, radians
+
+import cairocffi as cairo
+from cairosvg.colors import color
+from cairosvg.helpers import point_angle, rotate
+
+from drawers.canvas import Canvas, parse_transform, path_tokens, size, sizes
+
+# Разрешение, с которым CairoSVG переводит единицы SVG (px) в точки PDF: 1 px = 0.75 pt
+PT_PER_PX = 72 / 96
+
+# Атрибуты, которые дочерние элементы не наследуют (как cairosvg.parser.NOT_INHERITED_ATTRIBUTES)
+NOT_INHERITED_ATTRIBUTES = frozenset((
+    "clip", "clip-path", "display", "filter", "height", "id", "mask", "opacity", "overflow",
+    "rotate", "stop-color", "stop-opacity", "style", "transform", "transform-origin", "viewBox",
+    "width", "x", "y", "dx", "dy", "href",
+))
+
+# Элементы, которые рисуются только по ссылке (url(#id)) или не рисуются вовсе
+INVISIBLE_TAGS = frozenset(("defs", "style", "marker", "pattern", "clipPath"))
+
+SHAPE_TAGS = frozenset(("circle", "ellipse", "line", "path", "polygon", "polyline", "rect"))
+
+LINE_CAPS = {"round": cairo.LINE_CAP_ROUND, "square": cairo.LINE_CAP_SQUARE}
+LINE_JOINS = {"round": cairo.LINE_JOIN_ROUND, "bevel": cairo.LINE_JOIN_BEVEL}
+
+_URL = re.compile(r"url\(\s*#([^)\s]+)\s*\)")
+
+
+def url_id(value):
+    """id из ссылки url(#id) или None."""
+    if not isinstance(value, str):
+        return None
+    match = _URL.search(value)
+    return match.group(1) if match else None
+
+
+def _white_spaces(text) -> str:
+    """Пробельные символы текста, как в cairosvg.parser.handle_white_spaces (без xml:space)."""
+    if text is None or text == "":
+        return ""
+    text = re.sub("[\n\r]", "", str(text)).replace("\t", " ")
+    return re.sub(" +", " ", text)
+
+
+def text_nodes(element, trailing_space=True, text_root=True):
+    """
+    Текст элемента text/tspan и его потомков после обработки пробелов (как CairoSVG):
+    возвращает (текст, [(потомок, его текст, его потомки), ...], trailing_space).
+    """
+    text = _white_spaces(element.text)
+    if trailing_space:
+        text = text.lstrip(" ")
+    if text:
+        trailing_space = text.endswith(" ")
+    children = []
+    for child in element.elements:
+        child_text, grandchildren, _ = text_nodes(child, trailing_space, text_root=False)
+        trailing_space = child_text.endswith(" ")
+        children.append((child, child_text, grandchildren))
+    if text_root and not children:
+        text = text.rstrip(" ")
+    return text, children, trailing_space
+
+
+def preserve_ratio(width, height, viewbox_width, viewbox_height):
+    """Масштаб и сдвиг viewBox при preserveAspectRatio="xMidYMid meet" (как у CairoSVG)."""
+    scale_x = width / viewbox_width if viewbox_width > 0 else 1
+    scale_y = height / viewbox_height if viewbox_height > 0 else 1
+    scale = min(scale_x, scale_y)
+    return scale, (width / scale - viewbox_width) / 2, (height / scale - viewbox_height) / 2
+
+
+def page_size(sheet_size) -> tuple[float, float]:
+    """Размер листа в px (единицах SVG) по паре длин, например ("420mm", "297mm")."""
+    return size(sheet_size[0]), size(sheet_size[1])
+
+
+class CairoCanvas(Canvas):
+    """Холст, рисующий элементы на контексте cairo сразу при добавлении в корень."""
+
+    def __init__(self, context):
+        super().__init__()
+        self.context = context
+        self.font_size = size("12pt")
+        self.cursor_position = [0, 0]
+        self.cursor_d_position = [0, 0]
+        # Только построение контура (содержимое clipPath) — без заливки, обводки и маркеров
+        self.stroke_and_fill = True
+        self._font_faces = {}
+        context.set_miter_limit(4)
+
+    @classmethod
+    def page(cls, surface, sheet_size, viewbox, device_units_per_user_units=PT_PER_PX) -> "CairoCanvas":
+        """
+        Холст страницы: единицы SVG (px) -> единицы поверхности (pt у PDF, px у PNG)
+        и viewBox листа, как у корневого <svg overflow="visible"> в CairoSVG.
+        """
+        context = cairo.Context(surface)
+        context.scale(device_units_per_user_units, device_units_per_user_units)
+        width, height = page_size(sheet_size)
+        viewbox_x, viewbox_y, viewbox_width, viewbox_height = sizes(viewbox)
+        scale, translate_x, translate_y = preserve_ratio(width, height, viewbox_width, viewbox_height)
+        context.translate(-viewbox_x * scale, -viewbox_y * scale)
+        context.scale(scale, scale)
+        context.translate(translate_x, translate_y)
+        return cls(context)
+
+    def emit(self, element):
+        self.draw(element, {})
+
+    # Рисование
+
+    def draw(self, element, inherited, text_node=None):
+        """Рисует элемент и его потомков. inherited — наследуемые атрибуты родителя."""
+        tag = element.elementname
+        if tag in INVISIBLE_TAGS:
+            return
+        attribs = element.attribs
+        node = {**inherited, **attribs} if attribs else inherited
+        if ("width" in attribs and size(attribs["width"]) == 0) or \
+                ("height" in attribs and size(attribs["height"]) == 0):
+            return
+        if node.get("display") == "none":
+            return
+
+        context = self.context
+        old_font_size = self.font_size
+        self.font_size = size(node.get("font-size", "12pt"), old_font_size)
+        context.save()
+
+        transform = attribs.get("transform")
+        if transform:
+            matrix = parse_transform(transform)
+            if matrix is None:
+                context.restore()
+                self.font_size = old_font_size
+                return
+            context.transform(cairo.Matrix(*matrix))
+
+        opacity = float(node.get("opacity", 1)) if "opacity" in attribs else 1
+        group_opacity = opacity < 1 and element.elements
+        if group_opacity:
+            context.push_group()
+
+        line_cap = LINE_CAPS.get(node.get("stroke-linecap"))
+        if line_cap is not None:
+            context.set_line_cap(line_cap)
+        line_join = LINE_JOINS.get(node.get("stroke-linejoin"))
+        if line_join is not None:
+            context.set_line_join(line_join)
+        dashes = sizes(node.get("stroke-dasharray"))
+        if dashes and sum(dashes):
+            context.set_dash(dashes, size(node.get("stroke-dashoffset")))
+        if "stroke-miterlimit" in node:
+            context.set_miter_limit(float(node["stroke-miterlimit"]))
+
+        clip_id = url_id(attribs.get("clip-path"))
+        if clip_id is not None:
+            self._clip(clip_id)
+
+        if tag in SHAPE_TAGS:
+            vertices = self._shape(tag, element, attribs)
+            if self.stroke_and_fill:
+                fill_opacity = float(node.get("fill-opacity", 1))
+                stroke_opacity = float(node.get("stroke-opacity", 1))
+                if opacity < 1 and not group_opacity:
+                    fill_opacity *= opacity
+                    stroke_opacity *= opacity
+                if tag != "line":  # у отрезка нулевая площадь: заливка ничего не рисует
+                    self._fill(node, fill_opacity)
+                self._stroke(node, stroke_opacity)
+                if vertices:
+                    self._markers(node, vertices)
+        elif tag in ("text", "tspan"):
+            if text_node is None:
+                text_node = text_nodes(element)
+            text, children, _ = text_node
+            if self.stroke_and_fill:
+                self._text(node, attribs, text)
+            inherited_children = {key: value for key, value in node.items() if key not in NOT_INHERITED_ATTRIBUTES}
+            for child, child_text, grandchildren in children:
+                self.draw(child, inherited_children, (child_text, grandchildren, None))
+        if tag not in ("text", "tspan") and element.elements:
+            inherited_children = {key: value for key, value in node.items() if key not in NOT_INHERITED_ATTRIBUTES}
+            for child in element.elements:
+                self.draw(child, inherited_children)
+
+        if group_opacity:
+            context.pop_group_to_source()
+            context.paint_with_alpha(opacity)
+        if tag == "text":
+            self.cursor_position = [0, 0]
+            self.cursor_d_position = [0, 0]
+        context.restore()
+        self.font_size = old_font_size
+
+    def _set_paint(self, value, opacity) -> bool:
+        """Источник для заливки/обводки: цвет или паттерн url(#id). False — рисовать нечего."""
+        if not value:
+            return False
+        pattern_id = url_id(value)
+        if pattern_id is not None:
+            return self._set_pattern(pattern_id)
+        rgba = color(value, opacity)
+        if rgba[3] == 0:
+            return False
+        self.context.set_source_rgba(*rgba)
+        return True
+
+    def _fill(self, node, opacity):
+        context = self.context
+        context.save()
+        if self._set_paint(node.get("fill", "black"), opacity):
+            if node.get("fill-rule") == "evenodd":
+                context.set_fill_rule(cairo.FILL_RULE_EVEN_ODD)
+            context.fill_preserve()
+        context.restore()
+
+    def _stroke(self, node, opacity):
+        context = self.context
+        context.save()
+        if self._set_paint(node.get("stroke"), opacity):
+            context.set_line_width(size(node.get("stroke-width", "1")))
+            context.stroke()
+        else:
+            context.new_path()
+        context.restore()
+
+    def _clip(self, clip_id):
+        """Обрезка по clipPath: контур его потомков без заливки и обводки."""
+        clip_path = self.definitions.get(clip_id)
+        if clip_path is None:
+            return
+        context = self.context
+        context.save()
+        self.stroke_and_fill = False
+        for child in clip_path.elements:
+            self.draw(child, {})
+        self.stroke_and_fill = True
+        context.restore()
+        context.clip()
+
+    # Фигуры: строят контур и возвращают вершины для маркеров (как в CairoSVG)
+
+    def _shape(self, tag, element, attribs):
+        context = self.context
+        if tag == "line":
+            x1, y1, x2, y2 = (size(attribs.get(key)) for key in ("x1", "y1", "x2", "y2"))
+            context.move_to(x1, y1)
+            context.line_to(x2, y2)
+            angle = point_angle(x1, y1, x2, y2)
+            return [(x1, y1), (pi - angle, angle), (x2, y2)]
+        if tag == "path":
+            return self._path(path_tokens(element.commands or ()))
+        if tag in ("polyline", "polygon"):
+            values = sizes(attribs.get("points"))
+            if len(values) < 2:
+                return None
+            x, y = values[0], values[1]
+            context.move_to(x, y)
+            vertices = [(x, y)]
+            for index in range(2, len(values) - 1, 2):
+                x_old, y_old = x, y
+                x, y = values[index], values[index + 1]
+                angle = point_angle(x_old, y_old, x, y)
+                vertices.append((pi - angle, angle))
+                context.line_to(x, y)
+                vertices.append((x, y))
+            if tag == "polygon":
+                context.close_path()
+            return vertices
+        if tag == "circle":
+            r = size(attribs.get("r"))
+            if r:
+                context.new_sub_path()
+                context.arc(size(attribs.get("cx")), size(attribs.get("cy")), r, 0, 2 * pi)
+            return None
+        if tag == "ellipse":
+            rx, ry = size(attribs.get("rx")), size(attribs.get("ry"))
+            if rx and ry:
+                ratio = ry / rx
+                context.new_sub_path()
+                context.save()
+                context.scale(1, ratio)
+                context.arc(size(attribs.get("cx")), size(attribs.get("cy")) / ratio, rx, 0, 2 * pi)
+                context.restore()
+            return None
+        self._rect(attribs)
+        return None
+
+    def _rect(self, attribs):
+        context = self.context
+        x, y = size(attribs.get("x")), size(attribs.get("y"))
+        width, height = size(attribs.get("width")), size(attribs.get("height"))
+        rx, ry = attribs.get("rx"), attribs.get("ry")
+        if rx and ry is None:
+            ry = rx
+        elif ry and rx is None:
+            rx = ry
+        rx, ry = size(rx), size(ry)
+        if rx == 0 or ry == 0:
+            context.rectangle(x, y, width, height)
+            return
+        rx, ry = min(rx, width / 2), min(ry, height / 2)
+        c1, c2 = 4 * (2 ** .5 - 1) / 3 * rx, 4 * (2 ** .5 - 1) / 3 * ry
+        context.new_path()
+        context.move_to(x + rx, y)
+        context.rel_line_to(width - 2 * rx, 0)
+        context.rel_curve_to(c1, 0, rx, c2, rx, ry)
+        context.rel_line_to(0, height - 2 * ry)
+        context.rel_curve_to(0, c2, c1 - rx, ry, -rx, ry)
+        context.rel_line_to(-width + 2 * rx, 0)
+        context.rel_curve_to(-c1, 0, -rx, -c2, -rx, -ry)
+        context.rel_line_to(0, -height + 2 * ry)
+        context.rel_curve_to(0, -c2, rx - c1, -ry, rx, -ry)
+        context.close_path()
+
+    def _path(self, tokens):
+        """Путь по командам M, L, H, V, A, C, Q, Z (и их относительным вариантам), как cairosvg.path.path."""
+        context = self.context
+        vertices = []
+        current_point = (0.0, 0.0)
+        first_path_point = None
+        letter = last_letter = None
+        index, count = 0, len(tokens)
+
+        def take(n):
+            nonlocal index
+            values = tokens[index:index + n]
+            if len(values) < n or any(isinstance(value, str) for value in values):
+                raise ValueError(f"Некорректные данные пути после команды {letter}")
+            index += n
+            return values
+
+        while index < count:
+            token = tokens[index]
+            if isinstance(token, str):
+                letter = token
+                index += 1
+                if last_letter in (None, "z", "Z") and letter not in "mM":
+                    vertices.append(current_point)
+                    first_path_point = current_point
+            elif letter == "M":
+                letter = "L"
+            elif letter == "m":
+                letter = "l"
+            elif letter is None:
+                raise ValueError("Путь должен начинаться с команды")
+
+            if last_letter in (None, "m", "M", "z", "Z"):
+                first_path_point = None
+            if letter not in ("m", "M", "z", "Z") and first_path_point is None:
+                first_path_point = current_point
+
+            if letter in "aA":
+                x1, y1 = current_point
+                rx, ry, rotation, large, sweep, x3, y3 = take(7)
+                rotation = radians(rotation)
+                if large not in (0, 1) or sweep not in (0, 1):
+                    last_letter = letter
+                    continue
+                if letter == "A":
+                    x3 -= x1
+                    y3 -= y1
+                if not rx or not ry:
+                    # Нулевой радиус — отрезок
+                    angle = point_angle(0, 0, x3, y3)
+                    vertices.append((pi - angle, angle))
+                    context.rel_line_to(x3, y3)
+                else:
+                    context.set_tolerance(0.00001)
+                    radii_ratio = ry / rx
+                    xe, ye = rotate(x3, y3, -rotation)
+                    ye /= radii_ratio
+                    angle = point_angle(0, 0, xe, ye)
+                    xe = (xe ** 2 + ye ** 2) ** .5
+                    rx = max(rx, xe / 2)
+                    xc = xe / 2
+                    yc = (rx ** 2 - xc ** 2) ** .5
+                    if not (bool(large) ^ bool(sweep)):
+                        yc = -yc
+                    arc = context.arc if sweep else context.arc_negative
+                    xe, ye = rotate(xe, 0, angle)
+                    xc, yc = rotate(xc, yc, angle)
+                    angle1 = point_angle(xc, yc, 0, 0)
+                    angle2 = point_angle(xc, yc, xe, ye)
+                    vertices.append((-angle1, -angle2))
+                    context.save()
+                    context.translate(x1, y1)
+                    context.rotate(rotation)
+                    context.scale(1, radii_ratio)
+                    arc(xc, yc, rx, angle1, angle2)
+                    context.restore()
+                current_point = x1 + x3, y1 + y3
+            elif letter in "cC":
+                x1, y1, x2, y2, x3, y3 = take(6)
+                vertices.append((point_angle(x2, y2, x1, y1), point_angle(x2, y2, x3, y3)))
+                if letter == "c":
+                    context.rel_curve_to(x1, y1, x2, y2, x3, y3)
+                    current_point = current_point[0] + x3, current_point[1] + y3
+                else:
+                    context.curve_to(x1, y1, x2, y2, x3, y3)
+                    current_point = x3, y3
+            elif letter in "qQ":
+                x2, y2, x3, y3 = take(4)
+                x1, y1 = (0, 0) if letter == "q" else current_point
+                xq1, yq1 = x2 * 2 / 3 + x1 / 3, y2 * 2 / 3 + y1 / 3
+                xq2, yq2 = x2 * 2 / 3 + x3 / 3, y2 * 2 / 3 + y3 / 3
+                vertices.append((0, 0))
+                if letter == "q":
+                    context.rel_curve_to(xq1, yq1, xq2, yq2, x3, y3)
+                    current_point = current_point[0] + x3, current_point[1] + y3
+                else:
+                    context.curve_to(xq1, yq1, xq2, yq2, x3, y3)
+                    current_point = x3, y3
+            elif letter in "hH":
+                (x,) = take(1)
+                old_x, old_y = current_point
+                if letter == "h":
+                    angle = 0 if x > 0 else pi
+                    x += old_x
+                else:
+                    angle = 0 if x > old_x else pi
+                vertices.append((pi - angle, angle))
+                context.line_to(x, old_y)
+                current_point = x, old_y
+            elif letter in "vV":
+                (y,) = take(1)
+                old_x, old_y = current_point
+                if letter == "v":
+                    angle = pi / 2 if y > 0 else -pi / 2
+                    y += old_y
+                else:
+                    angle = pi / 2 if y > old_y else -pi / 2
+                vertices.append((-angle, angle))
+                context.line_to(old_x, y)
+                current_point = old_x, y
+            elif letter in "lL":
+                x, y = take(2)
+                if letter == "l":
+                    angle = point_angle(0, 0, x, y)
+                    x, y = current_point[0] + x, current_point[1] + y
+                else:
+                    angle = point_angle(current_point[0], current_point[1], x, y)
+                vertices.append((pi - angle, angle))
+                context.line_to(x, y)
+                current_point = x, y
+            elif letter in "mM":
+                x, y = take(2)
+                if letter == "m":
+                    x, y = current_point[0] + x, current_point[1] + y
+                if last_letter and last_letter not in "zZ":
+                    vertices.append(None)
+                context.move_to(x, y)
+                current_point = x, y
+            elif letter in "zZ":
+                if first_path_point:
+                    vertices.append(None)
+                    context.close_path()
+                    current_point = first_path_point
+            else:
+                raise ValueError(f"Команда пути {letter} не поддерживается")
+
+            if letter not in "zZ":
+                vertices.append(current_point)
+            last_letter = letter
+        return vertices
+
+    # Маркеры, паттерны
+
+    def _markers(self, node, vertices):
+        """Маркеры marker-start/mid/end в вершинах фигуры (алгоритм cairosvg.path.draw_markers)."""
+        common = url_id(node.get("marker"))
+        markers = {
+            position: url_id(node[f"marker-{position}"]) if f"marker-{position}" in node else common
+            for position in ("start", "mid", "end")
+        }
+        if not any(markers.values()):
+            return
+        angle1 = angle2 = None
+        position = "start"
+        vertices = list(vertices)
+        while vertices:
+            point = vertices.pop(0)
+            angles = vertices.pop(0) if vertices else None
+            if angles:
+                angle = pi - angles[0] if position == "start" else (angle2 + pi - angles[0]) / 2
+                angle1, angle2 = angles
+            else:
+                angle = angle2
+                position = "end"
+
+            marker = self.definitions.get(markers[position]) if markers[position] else None
+            if marker is not None:
+                self._marker(node, marker, point, angle, position)
+            position = "mid" if angles else "start"
+
+    def _marker(self, node, marker, point, angle, position):
+        context = self.context
+        attribs = marker.attribs
+        scale = 1 if attribs.get("markerUnits") == "userSpaceOnUse" else size(node.get("stroke-width", "1"))
+        width = size(attribs.get("markerWidth", "3"))
+        height = size(attribs.get("markerHeight", "3"))
+        viewbox = sizes(attribs.get("viewBox"))
+        translate_x, translate_y = -size(attribs.get("refX", "0")), -size(attribs.get("refY", "0"))
+        if viewbox:
+            scale_xy = min(width / viewbox[2] if viewbox[2] > 0 else 1, height / viewbox[3] if viewbox[3] > 0 else 1)
+            clip_box = (viewbox[0] + (viewbox[2] - width / scale_xy) / 2,
+                        viewbox[1] + (viewbox[3] - height / scale_xy) / 2,
+                        width / scale_xy, height / scale_xy)
+        else:
+            scale_xy, clip_box = 1, None
+
+        orient = attribs.get("orient", "0")
+        if orient not in ("auto", "auto-start-reverse"):
+            angle = radians(float(orient))
+        elif orient == "auto-start-reverse" and position == "start":
+            angle += pi
+
+        inherited = {key: value for key, value in attribs.items() if key not in NOT_INHERITED_ATTRIBUTES}
+        temp_path = context.copy_path()
+        context.new_path()
+        for child in marker.elements:
+            context.save()
+            context.translate(*point)
+            context.rotate(angle)
+            context.scale(scale)
+            context.scale(scale_xy, scale_xy)
+            context.translate(translate_x, translate_y)
+            if clip_box and attribs.get("overflow", "hidden") in ("hidden", "scroll"):
+                context.rectangle(*clip_box)
+                context.clip()
+            self.draw(child, inherited)
+            context.restore()
+        context.append_path(temp_path)
+
+    def _set_pattern(self, pattern_id) -> bool:
+        """Паттерн штриховки как источник: векторная плитка width×height с повтором и patternTransform."""
+        pattern_element = self.definitions.get(pattern_id)
+        if pattern_element is None:
+            return False
+        # Плитку не кэшируем: пока на поверхность плитки есть ссылка, PDF-вывод cairo
+        # снимает с неё растровый снимок (Image) вместо векторной формы (Form), как у CairoSVG
+        source = self._build_pattern(pattern_element)
+        if source is False:
+            return False
+        transform = pattern_element.attribs.get("patternTransform")
+        if transform:
+            matrix = parse_transform(transform)
+            if matrix is None:
+                return False
+            self.context.transform(cairo.Matrix(*matrix))
+        self.context.set_source(source)
+        return True
+
+    def _build_pattern(self, pattern_element):
+        attribs = pattern_element.attribs
+        if attribs.get("patternUnits") != "userSpaceOnUse":
+            raise ValueError(f"Паттерн {attribs.get('id')}: поддерживается только patternUnits=\"userSpaceOnUse\"")
+        width, height = size(attribs.get("width", 0)), size(attribs.get("height", 0))
+        if not width or not height:
+            return False
+        # Плитка — SVGSurface в pt, как у CairoSVG (defs.draw_pattern): cairo округляет размер
+        # плитки вверх до целых единиц поверхности, поэтому шаг штриховки совпадает с выводом
+        # через SVG только при той же поверхности и тех же единицах (в PDF и в растре)
+        tile = cairo.SVGSurface(None, width * PT_PER_PX, height * PT_PER_PX)
+        tile_context = cairo.Context(tile)
+        tile_context.scale(PT_PER_PX, PT_PER_PX)
+        tile_canvas = CairoCanvas(tile_context)
+        tile_canvas.definitions = self.definitions
+        inherited = {key: value for key, value in attribs.items() if key not in NOT_INHERITED_ATTRIBUTES}
+        for child in pattern_element.elements:
+            tile_canvas.draw(child, inherited)
+        source = cairo.SurfacePattern(tile)
+        source.set_extend(cairo.EXTEND_REPEAT)
+        source.set_matrix(cairo.Matrix(PT_PER_PX, 0, 0, PT_PER_PX, -size(attribs.get("x")), -size(attribs.get("y"))))
+        return source
+
+    # Текст
+
+    def _font_face(self, family, style, weight):
+        key = (family, style, weight)
+        face = self._font_faces.get(key)
+        if face is None:
+            slant = getattr(cairo, f"FONT_SLANT_{str(style).upper()}", cairo.FONT_SLANT_NORMAL)
+            if weight and str(weight).isdigit() and int(weight) >= 550:
+                weight = "bold"
+            weight_value = getattr(cairo, f"FONT_WEIGHT_{str(weight).upper()}", cairo.FONT_WEIGHT_NORMAL)
+            face = self._font_faces[key] = cairo.ToyFontFace(family, slant, weight_value)
+        return face
+
+    def _text(self, node, attribs, text):
+        """Текст узла text/tspan по буквам (как cairosvg.text.text без textPath)."""
+        context = self.context
+        family = str(node.get("font-family") or "sans-serif").split(",")[0].strip("\"' ")
+        context.set_font_face(self._font_face(family, node.get("font-style"), node.get("font-weight")))
+        context.set_font_size(self.font_size)
+        ascent, descent, _, max_x_advance, max_y_advance = context.font_extents()
+        letter_spacing = size(node.get("letter-spacing"))
+        x_bearing, y_bearing, width, height = context.text_extents(text)[:4]
+
+        x, y = sizes(attribs.get("x")), sizes(attribs.get("y"))
+        dx, dy = sizes(attribs.get("dx")), sizes(attribs.get("dy"))
+        rotate_values = [radians(value) for value in sizes(attribs.get("rotate"))] or [0]
+        last_rotate = rotate_values[-1]
+
+        x_align = y_align = 0
+        text_anchor = node.get("text-anchor")
+        if text_anchor == "middle":
+            x_align = -(width / 2 + x_bearing)
+            if letter_spacing and text:
+                x_align -= (len(text) - 1) * letter_spacing / 2
+        elif text_anchor == "end":
+            x_align = -(width + x_bearing)
+            if letter_spacing and text:
+                x_align -= (len(text) - 1) * letter_spacing
+        if max_x_advance > 0 and max_y_advance == 0:
+            display_anchor = node.get("display-anchor")
+            baseline = node.get("dominant-baseline") or node.get("alignment-baseline")
+            if display_anchor == "middle":
+                y_align = -height / 2 - y_bearing
+            elif display_anchor == "top":
+                y_align = -y_bearing
+            elif display_anchor == "bottom":
+                y_align = -height - y_bearing
+            elif baseline in ("central", "middle"):
+                y_align = (ascent + descent) / 2 - descent
+            elif baseline in ("text-before-edge", "before_edge", "top", "hanging", "text-top"):
+                y_align = ascent
+            elif baseline in ("text-after-edge", "after_edge", "bottom", "text-bottom"):
+                y_align = -descent
+
+        if not text:
+            self.cursor_position = [
+                (x[0] if x else self.cursor_position[0]) + (dx[0] if dx else 0),
+                (y[0] if y else self.cursor_position[1]) + (dy[0] if dy else 0),
+            ]
+            return
+
+        fill = node.get("fill", "black"), float(node.get("fill-opacity", 1))
+        stroke = node.get("stroke"), float(node.get("stroke-opacity", 1))
+        stroke_width = size(node.get("stroke-width", "1"))
+        columns = (x, y, dx, dy, rotate_values)
+        cursor_d = self.cursor_d_position
+        for index, letter in enumerate(text):
+            letter_x, letter_y, letter_dx, letter_dy, letter_rotate = (
+                column.pop(0) if column else None for column in columns)
+            if letter_x:
+                cursor_d[0] = 0
+            if letter_y:
+                cursor_d[1] = 0
+            cursor_d[0] += letter_dx or 0
+            cursor_d[1] += letter_dy or 0
+            advance = context.text_extents(letter)[4]
+            letter_x = self.cursor_position[0] if letter_x is None else letter_x
+            letter_y = self.cursor_position[1] if letter_y is None else letter_y
+            if index:
+                letter_x += letter_spacing
+            if not letter.isspace():
+                context.save()
+                context.move_to(letter_x, letter_y)
+                context.rel_move_to(*cursor_d)
+                context.rel_move_to(x_align, y_align)
+                context.rotate(last_rotate if letter_rotate is None else letter_rotate)
+                origin = context.get_current_point()
+                # Заливка — глифами (show_text), обводка — по контуру глифов, как в CairoSVG
+                context.save()
+                if self._set_paint(*fill):
+                    context.show_text(letter)
+                context.restore()
+                context.new_path()
+                if stroke[0]:
+                    context.save()
+                    if self._set_paint(*stroke):
+                        context.move_to(*origin)
+                        context.text_path(letter)
+                        context.set_line_width(stroke_width)
+                        context.stroke()
+                    context.restore()
+                context.restore()
+            self.cursor_position = [letter_x + advance, letter_y]
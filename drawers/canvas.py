@@ -0,0 +1,361 @@
+# drawers/canvas.py
+# Лёгкое дерево элементов чертежа с API svgwrite.Drawing — для вывода в обход svgwrite
+
+"""
+Canvas повторяет ту часть API svgwrite.Drawing, которой пользуются модули drawers:
+фабрики g, line, path, circle, rect, ellipse, polyline, polygon, text, tspan, marker,
+pattern, clipPath, style и контейнер defs, а у элементов — add, set_markers, dasharray,
+fill, stroke, update, rotate/translate/scale, push (у path), attribs и [].
+
+Атрибуты хранятся под именами SVG, как их записал бы svgwrite (stroke_width -> stroke-width),
+но без проверки по профилю SVG и без перевода значений в строки.
+
+Элемент, добавленный в корень (dwg.add), передаётся в emit() — наследник (CairoCanvas)
+выводит его сразу. К этому моменту элемент собран: модули drawers добавляют группу
+в корень после того, как нарисовали в неё всё содержимое.
+
+Здесь же — разбор значений SVG без cairo (длины, transform, команды пути), общий
+для холстов: правила те же, что у CairoSVG (cairosvg.helpers).
+"""
+
+import re
+from functools import lru_cache
+from math import cos, radians, sin, tan
+
+DPI = 96
+UNITS = {"mm": DPI / 25.4, "cm": DPI / 2.54, "in": DPI, "pt": DPI / 72, "pc": DPI / 6, "px": 1}
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+_PATH_TOKEN = re.compile(r"[A-Za-z]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_TRANSFORM = re.compile(r"(\w+) ?\( ?(.*?) ?\)")
+
+
+def attr_name(key) -> str:
+    """Имя атрибута SVG для именованного аргумента, как в svgwrite: stroke_width -> stroke-width, class_ -> class."""
+    return key.rstrip("_").replace("_", "-")
+
+
+def iterflat(values):
+    """Значения вложенных списков и кортежей по порядку (как svgwrite.utils.iterflatlist)."""
+    for value in values:
+        if isinstance(value, (list, tuple)):
+            yield from iterflat(value)
+        else:
+            yield value
+
+
+def strlist(values, separator=","):
+    """Значения через separator без None (как svgwrite.utils.strlist); строка возвращается как есть."""
+    if isinstance(values, str):
+        return values
+    return separator.join(str(value) for value in iterflat(values) if value is not None)
+
+
+def normalize(string) -> str:
+    """Список значений через пробел (как cairosvg.helpers.normalize): запятые, слитные минусы."""
+    string = string.replace("E", "e")
+    string = re.sub("(?<!e)-", " -", string)
+    string = re.sub("[ \n\r\t,]+", " ", string)
+    string = re.sub(r"(\.[0-9-]+)(?=\.)", r"\1 ", string)
+    return string.strip()
+
+
+def size(value, font_size=16.0) -> float:
+    """Длина в px: число, строка с единицами (mm, pt, ...) или em; пусто и неизвестное — 0."""
+    if value is None or value == "":
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    string = normalize(str(value)).split(" ", 1)[0]
+    if string.endswith("em"):
+        return font_size * float(string[:-2])
+    for unit, coefficient in UNITS.items():
+        if string.endswith(unit):
+            return float(string[:-len(unit)]) * coefficient
+    return 0.0
+
+
+def sizes(value) -> list:
+    """Список длин: x/y/dx/dy текста, stroke-dasharray (список чисел или строка через пробел/запятую)."""
+    if value is None or value == "":
+        return []
+    if isinstance(value, (list, tuple)):
+        return [size(item) for item in iterflat(value)]
+    return [size(item) for item in normalize(str(value)).split()]
+
+
+def multiply(first, second) -> tuple:
+    """Матрица (xx, yx, xy, yy, x0, y0): сначала first, затем second (как cairo_matrix_multiply)."""
+    a_xx, a_yx, a_xy, a_yy, a_x0, a_y0 = first
+    b_xx, b_yx, b_xy, b_yy, b_x0, b_y0 = second
+    return (a_xx * b_xx + a_yx * b_xy, a_xx * b_yx + a_yx * b_yy,
+            a_xy * b_xx + a_yy * b_xy, a_xy * b_yx + a_yy * b_yy,
+            a_x0 * b_xx + a_y0 * b_xy + b_x0, a_x0 * b_yx + a_y0 * b_yy + b_y0)
+
+
+def transform_point(matrix, x, y) -> tuple:
+    xx, yx, xy, yy, x0, y0 = matrix
+    return xx * x + xy * y + x0, yx * x + yy * y + y0
+
+
+@lru_cache(maxsize=4096)
+def parse_transform(string):
+    """Атрибут transform -> матрица (xx, yx, xy, yy, x0, y0), как у cairo.Matrix; None — вырожденная."""
+    matrix = IDENTITY
+    for name, arguments in _TRANSFORM.findall(normalize(string)):
+        values = [size(value) for value in arguments.split(" ")]
+        if name == "matrix":
+            matrix = multiply(tuple(values), matrix)
+        elif name == "rotate":
+            angle = radians(values.pop(0))
+            x, y = values or (0, 0)
+            matrix = multiply((1, 0, 0, 1, x, y), matrix)
+            matrix = multiply((cos(angle), sin(angle), -sin(angle), cos(angle), 0, 0), matrix)
+            matrix = multiply((1, 0, 0, 1, -x, -y), matrix)
+        elif name == "skewX":
+            matrix = multiply((1, 0, tan(radians(values[0])), 1, 0, 0), matrix)
+        elif name == "skewY":
+            matrix = multiply((1, tan(radians(values[0])), 0, 1, 0, 0), matrix)
+        elif name == "translate":
+            matrix = multiply((1, 0, 0, 1, values[0], values[1] if len(values) > 1 else 0), matrix)
+        elif name == "scale":
+            matrix = multiply((values[0], 0, 0, values[1] if len(values) > 1 else values[0], 0, 0), matrix)
+    xx, yx, xy, yy = matrix[:4]
+    if xx * yy - xy * yx == 0:
+        return None
+    return matrix
+
+
+@lru_cache(maxsize=1024)
+def _tokenize_path(d):
+    return tuple(
+        token if token.isalpha() else float(token)
+        for token in _PATH_TOKEN.findall(d)
+    )
+
+
+def path_tokens(commands) -> list:
+    """Команды пути (строка d и/или элементы push) -> список букв команд и чисел."""
+    tokens = []
+    for command in commands:
+        if isinstance(command, str):
+            tokens.extend(_tokenize_path(command))
+        elif isinstance(command, (list, tuple)):
+            for value in iterflat(command):
+                tokens.extend(_tokenize_path(value) if isinstance(value, str) else (float(value),))
+        elif command is not None:
+            tokens.append(float(command))
+    return tokens
+
+
+class Element:
+    """Элемент SVG: имя, атрибуты, дочерние элементы и текст (у text/tspan/style)."""
+
+    __slots__ = ("elementname", "attribs", "elements", "text", "commands")
+
+    def __init__(self, elementname, extra=None, text=None):
+        self.elementname = elementname
+        self.attribs = {}
+        self.elements = []
+        self.text = text
+        # Команды пути (только у path): строки и кортежи координат в порядке push
+        self.commands = None
+        if extra:
+            self.update(extra)
+
+    def add(self, element):
+        self.elements.append(element)
+        return element
+
+    def __setitem__(self, key, value):
+        self.attribs[key] = value
+
+    def __getitem__(self, key):
+        return self.attribs[key]
+
+    def get(self, key, default=None):
+        return self.attribs.get(key, default)
+
+    def update(self, attribs=None, **extra):
+        for key, value in {**(attribs or {}), **extra}.items():
+            self.attribs[attr_name(key)] = value
+
+    def set_markers(self, markers):
+        """Маркеры линии: строка '#id' — для всех вершин, кортеж (start, mid, end) — по отдельности."""
+        if isinstance(markers, str):
+            self.attribs["marker"] = f"url({markers})"
+            return
+        for position, marker in zip(("start", "mid", "end"), markers):
+            if marker:
+                self.attribs[f"marker-{position}"] = f"url({marker})"
+
+    def dasharray(self, dasharray=None, offset=None):
+        if dasharray is not None:
+            self.attribs["stroke-dasharray"] = strlist(dasharray, " ")
+        if offset is not None:
+            self.attribs["stroke-dashoffset"] = offset
+        return self
+
+    def fill(self, color=None, rule=None, opacity=None):
+        if color is not None:
+            self.attribs["fill"] = color
+        if rule is not None:
+            self.attribs["fill-rule"] = rule
+        if opacity is not None:
+            self.attribs["fill-opacity"] = opacity
+        return self
+
+    def stroke(self, color=None, width=None, opacity=None, linecap=None, linejoin=None, miterlimit=None):
+        for key, value in (("stroke", color), ("stroke-width", width), ("stroke-opacity", opacity),
+                           ("stroke-linecap", linecap), ("stroke-linejoin", linejoin),
+                           ("stroke-miterlimit", miterlimit)):
+            if value is not None:
+                self.attribs[key] = value
+        return self
+
+    def _add_transformation(self, transformation):
+        self.attribs["transform"] = f"{self.attribs.get('transform', '')} {transformation}".strip()
+
+    def rotate(self, angle, center=None):
+        self._add_transformation(f"rotate({strlist([angle, center])})")
+
+    def translate(self, tx, ty=None):
+        self._add_transformation(f"translate({strlist([tx, ty])})")
+
+    def scale(self, sx, sy=None):
+        self._add_transformation(f"scale({strlist([sx, sy])})")
+
+    def push(self, *elements):
+        """Команды и координаты пути (как svgwrite.path.Path.push)."""
+        self.commands.extend(elements)
+
+
+class Defs(Element):
+    """Контейнер defs: элементы с id (маркеры, паттерны, clipPath) регистрируются в холсте."""
+
+    __slots__ = ("canvas",)
+
+    def __init__(self, canvas):
+        super().__init__("defs")
+        self.canvas = canvas
+
+    def add(self, element):
+        self.elements.append(element)
+        self.canvas.define(element)
+        return element
+
+
+def _text_attribs(element, insert, x, y, dx, dy, rotate):
+    """Позиции text/tspan списками, как в svgwrite (insert -> x=[..], y=[..])."""
+    if insert is not None:
+        x, y = [insert[0]], [insert[1]]
+    for key, value in (("x", x), ("y", y), ("dx", dx), ("dy", dy), ("rotate", rotate)):
+        if value is not None:
+            element.attribs[key] = list(iterflat(value)) if isinstance(value, (list, tuple)) else [value]
+    return element
+
+
+class Canvas:
+    """Основа холстов с API svgwrite.Drawing. Наследник задаёт emit() и define()."""
+
+    def __init__(self):
+        self.defs = Defs(self)
+        # Элементы defs по id (маркеры, паттерны штриховки, clipPath)
+        self.definitions = {}
+
+    def add(self, element):
+        self.emit(element)
+        return element
+
+    def emit(self, element):
+        """Вывод элемента, добавленного в корень."""
+        raise NotImplementedError
+
+    def define(self, element):
+        """Регистрация элемента defs (по id)."""
+        element_id = element.attribs.get("id")
+        if element_id is not None:
+            self.definitions[element_id] = element
+
+    # Фабрики элементов (аргументы как у svgwrite.Drawing)
+
+    def g(self, **extra):
+        return Element("g", extra)
+
+    def line(self, start=(0, 0), end=(0, 0), **extra):
+        element = Element("line", extra)
+        element.attribs["x1"], element.attribs["y1"] = start
+        element.attribs["x2"], element.attribs["y2"] = end
+        return element
+
+    def path(self, d=None, **extra):
+        element = Element("path", extra)
+        element.commands = [] if d is None else [d]
+        return element
+
+    def circle(self, center=(0, 0), r=1, **extra):
+        element = Element("circle", extra)
+        element.attribs["cx"], element.attribs["cy"] = center
+        element.attribs["r"] = r
+        return element
+
+    def rect(self, insert=(0, 0), size=(1, 1), rx=None, ry=None, **extra):
+        element = Element("rect", extra)
+        element.attribs["x"], element.attribs["y"] = insert
+        element.attribs["width"], element.attribs["height"] = size
+        if rx is not None:
+            element.attribs["rx"] = rx
+        if ry is not None:
+            element.attribs["ry"] = ry
+        return element
+
+    def ellipse(self, center=(0, 0), r=(1, 1), **extra):
+        element = Element("ellipse", extra)
+        element.attribs["cx"], element.attribs["cy"] = center
+        element.attribs["rx"], element.attribs["ry"] = r
+        return element
+
+    def polyline(self, points=(), **extra):
+        element = Element("polyline", extra)
+        element.attribs["points"] = list(points)
+        return element
+
+    def polygon(self, points=(), **extra):
+        element = Element("polygon", extra)
+        element.attribs["points"] = list(points)
+        return element
+
+    def text(self, text, insert=None, x=None, y=None, dx=None, dy=None, rotate=None, **extra):
+        return _text_attribs(Element("text", extra, text), insert, x, y, dx, dy, rotate)
+
+    def tspan(self, text, insert=None, x=None, y=None, dx=None, dy=None, rotate=None, **extra):
+        return _text_attribs(Element("tspan", extra, text), insert, x, y, dx, dy, rotate)
+
+    def marker(self, insert=None, size=None, orient=None, **extra):
+        element = Element("marker", extra)
+        if insert is not None:
+            element.attribs["refX"], element.attribs["refY"] = insert
+        if size is not None:
+            element.attribs["markerWidth"], element.attribs["markerHeight"] = size
+        if orient is not None:
+            element.attribs["orient"] = orient
+        return element
+
+    def pattern(self, insert=None, size=None, **extra):
+        element = Element("pattern", extra)
+        if insert is not None:
+            element.attribs["x"], element.attribs["y"] = insert
+        if size is not None:
+            element.attribs["width"], element.attribs["height"] = size
+        return element
+
+    def clipPath(self, **extra):  # noqa: N802 — имя как в svgwrite
+        return Element("clipPath", extra)
+
+    def style(self, content="", **extra):
+        element = Element("style", extra, content)
+        element.attribs["type"] = "text/css"
+        return element
@@ -0,0 +1,533 @@
+# drawers/display_list.py
+# Список отображения: чертёж как плоские массивы примитивов между модулями drawers и форматом вывода
+
+"""
+DisplayList — холст с API svgwrite.Drawing (drawers.canvas), который ничего не выводит,
+а записывает чертёж в плоские массивы (array): по записи на элемент в порядке обхода
+(группа, затем её содержимое) — вид, родитель, атрибуты, координаты, текст.
+
+- Атрибуты (стиль, transform) интернируются: одинаковые наборы хранятся один раз.
+- Координаты фигур — в общем массиве coords: line — x1 y1 x2 y2, circle — cx cy r,
+  ellipse — cx cy rx ry, rect — x y width height, polyline/polygon — точки, path — числа
+  команд (буквы и кол-во чисел после каждой — в texts).
+- defs (маркеры, паттерны, clipPath) хранятся элементами холста — их немного.
+
+replay(target) воспроизводит чертёж на любом холсте с тем же API: svgwrite.Drawing (SVG),
+CairoCanvas (PDF, PNG). Результаты сериализации кэшируются в списке по формату (cached).
+
+optimize() до вывода:
+- dedupe — из одинаковых фигур одного родителя остаётся последняя (она всё равно рисуется
+  поверх предыдущей);
+- cull — фигуры, которые целиком (с запасом на толщину линии) вне листа, убираются,
+  опустевшие группы тоже; фигуры с маркерами и тексты не трогаются;
+- simplify — промежуточные точки на прямой (отклонение не больше tolerance, px) в polyline,
+  polygon и отрезках L пути убираются; у фигур с маркерами вершины сохраняются.
+"""
+
+from array import array
+
+from drawers.canvas import (Canvas, IDENTITY, iterflat, multiply, parse_transform, path_tokens, size,
+                            sizes, transform_point)
+
+KINDS = ("g", "line", "polyline", "polygon", "path", "circle", "ellipse", "rect", "text", "tspan")
+KIND_INDEX = {name: index for index, name in enumerate(KINDS)}
+G, LINE, POLYLINE, POLYGON, PATH, CIRCLE, ELLIPSE, RECT, TEXT, TSPAN = range(len(KINDS))
+
+# Атрибуты-координаты фигур: хранятся в coords, а не в атрибутах
+GEOMETRY = {
+    LINE: ("x1", "y1", "x2", "y2"),
+    CIRCLE: ("cx", "cy", "r"),
+    ELLIPSE: ("cx", "cy", "rx", "ry"),
+    RECT: ("x", "y", "width", "height"),
+}
+
+# Кол-во чисел после буквы команды пути
+PATH_ARGUMENTS = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2, "A": 7, "Z": 0}
+
+MARKER_ATTRIBUTES = ("marker", "marker-start", "marker-mid", "marker-end")
+TRANSLUCENCY_ATTRIBUTES = ("opacity", "fill-opacity", "stroke-opacity")
+
+OPTIMIZATIONS = ("dedupe", "cull", "simplify")
+
+
+def _hashable(value):
+    return tuple(iterflat(value)) if isinstance(value, (list, tuple)) else value
+
+
+def _path_commands(tokens):
+    """Токены пути -> ((буква, кол-во чисел), ...) и числа; повтор команды без буквы — отдельной записью."""
+    commands, numbers = [], []
+    letter, index = None, 0
+    while index < len(tokens):
+        token = tokens[index]
+        if isinstance(token, str):
+            letter = token
+            index += 1
+            count = PATH_ARGUMENTS.get(letter.upper())
+            if count is None:
+                raise ValueError(f"Команда пути {letter} не поддерживается")
+            if count == 0:
+                commands.append((letter, 0))
+                continue
+        elif letter is None:
+            raise ValueError("Путь должен начинаться с команды")
+        else:
+            # Неявный повтор: после M/m идут L/l
+            letter = {"M": "L", "m": "l"}.get(letter, letter)
+            count = PATH_ARGUMENTS[letter.upper()]
+        values = tokens[index:index + count]
+        if len(values) < count or any(isinstance(value, str) for value in values):
+            raise ValueError(f"Некорректные данные пути после команды {letter}")
+        commands.append((letter, count))
+        numbers.extend(values)
+        index += count
+    return tuple(commands), numbers
+
+
+def _format_number(value) -> str:
+    return str(int(value)) if value == int(value) else repr(value)
+
+
+def path_data(commands, numbers) -> str:
+    """Строка d пути из команд и чисел."""
+    parts, index = [], 0
+    for letter, count in commands:
+        parts.append(letter)
+        parts.extend(_format_number(value) for value in numbers[index:index + count])
+        index += count
+    return " ".join(parts)
+
+
+def _path_points(commands, numbers):
+    """Абсолютные опорные точки пути (концы отрезков, контрольные точки, дуги с запасом на радиус)."""
+    points = []
+    x = y = start_x = start_y = 0.0
+    index = 0
+    for letter, count in commands:
+        values = numbers[index:index + count]
+        index += count
+        relative = letter.islower()
+        command = letter.upper()
+        base_x, base_y = (x, y) if relative else (0.0, 0.0)
+        if command == "Z":
+            x, y = start_x, start_y
+            continue
+        if command == "H":
+            x = base_x + values[0]
+        elif command == "V":
+            y = base_y + values[0]
+        elif command == "A":
+            radius = max(abs(values[0]), abs(values[1]))
+            end_x, end_y = base_x + values[5], base_y + values[6]
+            # Дуга лежит в круге радиуса не больше max(r, половина хорды) около концов
+            reach = max(radius, ((end_x - x) ** 2 + (end_y - y) ** 2) ** .5) * 2
+            points.extend(((x - reach, y - reach), (x + reach, y + reach)))
+            x, y = end_x, end_y
+        else:
+            for offset in range(0, count, 2):
+                points.append((base_x + values[offset], base_y + values[offset + 1]))
+            x, y = base_x + values[-2], base_y + values[-1]
+        if command == "M":
+            start_x, start_y = x, y
+        points.append((x, y))
+    return points
+
+
+def _collinear(first, middle, last, tolerance) -> bool:
+    """middle лежит на отрезке first-last (отклонение не больше tolerance) и между концами."""
+    dx, dy = last[0] - first[0], last[1] - first[1]
+    length = (dx * dx + dy * dy) ** .5
+    if length == 0:
+        return False
+    mx, my = middle[0] - first[0], middle[1] - first[1]
+    if abs(dx * my - dy * mx) / length > tolerance:
+        return False
+    projection = (dx * mx + dy * my) / length
+    return 0 < projection < length
+
+
+def simplify_points(points, tolerance, closed=False):
+    """
+    Точки ломаной без промежуточных точек на прямой; концы незамкнутой ломаной сохраняются.
+    Каждая выброшенная точка отстоит от итогового отрезка не больше чем на tolerance.
+    """
+    if len(points) < 3:
+        return points
+    if closed:
+        # Замыкающий отрезок упрощается вместе с остальными, повтор первой точки затем снимается
+        return simplify_points([*points, points[0]], tolerance)[:-1]
+    result = [points[0]]
+    # Точки, выброшенные после result[-1]: проверяются против каждого нового конца отрезка
+    skipped = []
+    for index in range(1, len(points) - 1):
+        candidate, end = points[index], points[index + 1]
+        if all(_collinear(result[-1], point, end, tolerance) for point in (*skipped, candidate)):
+            skipped.append(candidate)
+        else:
+            result.append(candidate)
+            skipped.clear()
+    result.append(points[-1])
+    return result
+
+
+def scale_factor(matrix) -> float:
+    """Наибольшее растяжение отрезка матрицей (a, b, c, d, e, f)."""
+    a, b, c, d = matrix[:4]
+    total = a * a + b * b + c * c + d * d
+    determinant = a * d - b * c
+    return ((total + max(total * total - 4 * determinant * determinant, 0) ** .5) / 2) ** .5
+
+
+class DisplayList(Canvas):
+    """Чертёж как список отображения (записи в массивах), воспроизводимый на любом холсте."""
+
+    def __init__(self):
+        super().__init__()
+        self.kinds = array("B")
+        self.parents = array("i")
+        self.styles = array("I")
+        self.starts = array("I")
+        self.counts = array("I")
+        self.coords = array("d")
+        # Текст text/tspan или команды пути; у прочих записей — None
+        self.texts = []
+        # Интернированные наборы атрибутов (кортежи пар) и их индексы
+        self.attribute_sets = []
+        self._attribute_index = {}
+        # Результаты сериализации по формату (cached)
+        self.outputs = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    # Запись
+
+    def emit(self, element):
+        self._record(element, -1)
+        self.outputs.clear()
+
+    def _intern(self, attribs):
+        return self._intern_key(tuple((name, _hashable(value)) for name, value in attribs.items()))
+
+    def _intern_key(self, key):
+        index = self._attribute_index.get(key)
+        if index is None:
+            index = self._attribute_index[key] = len(self.attribute_sets)
+            self.attribute_sets.append(key)
+        return index
+
+    def _append(self, kind, parent, attribs, coords=(), text=None):
+        self.kinds.append(kind)
+        self.parents.append(parent)
+        self.styles.append(self._intern(attribs))
+        self.starts.append(len(self.coords))
+        self.counts.append(len(coords))
+        self.coords.extend(coords)
+        self.texts.append(text)
+        return len(self.kinds) - 1
+
+    def _record(self, element, parent):
+        kind = KIND_INDEX.get(element.elementname)
+        if kind is None:
+            raise ValueError(f"Элемент {element.elementname} не поддерживается списком отображения")
+        attribs = dict(element.attribs)
+        text = None
+        if kind in GEOMETRY:
+            coords = [size(attribs.pop(name, 0)) for name in GEOMETRY[kind]]
+        elif kind in (POLYLINE, POLYGON):
+            coords = sizes(attribs.pop("points", ()))
+        elif kind == PATH:
+            text, coords = _path_commands(path_tokens(element.commands or ()))
+        else:
+            coords = ()
+            if kind in (TEXT, TSPAN):
+                text = element.text
+        index = self._append(kind, parent, attribs, coords, text)
+        for child in element.elements:
+            self._record(child, index)
+
+    def extend(self, other):
+        """
+        Добавляет в конец записи списка other (например, готовую часть листа, drawers.base_sheet)
+        без повторного разбора элементов: пересчитываются родители, наборы атрибутов и начала координат.
+        """
+        offset, coords_offset = len(self.kinds), len(self.coords)
+        styles = [self._intern_key(key) for key in other.attribute_sets]
+        self.kinds.extend(other.kinds)
+        self.parents.extend(parent + offset if parent >= 0 else parent for parent in other.parents)
+        self.styles.extend(styles[style] for style in other.styles)
+        self.starts.extend(start + coords_offset for start in other.starts)
+        self.counts.extend(other.counts)
+        self.coords.extend(other.coords)
+        self.texts.extend(other.texts)
+        self.outputs.clear()
+
+    # Воспроизведение
+
+    def attributes(self, index) -> dict:
+        return {name: list(value) if isinstance(value, tuple) else value
+                for name, value in self.attribute_sets[self.styles[index]]}
+
+    def _coords(self, index):
+        start = self.starts[index]
+        return self.coords[start:start + self.counts[index]]
+
+    def _make(self, target, index):
+        """Элемент холста target для записи index (без потомков)."""
+        kind = self.kinds[index]
+        attribs = self.attributes(index)
+        coords = self._coords(index)
+        if kind == G:
+            return target.g(**attribs)
+        if kind == LINE:
+            return target.line(start=(coords[0], coords[1]), end=(coords[2], coords[3]), **attribs)
+        if kind in (POLYLINE, POLYGON):
+            points = [(coords[offset], coords[offset + 1]) for offset in range(0, len(coords), 2)]
+            factory = target.polyline if kind == POLYLINE else target.polygon
+            return factory(points=points, **attribs)
+        if kind == PATH:
+            return target.path(d=path_data(self.texts[index], coords), **attribs)
+        if kind == CIRCLE:
+            return target.circle(center=(coords[0], coords[1]), r=coords[2], **attribs)
+        if kind == ELLIPSE:
+            return target.ellipse(center=(coords[0], coords[1]), r=(coords[2], coords[3]), **attribs)
+        if kind == RECT:
+            return target.rect(insert=(coords[0], coords[1]), size=(coords[2], coords[3]), **attribs)
+        factory = target.text if kind == TEXT else target.tspan
+        return factory(self.texts[index], **attribs)
+
+    def replay(self, target):
+        """Рисует чертёж на холсте target: сначала defs, затем корневые элементы по порядку."""
+        for definition in self.defs.elements:
+            target.defs.add(copy_element(definition, target))
+        created = {}
+        root = None
+        for index, parent in enumerate(self.parents):
+            element = self._make(target, index)
+            created[index] = element
+            if parent < 0:
+                # Корневой элемент передаётся холсту собранным (CairoCanvas рисует его сразу)
+                if root is not None:
+                    target.add(root)
+                root = element
+            else:
+                created[parent].add(element)
+        if root is not None:
+            target.add(root)
+        return target
+
+    def cached(self, key, build):
+        """Результат build(self) из кэша списка по ключу (формат и параметры вывода)."""
+        output = self.outputs.get(key)
+        if output is None:
+            output = self.outputs[key] = build(self)
+        return output
+
+    # Оптимизация
+
+    def optimize(self, passes=OPTIMIZATIONS, tolerance=0.01, bounds=None) -> dict:
+        """
+        Применяет проходы passes (dedupe, cull, simplify). bounds — (x, y, width, height) листа
+        в единицах чертежа, нужен для cull. Возвращает кол-во убранных записей/точек по проходам.
+        """
+        unknown = set(passes) - set(OPTIMIZATIONS)
+        if unknown:
+            raise ValueError(f"Неизвестные проходы оптимизации: {', '.join(sorted(unknown))}")
+        removed = {}
+        if "simplify" in passes:
+            removed["simplify"] = self._simplify(tolerance)
+        if "cull" in passes and bounds is not None:
+            removed["cull"] = self._compact(self._cull_mask(bounds))
+        if "dedupe" in passes:
+            removed["dedupe"] = self._compact(self._dedupe_mask())
+        self.outputs.clear()
+        return removed
+
+    def _inherited(self):
+        """
+        Для каждой записи с учётом предков: матрица на лист, толщина линии, есть ли маркеры
+        и есть ли прозрачность (opacity, fill-opacity, stroke-opacity).
+        """
+        matrices, widths, markers, translucent = [], [], [], []
+        for index, parent in enumerate(self.parents):
+            attribs = dict(self.attribute_sets[self.styles[index]])
+            if parent < 0:
+                matrix, width, marked, alpha = IDENTITY, 1.0, False, False
+            else:
+                matrix, width, marked, alpha = matrices[parent], widths[parent], markers[parent], translucent[parent]
+            own = parse_transform(attribs["transform"]) if attribs.get("transform") else None
+            if own is not None:
+                matrix = multiply(own, matrix)
+            if "stroke-width" in attribs:
+                width = size(attribs["stroke-width"])
+            matrices.append(matrix)
+            widths.append(width)
+            markers.append(marked or any(name in attribs for name in MARKER_ATTRIBUTES))
+            translucent.append(alpha or any(name in attribs for name in TRANSLUCENCY_ATTRIBUTES))
+        return matrices, widths, markers, translucent
+
+    def _bounds(self, index):
+        """Опорные точки фигуры в её координатах."""
+        kind = self.kinds[index]
+        coords = self._coords(index)
+        if kind == LINE:
+            return [(coords[0], coords[1]), (coords[2], coords[3])]
+        if kind in (POLYLINE, POLYGON):
+            return [(coords[offset], coords[offset + 1]) for offset in range(0, len(coords), 2)]
+        if kind == PATH:
+            return _path_points(self.texts[index], coords)
+        if kind == CIRCLE:
+            return [(coords[0] - coords[2], coords[1] - coords[2]), (coords[0] + coords[2], coords[1] + coords[2])]
+        if kind == ELLIPSE:
+            return [(coords[0] - coords[2], coords[1] - coords[3]), (coords[0] + coords[2], coords[1] + coords[3])]
+        if kind == RECT:
+            return [(coords[0], coords[1]), (coords[0] + coords[2], coords[1] + coords[3])]
+        return None
+
+    def _cull_mask(self, bounds):
+        left, top, width, height = bounds
+        right, bottom = left + width, top + height
+        matrices, widths, markers, _ = self._inherited()
+        keep = [True] * len(self.kinds)
+        has_children = [False] * len(self.kinds)
+        for index in range(len(self.kinds)):
+            kind = self.kinds[index]
+            if kind in (G, TEXT, TSPAN) or markers[index]:
+                continue
+            points = self._bounds(index)
+            if not points:
+                keep[index] = False
+                continue
+            matrix = matrices[index]
+            # Углы рамки фигуры на листе; запас — две толщины линии (острые углы при stroke-miterlimit 4)
+            xs, ys = zip(*points)
+            corners = [transform_point(matrix, x, y) for x in (min(xs), max(xs)) for y in (min(ys), max(ys))]
+            scale = abs(matrix[0] * matrix[3] - matrix[1] * matrix[2]) ** .5
+            margin = 2 * widths[index] * scale
+            corner_xs, corner_ys = zip(*corners)
+            if (max(corner_xs) + margin < left or min(corner_xs) - margin > right or
+                    max(corner_ys) + margin < top or min(corner_ys) - margin > bottom):
+                keep[index] = False
+        # Группа без оставшихся потомков (и без собственного содержимого) убирается
+        for index in range(len(self.kinds) - 1, -1, -1):
+            parent = self.parents[index]
+            if keep[index] and (self.kinds[index] != G or has_children[index]) and parent >= 0:
+                has_children[parent] = True
+        for index, kind in enumerate(self.kinds):
+            if kind == G and not has_children[index]:
+                keep[index] = False
+        return keep
+
+    def _dedupe_mask(self):
+        _, _, _, translucent = self._inherited()
+        keep = [True] * len(self.kinds)
+        seen = {}
+        # С конца: из одинаковых фигур одного родителя остаётся последняя.
+        # Полупрозрачные не трогаются: повторная отрисовка у них меняет цвет
+        for index in range(len(self.kinds) - 1, -1, -1):
+            kind = self.kinds[index]
+            if kind in (G, TEXT, TSPAN) or translucent[index]:
+                continue
+            key = (self.parents[index], kind, self.styles[index], tuple(self._coords(index)), self.texts[index])
+            if key in seen:
+                keep[index] = False
+            else:
+                seen[key] = index
+        return keep
+
+    def _simplify(self, tolerance) -> int:
+        matrices, _, markers, _ = self._inherited()
+        removed = 0
+        coords = array("d")
+        for index, kind in enumerate(self.kinds):
+            values = self._coords(index)
+            scale = scale_factor(matrices[index])
+            if not markers[index] and kind in (POLYLINE, POLYGON, PATH) and scale > 0:
+                # Допуск задан в единицах листа, точки — в координатах фигуры
+                local_tolerance = tolerance / scale
+                if kind in (POLYLINE, POLYGON):
+                    points = [(values[offset], values[offset + 1]) for offset in range(0, len(values), 2)]
+                    simplified = simplify_points(points, local_tolerance, closed=kind == POLYGON)
+                    removed += len(points) - len(simplified)
+                    values = [value for point in simplified for value in point]
+                elif kind == PATH:
+                    commands, values, count = self._simplify_path(self.texts[index], values, local_tolerance)
+                    self.texts[index] = commands
+                    removed += count
+            self.starts[index] = len(coords)
+            self.counts[index] = len(values)
+            coords.extend(values)
+        self.coords = coords
+        return removed
+
+    @staticmethod
+    def _simplify_path(commands, numbers, tolerance):
+        """Убирает промежуточные точки на прямой в сериях абсолютных точек (M L L ... или L L L ...)."""
+        result_commands, result_numbers = [], []
+        removed = 0
+        # Точка M, с которой начинается серия (если серия идёт сразу после M), и точки L серии
+        run_start, run = None, []
+
+        def flush():
+            nonlocal removed
+            points = ([run_start] if run_start else []) + run
+            simplified = simplify_points(points, tolerance)
+            removed += len(points) - len(simplified)
+            for point in simplified[1:] if run_start else simplified:
+                result_commands.append(("L", 2))
+                result_numbers.extend(point)
+            run.clear()
+
+        index = 0
+        for letter, count in commands:
+            values = numbers[index:index + count]
+            index += count
+            if letter == "L":
+                run.append((values[0], values[1]))
+                continue
+            flush()
+            result_commands.append((letter, count))
+            result_numbers.extend(values)
+            run_start = (values[0], values[1]) if letter == "M" else None
+        flush()
+        return tuple(result_commands), result_numbers, removed
+
+    def _compact(self, keep) -> int:
+        """Оставляет записи с keep[i] (и всех их предков), пересчитывая родителей. Возвращает кол-во убранных."""
+        removed = 0
+        new_index = {}
+        kinds, parents, styles, starts, counts = array("B"), array("i"), array("I"), array("I"), array("I")
+        coords, texts = array("d"), []
+        for index, kind in enumerate(self.kinds):
+            parent = self.parents[index]
+            if not keep[index] or (parent >= 0 and parent not in new_index):
+                removed += 1
+                continue
+            new_index[index] = len(kinds)
+            kinds.append(kind)
+            parents.append(new_index[parent] if parent >= 0 else -1)
+            styles.append(self.styles[index])
+            values = self._coords(index)
+            starts.append(len(coords))
+            counts.append(len(values))
+            coords.extend(values)
+            texts.append(self.texts[index])
+        self.kinds, self.parents, self.styles = kinds, parents, styles
+        self.starts, self.counts, self.coords, self.texts = starts, counts, coords, texts
+        return removed
+
+
+def copy_element(element, target):
+    """Копия элемента холста с потомками (defs: маркеры, паттерны, clipPath) на холсте target."""
+    name = element.elementname
+    if name in KIND_INDEX:
+        record = DisplayList()
+        record._record(element, -1)
+        copy = record._make(target, 0)
+    elif name == "style":
+        return target.style(element.text, **element.attribs)
+    else:
+        copy = getattr(target, name)(**element.attribs)
+    for child in element.elements:
+        copy.add(copy_element(child, target))
+    return copy
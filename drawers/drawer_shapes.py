@@ -2,7 +2,6 @@
 # UTC+5: 2025-05-11 10:45 — обновлены методы draw для поддержки контейнеров
 
 
-from svgwrite.path import Path
 from math import radians, sin, cos
 from configs.config_log import logger
 
@@ -221,12 +220,13 @@ class ThickPolyline:
             path.push('L', start)
             path.push('A', (radius, radius, 0, 0, 0, end[0], end[1]))
 
-    def get_path(self):
+    def get_path(self, dwg):
+        # Путь создаётся фабрикой холста (svgwrite.Drawing или CairoCanvas)
         outer, inner, _ = self._compute_offset_paths()
         if not outer:
-            return Path(fill='none', stroke=self.stroke, stroke_width=self.stroke_width)
+            return dwg.path(fill='none', stroke=self.stroke, stroke_width=self.stroke_width)
 
-        path = Path(fill='none', stroke=self.stroke, stroke_width=self.stroke_width)
+        path = dwg.path(fill='none', stroke=self.stroke, stroke_width=self.stroke_width)
         path.push('M', outer[0])
 
         for i in range(1, len(outer)):
@@ -263,15 +263,15 @@ class ThickPolyline:
             fill_path = self.get_fill_path(dwg)
             container.add(fill_path)
 
-        path = self.get_path()
+        path = self.get_path(dwg)
         container.add(path)
 
-    def get_fill_path(self, dwg=None):
-        path = self.get_path()
+    def get_fill_path(self, dwg):
+        path = self.get_path(dwg)
 
         if self.fill == "none":
             path.fill("none")
-        elif self.fill.startswith("hatch_") and dwg is not None:
+        elif self.fill.startswith("hatch_"):
             try:
                 angle = int(self.fill.split("_")[1])
             except ValueError:
@@ -5,11 +5,15 @@ from configs.config_log import logger
 from configs.config import spec_table
 from drawers.drawer_shapes import Line, Circle, Rect, Ellipse, Polyline, Polygon, Text
 
-def draw_table(dwg: svgwrite.Drawing, combined_values: dict):
-    table = dwg.g(id='table', fill='none', font_family="GOST type A", 
-                  font_size=5, text_anchor='middle', dominant_baseline="central", 
-                  transform=f"scale({96/25.4}, {96/25.4}) translate(290, 135)") #text_anchor='middle', dominant_baseline="central"
-    
+def table_group(dwg):
+    """Группа таблицы параметров: шрифт, выравнивание и положение на листе (мм)."""
+    return dwg.g(id='table', fill='none', font_family="GOST type A", 
+                 font_size=5, text_anchor='middle', dominant_baseline="central", 
+                 transform=f"scale({96/25.4}, {96/25.4}) translate(290, 135)") #text_anchor='middle', dominant_baseline="central"
+
+
+def draw_table_grid(dwg, table):
+    """Постоянная часть таблицы до значений: линии, заголовки и названия параметров."""
     Line(start=(0, 0), end=(122, 0), stroke='black', stroke_width=0.45).draw(dwg, table)
     for i in range(10, 10+6*11+1, 6):
         Line(start=(0, i), end=(122, i), stroke='black', stroke_width=0.45).draw(dwg, table)
@@ -34,6 +38,9 @@ def draw_table(dwg: svgwrite.Drawing, combined_values: dict):
 
     Text("Значение", insert=(12+70+20, 5), font_size=7, stroke_width = 0.01).draw(dwg, table)
 
+
+def draw_table_values(dwg, table, combined_values: dict):
+    """Значения параметров чертежа — единственная часть таблицы, которая зависит от запроса."""
     Text(f"{str(int(combined_values['frame_parts_count'])-1)}", insert=(12+70+20, 10+6*0+3), font_size=5, stroke_width = 0.01).draw(dwg, table)
     Text(f"{combined_values['frame_length_mm']}", insert=(12+70+20, 10+6*1+3), font_size=5, stroke_width = 0.01).draw(dwg, table)
     Text(f"{combined_values['frame_diameter_mm']}", insert=(12+70+20, 10+6*2+3), font_size=5, stroke_width = 0.01).draw(dwg, table)
@@ -46,10 +53,20 @@ def draw_table(dwg: svgwrite.Drawing, combined_values: dict):
     Text(f"{combined_values['coating_type']}", insert=(12+70+20, 10+6*9+3), font_size=5, stroke_width = 0.01).draw(dwg, table)
     Text(f"Сталь {combined_values['wire_material']}", insert=(12+70+20, 10+6*10+3), font_size=5, stroke_width = 0.01).draw(dwg, table)
 
+
+def draw_table_numbers(dwg, table):
+    """Постоянная часть таблицы после значений: номера строк."""
     for i in range(0, 11, 1):
         Text(f"{i+1}", insert=(6, 10+6*i+3), font_size=5, stroke_width = 0.01).draw(dwg, table)
 
     Text("№", insert=(6, 2.5), font_size=5, stroke_width = 0.01).draw(dwg, table)  
     Text("п/п", insert=(6, 7.5), font_size=5, stroke_width = 0.01).draw(dwg, table)
 
-    dwg.add(table)
\ No newline at end of file
+
+def draw_table(dwg: svgwrite.Drawing, combined_values: dict):
+    """Таблица параметров. На холстах drawers.canvas постоянная часть берётся из кэша листа (drawers.base_sheet)."""
+    table = table_group(dwg)
+    draw_table_grid(dwg, table)
+    draw_table_values(dwg, table, combined_values)
+    draw_table_numbers(dwg, table)
+    dwg.add(table)
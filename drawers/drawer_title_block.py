@@ -10,9 +10,108 @@ from configs.config_title_block import (
     INDEX_TEXT_TITLE_BLOCK_A3_GOST
 )
 
+# Коэффициенты масштабирования надписей: максимальная ширина текста
+SCALE_WIDTHS = {
+    0: 27, # 0: Обозначение внизу
+    11: 24.5, # 11: Обозначение сверху
+    41: 13 # 41: Материал
+}
+
+
+def title_block_sources() -> tuple:
+    """
+    Массивы config_title_block, из которых строится рамка. После перезагрузки настроек
+    (app.runtime_config) имена указывают на новые объекты — по ним кэш листа (drawers.base_sheet)
+    узнаёт, что его пора построить заново.
+    """
+    return (stroke_width_title_block_A3_GOST, Mx_title_block_A3_GOST, My_title_block_A3_GOST,
+            Lx_title_block_A3_GOST, Ly_title_block_A3_GOST, text_text_title_block_A3_GOST,
+            x_pos_text_title_block_A3_GOST, y_pos_text_title_block_A3_GOST, font_size_title_block_A3_GOST,
+            x_rot_text_title_block_A3_GOST, y_rot_text_title_block_A3_GOST, ang_rot_text_title_block_A3_GOST,
+            INDEX_TEXT_TITLE_BLOCK_A3_GOST)
+
+
+def title_block_lines(dwg) -> list:
+    """Линии рамки A3 (пусто, если массивы координат линий разной длины)."""
+    if (len(Mx_title_block_A3_GOST) + len(My_title_block_A3_GOST) + 
+        len(Lx_title_block_A3_GOST) + len(Ly_title_block_A3_GOST)) / 4 != len(stroke_width_title_block_A3_GOST):
+        return []
+    return [
+        dwg.line(
+            start=(Mx_title_block_A3_GOST[i], My_title_block_A3_GOST[i]),
+            end=(Lx_title_block_A3_GOST[i], Ly_title_block_A3_GOST[i]),
+            stroke="black",
+            stroke_width=stroke_width_title_block_A3_GOST[i]
+        )
+        for i in range(len(stroke_width_title_block_A3_GOST))
+    ]
+
+
+def title_block_text_count() -> int:
+    """Кол-во надписей рамки (0, если массивы надписей разной длины)."""
+    if (len(text_text_title_block_A3_GOST) + len(x_pos_text_title_block_A3_GOST) +
+        len(y_pos_text_title_block_A3_GOST) + len(font_size_title_block_A3_GOST) + 
+        len(x_rot_text_title_block_A3_GOST) + len(y_rot_text_title_block_A3_GOST)) / 6 != len(ang_rot_text_title_block_A3_GOST):
+        return 0
+    return len(font_size_title_block_A3_GOST)
+
+
+def title_block_slots() -> dict:
+    """
+    Индекс надписи -> ключ значения, которым она заполняется (обратный INDEX_TEXT_TITLE_BLOCK_A3_GOST).
+    Надписи без ключа постоянные. Если индекс указан у нескольких ключей, берётся первый.
+    """
+    slots = {}
+    for key, indices in INDEX_TEXT_TITLE_BLOCK_A3_GOST.items():
+        for i in indices:
+            slots.setdefault(i, key)
+    return slots
+
+
+def title_block_text_content(i, key, combined_values: dict, default_values: dict):
+    """Текст надписи i: из значений, если оно задано и отличается от значения по умолчанию, иначе из рамки."""
+    text_content = text_text_title_block_A3_GOST[i]
+    if key:
+        current_value = combined_values.get(key)
+        default_value = default_values.get(key)
+        # logger.debug(f"i: {i}, key: '{key}', index_list: {INDEX_TEXT_TITLE_BLOCK_A3_GOST[key]}, старое='{default_value}', новое='{current_value}'")
+        if current_value != default_value:
+            # logger.debug(f"ЗАМЕНА: ключ='{key}', индекс={i}, старое='{default_value}', новое='{current_value}'")
+            text_content = current_value
+
+    # Добавляем слово сталь перед маркой материала
+    if i == 41: # Материал
+        text_content = f"Сталь {text_content}"
+    return text_content
+
+
+def title_block_text(dwg, i, text_content):
+    """Элемент надписи i рамки с текстом text_content."""
+    # Динамическое масштабирование по длине надписи Обозначения на основе длины (формируется по шаблону, на длину сильнее все влияет марка стали материала)
+    if i in SCALE_WIDTHS:
+        char_width = 1
+        max_width = SCALE_WIDTHS[i]
+        scale_x = max_width / (char_width * len(text_content))
+    else:
+        scale_x = 1 
+
+    return dwg.text(
+        text_content,
+        insert=(x_pos_text_title_block_A3_GOST[i], y_pos_text_title_block_A3_GOST[i]),
+        transform=f"rotate({ang_rot_text_title_block_A3_GOST[i]} {x_rot_text_title_block_A3_GOST[i]},{y_rot_text_title_block_A3_GOST[i]}) "
+        f"{f'translate({x_pos_text_title_block_A3_GOST[i] * (1 - scale_x)}, 0) scale({scale_x}, 1)'}",# сжатие относительно точки встаки на основе коэффициентов из словаря
+        # f"{f'translate({x_pos_text_title_block_A3_GOST[i] * (1 - scale_x)}, 0) scale({scale_x}, 1)' if i==0 or i==11 else f''}", # сжатие относительно точки встаки
+        # f"{f'translate({x_pos_text_title_block_A3_GOST[i]*(1-scale_x)/scale_x}, 0) scale({scale_x}, 1)' if i==0 else f''}", # сжатие относительно центра
+        font_family="GOST type A",
+        font_size=font_size_title_block_A3_GOST[i],
+        fill="black"
+    )
+
+
 def draw_title_block(dwg: svgwrite.Drawing, combined_values: dict, default_values: dict):
     """
     Добавляет на чертеж рамку формата A3 по ГОСТ и надписи.
+    На холстах drawers.canvas рамка берётся из кэша листа (drawers.base_sheet), здесь — рисуется заново.
 
     :param dwg: Объект svgwrite.Drawing
     :param combined_values: Значения для заполнения полей надписи
@@ -20,74 +119,14 @@ def draw_title_block(dwg: svgwrite.Drawing, combined_values: dict, default_value
     """
     # Основная надпись A3
     #Линии A3
-    
-    if (len(Mx_title_block_A3_GOST) + len(My_title_block_A3_GOST) + 
-        len(Lx_title_block_A3_GOST) + len(Ly_title_block_A3_GOST)) / 4 == len(stroke_width_title_block_A3_GOST):
-        for i in range(len(stroke_width_title_block_A3_GOST)):
-            dwg.add(dwg.line(
-                start=(Mx_title_block_A3_GOST[i], My_title_block_A3_GOST[i]),
-                end=(Lx_title_block_A3_GOST[i], Ly_title_block_A3_GOST[i]),
-                stroke="black",
-                stroke_width=stroke_width_title_block_A3_GOST[i]
-            ))
-
-    # Надписи
-    if (len(text_text_title_block_A3_GOST) + len(x_pos_text_title_block_A3_GOST) +
-        len(y_pos_text_title_block_A3_GOST) + len(font_size_title_block_A3_GOST) + 
-        len(x_rot_text_title_block_A3_GOST) + len(y_rot_text_title_block_A3_GOST)) / 6 == len(ang_rot_text_title_block_A3_GOST):
-    # Проход по текстовым полям рамки
-        for i in range(len(font_size_title_block_A3_GOST)):
-            text_content = text_text_title_block_A3_GOST[i]
-            # Ищем ключ, которому принадлежит индекс `i`
-            key_for_i = next((k for k, indices in INDEX_TEXT_TITLE_BLOCK_A3_GOST.items() if i in indices), None)
-            if key_for_i:
-                current_value = combined_values.get(key_for_i)
-                default_value = default_values.get(key_for_i)
-                # logger.debug(f"i: {i}, key: '{key_for_i}', index_list: {INDEX_TEXT_TITLE_BLOCK_A3_GOST[key_for_i]}, старое='{default_value}', новое='{current_value}'")
-                if current_value != default_value:
-                    # logger.debug(f"ЗАМЕНА: ключ='{key_for_i}', индекс={i}, старое='{default_value}', новое='{current_value}'")
-                    text_content = current_value
-
-            # Добавляем слово сталь перед маркой материала
-            if i == 41: # Материал
-                text_content = f"Сталь {text_content}"
-
-            scale_dict = { # Коэффиуиенты масштабирования
-                0: 27, # 0: Обозначение внизу
-                11: 24.5, # 11: Обозначение сверху
-                41: 13 # 41: Материал
-            }
-
-            # # Динамическое масштабирование по длине надписи Обозначения на основе длины (формируется по шаблону, на длину сильнее все влияет марка стали материала)
-            # if i == 0 or i == 11: # 0: Обозначение внизу, 11: Обозначение сверху
-            #     char_width = 1
-            #     max_width = 27 if i == 0 else 24.5
-            #     scale_x = max_width / (char_width * len(text_content)) 
-            #     # scale_x = 0.75 if i == 0 else 0.78 #при i==0 обозначение внизу (сжатие 0,8), при i==11 обозначение сверху (сжатие 0,78)
+    for line in title_block_lines(dwg):
+        dwg.add(line)
 
-            
-                
-            if i in scale_dict:
-                char_width = 1
-                max_width = scale_dict[i]
-                scale_x = max_width / (char_width * len(text_content))
-            else:
-                scale_x = 1 
-
-                # print(i, max_width, scale_x )    
-                            
-
-            dwg.add(dwg.text(
-                text_content,
-                insert=(x_pos_text_title_block_A3_GOST[i], y_pos_text_title_block_A3_GOST[i]),
-                transform=f"rotate({ang_rot_text_title_block_A3_GOST[i]} {x_rot_text_title_block_A3_GOST[i]},{y_rot_text_title_block_A3_GOST[i]}) "
-                f"{f'translate({x_pos_text_title_block_A3_GOST[i] * (1 - scale_x)}, 0) scale({scale_x}, 1)'}",# сжатие относительно точки встаки на основе коэффициентов из словаря
-                # f"{f'translate({x_pos_text_title_block_A3_GOST[i] * (1 - scale_x)}, 0) scale({scale_x}, 1)' if i==0 or i==11 else f''}", # сжатие относительно точки встаки
-                # f"{f'translate({x_pos_text_title_block_A3_GOST[i]*(1-scale_x)/scale_x}, 0) scale({scale_x}, 1)' if i==0 else f''}", # сжатие относительно центра
-                font_family="GOST type A",
-                font_size=font_size_title_block_A3_GOST[i],
-                fill="black"
-            ))
+    # Надписи: ключ значения для каждой надписи — по индексу, без поиска по INDEX_TEXT_TITLE_BLOCK_A3_GOST
+    slots = title_block_slots()
+    for i in range(title_block_text_count()):
+        text_content = title_block_text_content(i, slots.get(i), combined_values, default_values)
+        dwg.add(title_block_text(dwg, i, text_content))
 
 # INDEX_TEXT_TITLE_BLOCK_A3_GOST = {
 #     "part_number": [0, 11], #DEFAULT_PART_NUMBER,
@@ -0,0 +1,178 @@
+# drawers/svg_canvas.py
+# Потоковая запись SVG: замена svgwrite.Drawing на пути рендеринга
+
+"""
+SvgCanvas — холст с API svgwrite.Drawing (drawers.canvas), который пишет элемент в буфер
+строк в момент его добавления в корень (dwg.add), без проверки атрибутов по профилю SVG
+и без дерева ElementTree. defs (маркеры, штриховки, шрифт) хранятся элементами и
+выводятся первыми в tostring(), как у svgwrite.Drawing.
+
+Вывод побайтно совпадает с svgwrite 1.4.3 (profile='full'):
+- атрибуты по алфавиту, значения через str(), пустые и None пропускаются;
+- points — "x,y x,y", d — команды и числа через пробел, x/y/dx/dy/rotate текста — через пробел;
+- экранирование и пустые элементы (" />") — как в xml.etree.ElementTree,
+  содержимое style — в CDATA.
+Проверка совпадения и замер — benchmarks/bench_svg_writer.py.
+
+Символы текстов собираются при выводе (chars) — для подмножества шрифта (font_embedder),
+потому что выведенные элементы не хранятся. Готовые части строки (постоянная часть листа)
+добавляются как есть: add_fragment, строка среди элементов defs.
+"""
+
+from drawers.canvas import Canvas, attr_name
+
+TEXT_TAGS = ("text", "tspan")
+# Атрибуты text/tspan, которые svgwrite хранит списком через пробел
+TEXT_POSITIONS = ("x", "y", "dx", "dy", "rotate")
+
+SVG_NAMESPACES = {
+    "xmlns": "http://www.w3.org/2000/svg",
+    "xmlns:xlink": "http://www.w3.org/1999/xlink",
+    "xmlns:ev": "http://www.w3.org/2001/xml-events",
+}
+
+
+def escape_attribute(text) -> str:
+    """Экранирование значения атрибута (как xml.etree.ElementTree._escape_attrib)."""
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    if "\"" in text:
+        text = text.replace("\"", "&quot;")
+    if "\r" in text:
+        text = text.replace("\r", "&#13;")
+    if "\n" in text:
+        text = text.replace("\n", "&#10;")
+    if "\t" in text:
+        text = text.replace("\t", "&#09;")
+    return text
+
+
+def escape_text(text) -> str:
+    """Экранирование текста элемента (как xml.etree.ElementTree._escape_cdata)."""
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def _flat_strings(values, out):
+    """Значения вложенных последовательностей строками, без None (как svgwrite.utils.strlist)."""
+    for value in values:
+        if isinstance(value, str):
+            out.append(value)
+        elif hasattr(value, "__iter__"):
+            _flat_strings(value, out)
+        elif value is not None:
+            out.append(str(value))
+    return out
+
+
+def path_string(commands) -> str:
+    """Атрибут d из команд push: буквы и координаты через пробел."""
+    return " ".join(_flat_strings(commands, []))
+
+
+def points_string(points) -> str:
+    """Атрибут points: "x,y x,y ..."."""
+    return " ".join([f"{x},{y}" for x, y in points])
+
+
+def attribute_strings(element) -> list:
+    """Пары (имя, строка значения) элемента в порядке вывода — по алфавиту, без пустых."""
+    tag = element.elementname
+    result = []
+    for key, value in element.attribs.items():
+        if value is None:
+            continue
+        if isinstance(value, str):
+            pass
+        elif key == "points" and tag in ("polyline", "polygon"):
+            value = points_string(value)
+        elif key in TEXT_POSITIONS and tag in TEXT_TAGS and isinstance(value, list):
+            value = " ".join(_flat_strings(value, []))
+        else:
+            value = str(value)
+        if value:
+            result.append((key, value))
+    if element.commands is not None:
+        value = path_string(element.commands)
+        if value:
+            result.append(("d", value))
+    result.sort()
+    return result
+
+
+def start_tag(element) -> str:
+    """Начало открывающего тега с атрибутами — без закрывающей скобки."""
+    return "<" + element.elementname + "".join(
+        [f' {key}="{escape_attribute(value)}"' for key, value in attribute_strings(element)])
+
+
+class SvgCanvas(Canvas):
+    """Холст, записывающий элементы строкой SVG сразу при добавлении в корень."""
+
+    elementname = "svg"
+
+    def __init__(self, size=("100%", "100%"), **extra):
+        super().__init__()
+        self.attribs = {"width": size[0], "height": size[1], **SVG_NAMESPACES,
+                        "baseProfile": "full", "version": "1.1"}
+        for key, value in extra.items():
+            self.attribs[attr_name(key)] = value
+        # Части строки SVG выведенных элементов (всё, кроме defs)
+        self.buffer = []
+        # Символы текстов (text, tspan) выведенных элементов
+        self.chars = set()
+
+    def emit(self, element):
+        self.write(element, self.buffer.append)
+
+    def add_fragment(self, fragment, chars=()):
+        """Готовая часть строки SVG (постоянная часть листа, drawers.base_sheet) и символы её текстов."""
+        self.buffer.append(fragment)
+        self.chars.update(chars)
+
+    def write(self, element, write):
+        """Пишет элемент и его потомков частями строки через write; готовая строка (str) пишется как есть."""
+        if isinstance(element, str):
+            write(element)
+            return
+        tag = element.elementname
+        write(start_tag(element))
+        text = element.text
+        if tag == "style":
+            content = f"<![CDATA[{text}]]>" if text else ""
+        elif tag in TEXT_TAGS:
+            # Пустой текст (None) — пустой элемент, а не строка "None", как у svgwrite
+            content = escape_text(str(text)) if text is not None else ""
+            if text is not None:
+                self.chars.update(str(text))
+        else:
+            content = ""
+        if content or element.elements:
+            write(">")
+            write(content)
+            for child in element.elements:
+                self.write(child, write)
+            write(f"</{tag}>")
+        else:
+            write(" />")
+
+    def tostring(self) -> str:
+        """Строка SVG: корень, defs, затем выведенные элементы в порядке добавления."""
+        head = []
+        write = head.append
+        write("<svg")
+        for key, value in sorted((key, str(value)) for key, value in self.attribs.items() if value is not None):
+            if value:
+                write(f' {key}="{escape_attribute(value)}"')
+        write(">")
+        self.write(self.defs, write)
+        return "".join(head) + "".join(self.buffer) + "</svg>"
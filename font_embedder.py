@@ -2,52 +2,153 @@
 # Расширенный класс подключения шрифта в SVG
 
 import base64
+import io
 import sys
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
+
+from svgwrite.text import TSpan
+
 from configs.config_log import logger
+from drawers.svg_canvas import SvgCanvas
 from utils.utils_core import resource_path
-from configs.config import ASSETS_DIR
+from configs.config import ASSETS_DIR, FONT_EMBED_MODE, FONT_SUBSET_CACHE_SIZE
+
+try:
+    from fontTools import subset as font_subset
+    from fontTools.ttLib import TTFont
+except ImportError:  # fontTools необязателен: без него режим 'subset' встраивает весь шрифт
+    font_subset = None
 
 print(sys.version)
 
-def add_fonts(dwg):
-    # Подключаем шрифт (автоматически встраивает в .exe, а при отладке — ссылкой)
-    font_embedder = FontEmbedder(
+def add_fonts(dwg, mode=None):
+    """
+    Подключает шрифт ГОСТ к чертежу (style в defs), mode — режим FontEmbedder (по умолчанию FONT_EMBED_MODE).
+    В режиме 'subset' вызывается после рисования: встраиваются только символы текстов чертежа.
+    В режиме 'system' ничего не добавляется — шрифт берётся из установленных в системе.
+    """
+    font_embedder = get_font_embedder(mode or FONT_EMBED_MODE)
+    chars = collect_chars(dwg) if font_embedder.mode == "subset" else None
+    css = font_embedder.get_css(chars)
+
+    # Добавляем в defs
+    if css:
+        dwg.defs.add(dwg.style(css))
+
+
+@lru_cache(maxsize=None)
+def get_font_embedder(mode) -> "FontEmbedder":
+    """
+    Один FontEmbedder на процесс для каждого режима: CSS шрифта (чтение TTF, подмножество, base64)
+    вычисляется один раз и дальше берётся из кэша экземпляра.
+    """
+    return FontEmbedder(
         relative_font_path=f"{ASSETS_DIR}/GOST_A.TTF",
         font_family="GOST type A",
-        mode="embed"
+        mode=mode
     )
 
-    # Добавляем в defs
-    dwg.defs.add(dwg.style(font_embedder.get_css()))
+
+def collect_chars(element) -> set:
+    """
+    Символы всех текстов (text, tspan) элемента svgwrite и его потомков.
+    SvgCanvas выведенные элементы не хранит — символы собраны им при выводе (chars).
+    """
+    if isinstance(element, SvgCanvas):
+        return set(element.chars)
+    chars = set()
+    stack = [element]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, TSpan) and node.text is not None:
+            chars.update(str(node.text))
+        stack.extend(node.elements)
+    return chars
+
+
+def subset_font(font_path, text) -> bytes:
+    """Шрифт, урезанный до глифов символов строки text (fontTools)."""
+    options = font_subset.Options()
+    options.notdef_outline = True
+    options.name_IDs = ["*"]
+    options.layout_features = ["*"]
+    options.drop_tables += ["FFTM"]  # служебная таблица FontForge, в SVG/PDF не нужна
+    font = TTFont(font_path)
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(text=text)
+    subsetter.subset(font)
+    output = io.BytesIO()
+    font.save(output)
+    return output.getvalue()
 
 
 class FontEmbedder:
+    # Предупреждение об отсутствии fontTools выводится один раз на процесс
+    _subset_warned = False
+
     def __init__(self, relative_font_path, font_family="CustomFont", mode="auto"):
         """
         relative_font_path — путь к шрифту относительно проекта или assets
         font_family — имя, которым шрифт будет доступен в SVG
-        mode: 'auto' (по умолчанию), 'embed' (встраивать), 'link' (подключать)
+        mode: 'auto' (по умолчанию), 'embed' (встраивать), 'subset' (встраивать только
+        использованные символы), 'link' (подключать), 'system' (не подключать: шрифт установлен
+        в системе, см. font_installer_linux.py — так его находит CairoSVG при выводе в PDF)
         """
         self.font_family = font_family
         self.font_path = resource_path(relative_font_path)
         self.mode = self._resolve_mode(mode)
+        # Готовый CSS: "" для всех режимов, кроме 'subset' — там ключ — символы чертежа.
+        # Для 'subset' хранится FONT_SUBSET_CACHE_SIZE наборов, вытесняется давно не использованный
+        self._css_cache = OrderedDict()
+        self._css_lock = threading.Lock()
 
     def _resolve_mode(self, mode):
         if mode == "auto":
             # Если работаем из .exe (есть _MEIPASS), встраиваем
             return "embed" if hasattr(sys, '_MEIPASS') else "link"
+        if mode == "subset" and font_subset is None:
+            if not FontEmbedder._subset_warned:
+                FontEmbedder._subset_warned = True
+                logger.warning("fontTools не установлен — шрифт встраивается целиком (pip install fonttools)")
+            return "embed"
         return mode
 
-    def get_css(self):
+    def get_css(self, chars=None):
+        """CSS код подключения шрифта (из кэша экземпляра). chars — символы чертежа (для режима 'subset')."""
+        key = "".join(sorted(chars or ())) if self.mode == "subset" else ""
+        with self._css_lock:
+            css = self._css_cache.get(key)
+            if css is not None:
+                self._css_cache.move_to_end(key)
+                return css
+        css = self._build_css(key)
+        with self._css_lock:
+            self._css_cache[key] = css
+            while len(self._css_cache) > FONT_SUBSET_CACHE_SIZE:
+                self._css_cache.popitem(last=False)
+        return css
+
+    def _build_css(self, text):
         """Генерирует CSS код подключения шрифта"""
+        if self.mode == "system":
+            return ""
+        if self.mode == "subset":
+            return self._get_subset_font_css(text)
         if self.mode == "embed":
             return self._get_embedded_font_css()
         else:
             return self._get_linked_font_css()
 
     def _get_embedded_font_css(self):
-        font_bytes = Path(self.font_path).read_bytes()
+        return self._font_face_css(Path(self.font_path).read_bytes())
+
+    def _get_subset_font_css(self, text):
+        return self._font_face_css(subset_font(self.font_path, text))
+
+    def _font_face_css(self, font_bytes):
         b64_str = base64.b64encode(font_bytes).decode("utf-8")
 
         mime = self._detect_mime(self.font_path)
@@ -1,12 +1,16 @@
 # generate_drawing.py
 # UTC+5: 2025-05-10 15:35 — подключен отдельный модуль для рисования рамки
 
-import svgwrite 
+import io
 import cairosvg
+import cairocffi
+from cairosvg.parser import Tree
+from cairosvg.surface import PDFSurface
 from configs.config_log import logger
-from utils.utils_core import save_svg_if_enabled, open_svg_in_browser_and_cleanup
+from utils.utils_core import save_svg_if_enabled, open_svg_in_browser_and_cleanup, stage_timer
 from configs.config import (
-    DEBUG, ALL_BLOCKS,
+    DEBUG, ALL_BLOCKS, FONT_EMBED_MODE, PDF_FONT_MODE, RENDER_BACKEND, RENDER_BACKENDS,
+    DISPLAY_LIST_OPTIMIZE, DISPLAY_LIST_SIMPLIFY_TOLERANCE,
     DEFAULT_VALUES_TITLE_BLOCK,
     DEFAULT_VALUES_DRAWING,
     DEFAULT_VALUES_FILENAME
@@ -16,12 +20,233 @@ from drawers.drawer_title_block import draw_title_block  # <-- подключа
 from drawers.drawer_dimenstions import draw_grid, draw_dimension, add_arrow_markers, draw_note, add_hatch_patterns # <-- подключаем новую функцию
 from drawers.drawer_table import draw_table
 from drawers.drawer_views import draw_views
+from drawers.base_sheet import get_base_sheet
+from drawers.canvas import Canvas, sizes
+from drawers.cairo_canvas import CairoCanvas, PT_PER_PX, page_size
+from drawers.display_list import DisplayList
+from drawers.svg_canvas import SvgCanvas
 from font_embedder import add_fonts
 from frame_calculations import (add_generated_part_number, add_count_of_rings, add_calc_weight, add_calc_frame_layout,
                                 add_material_as_wire_material, add_bottom_diameter, add_scale_on_title_block)
    
 
-def generate_pdf(svg_path=None, pdf_path=None, values=None, disable_svg_debug=False, save_pdf=False, draw_debug_grid=False, queue=None):
+# Вычисляемые параметры чертежа, в порядке выполнения
+CALCULATION_STEPS = (
+    add_count_of_rings,             # кол-во колец в изделии без замков
+    add_calc_frame_layout,          # расчётное кол-во колец в каждом сегменте каркаса и длины сегментов
+    add_bottom_diameter,            # диаметр донышка
+    add_generated_part_number,      # сгенерированное обозначение изделия
+    add_calc_weight,                # расчётная масса
+    add_scale_on_title_block,       # изменённый масштаб для 2-х и 3-х составных каркасов
+    add_material_as_wire_material,  # материал как материал проволоки
+)
+
+# Лист A3: размер и внутренний viewBox (в пикселях SVG)
+SHEET_SIZE = ("420mm", "297mm")
+SHEET_VIEWBOX = "0 0 1587.48 1122.56"
+
+
+def prepare_values(values=None, timings=None):
+    """
+    Объединяет значения по умолчанию с переданными пользователем и добавляет
+    вычисляемые параметры (кол-во колец, раскладка, масса, обозначение и т.д.).
+
+    timings (dict, optional): Сюда добавляется время каждого шага CALCULATION_STEPS, сек.
+
+    Возвращает:
+        tuple[dict, dict]: (combined_values, default_values)
+    """
+    # Изменяем словарь с формы {key: (label_text, default_value)} на форму {key: default_value}
+    default_values = {key: value[1] for key, value in ALL_BLOCKS.items()}
+    
+    # Объединяем с введёнными значениями из формы ввода данных
+    combined_values = {**default_values, **(values or {})}
+    
+    logger.info(f"Запуск рассчётов...")
+
+    for step in CALCULATION_STEPS:
+        with stage_timer(timings, step.__name__):
+            step(combined_values)
+
+    # logger.debug(f"Используемые значения: {combined_values}")
+
+    return combined_values, default_values
+
+
+def draw_sheet(dwg, combined_values, default_values, draw_debug_grid=False, timings=None):
+    """
+    Рисует лист (маркеры и штриховки в defs, виды, примечания, рамку, таблицу) на холсте dwg:
+    холсте drawers.canvas (SvgCanvas, CairoCanvas, DisplayList) или svgwrite.Drawing.
+    На холстах drawers.canvas постоянная часть листа берётся готовой из кэша процесса (BaseSheet),
+    на svgwrite.Drawing рисуется заново.
+    timings (dict, optional): Сюда добавляется время draw_views, draw_title_block и draw_table
+        (на холстах drawers.canvas — заполнение надписей, и draw_base_sheet — постоянная часть листа), сек.
+    """
+    base_sheet = get_base_sheet() if isinstance(dwg, Canvas) else None
+
+    # Добавляем стрелку маркера и штриховки
+    if base_sheet is not None:
+        base_sheet.add_defs(dwg)
+    else:
+        add_arrow_markers(dwg)
+        add_hatch_patterns(dwg)
+    
+    if draw_debug_grid:
+        draw_grid(dwg) # размерная сетка
+    
+    with stage_timer(timings, "draw_views"):
+        draw_views(dwg, combined_values)# <-- вызов отдельного модуля для чертёжных видов
+
+    if base_sheet is not None:
+        # примечания, рамка и таблица: готовые элементы и надписи из значений
+        base_sheet.draw(dwg, combined_values, default_values, timings)
+        return
+
+    draw_note(dwg) # примечания
+    
+    with stage_timer(timings, "draw_title_block"):
+        draw_title_block(dwg, combined_values, default_values) # <-- вызов отдельного модуля для рамки
+
+    with stage_timer(timings, "draw_table"):
+        draw_table(dwg, combined_values)# <-- вызов отдельного модуля для таблички
+
+
+def render_backend(combined_values) -> str:
+    """Способ вывода в PDF из параметров чертежа (render_backend) или RENDER_BACKEND."""
+    backend = combined_values.get("render_backend") or RENDER_BACKEND
+    if backend not in RENDER_BACKENDS:
+        raise ValueError(f"Неизвестный render_backend: {backend!r} (допустимо: {', '.join(RENDER_BACKENDS)})")
+    return backend
+
+
+def build_display_list(combined_values, default_values, draw_debug_grid=False, timings=None) -> DisplayList:
+    """
+    Рисует лист один раз в список отображения (render_backend='cairo'); из него строятся SVG, PDF и PNG.
+    До вывода список оптимизируется проходами DISPLAY_LIST_OPTIMIZE.
+    timings (dict, optional): Сюда добавляется время draw_* и optimize, сек.
+    """
+    display_list = DisplayList()
+    draw_sheet(display_list, combined_values, default_values, draw_debug_grid, timings)
+    with stage_timer(timings, "optimize"):
+        display_list.optimize(DISPLAY_LIST_OPTIMIZE, DISPLAY_LIST_SIMPLIFY_TOLERANCE,
+                              bounds=tuple(sizes(SHEET_VIEWBOX)))
+    return display_list
+
+
+def draw_cairo_page(surface, display_list, device_units_per_user_units=PT_PER_PX):
+    """
+    Рисует лист из списка отображения на текущей странице cairo-поверхности (PDF: размер
+    страницы — лист в pt) напрямую, без SVG. Шрифт берётся из системы, как у CairoSVG с PDF_FONT_MODE.
+    """
+    canvas = CairoCanvas.page(surface, SHEET_SIZE, SHEET_VIEWBOX, device_units_per_user_units)
+    display_list.replay(canvas)
+    canvas.context.show_page()
+
+
+def display_list_to_pdf(display_list, timings=None) -> bytes:
+    """PDF из списка отображения: рисование на PDF-поверхности cairo (replay) и её завершение (finish)."""
+    width, height = page_size(SHEET_SIZE)
+    output = io.BytesIO()
+    surface = cairocffi.PDFSurface(output, width * PT_PER_PX, height * PT_PER_PX)
+    with stage_timer(timings, "replay"):
+        draw_cairo_page(surface, display_list)
+    with stage_timer(timings, "finish"):
+        surface.finish()
+    return output.getvalue()
+
+
+def display_list_to_png(display_list, timings=None) -> bytes:
+    """PNG листа из списка отображения, 96 dpi (как svg2png): 1 px изображения = 1 px SVG."""
+    width, height = (int(value) for value in page_size(SHEET_SIZE))
+    surface = cairocffi.ImageSurface(cairocffi.FORMAT_ARGB32, width, height)
+    with stage_timer(timings, "replay"):
+        # Поверхность — целые px, а масштаб viewBox — по точному размеру листа, как у PNGSurface CairoSVG
+        canvas = CairoCanvas.page(surface, SHEET_SIZE, SHEET_VIEWBOX, device_units_per_user_units=1)
+        display_list.replay(canvas)
+    output = io.BytesIO()
+    with stage_timer(timings, "finish"):
+        surface.write_to_png(output)
+    return output.getvalue()
+
+
+def display_list_to_svg(display_list, timings=None, font_mode=None) -> str:
+    """Строка SVG из списка отображения (SvgCanvas), шрифт — как в build_svg."""
+    dwg = new_drawing()
+    with stage_timer(timings, "replay"):
+        display_list.replay(dwg)
+    with stage_timer(timings, "fonts"):
+        add_fonts(dwg, font_mode or FONT_EMBED_MODE)
+    with stage_timer(timings, "tostring"):
+        return dwg.tostring()
+
+
+# Сериализаторы списка отображения по формату вывода
+SERIALIZERS = {"pdf": display_list_to_pdf, "png": display_list_to_png, "svg": display_list_to_svg}
+
+
+def serialize(display_list, output_format, timings=None, **options):
+    """
+    Список отображения в формате output_format (pdf, png, svg). Результат кэшируется в списке
+    по формату и options: повторный вывод (например, SVG для просмотра и PDF из одного списка,
+    или тот же формат дважды) не рисует чертёж заново.
+    """
+    serializer = SERIALIZERS[output_format]
+    key = (output_format, *sorted(options.items()))
+    return display_list.cached(key, lambda display_list: serializer(display_list, timings, **options))
+
+
+def new_drawing() -> SvgCanvas:
+    """Пустой лист A3: размер в мм, viewBox в пикселях SVG. Вывод — SvgCanvas (SVG как у svgwrite, без его проверок)."""
+    # dwg = svgwrite.Drawing(size=("1190.64pt", "841.92pt"), profile='full')
+    dwg = SvgCanvas(size=SHEET_SIZE)
+    dwg.attribs['overflow'] = 'visible'
+    # dwg.attribs['viewBox'] = "0 0 420 297"
+    dwg.attribs['viewBox'] = SHEET_VIEWBOX
+    return dwg
+
+
+def build_svg(combined_values, default_values, draw_debug_grid=False, timings=None, font_mode=None) -> str:
+    """
+    Строит чертёж (лист A3: рамка, виды, таблица, примечания) и возвращает его как строку SVG.
+
+    Аргументы:
+        combined_values (dict): Значения после prepare_values.
+        default_values (dict): Значения по умолчанию (для основной надписи).
+        draw_debug_grid (bool): Добавить вспомогательную размерную сетку.
+        timings (dict, optional): Сюда добавляется время draw_views, draw_base_sheet,
+            fonts и tostring, сек.
+        font_mode (str, optional): Подключение шрифта (см. FontEmbedder), по умолчанию FONT_EMBED_MODE.
+    """
+    dwg = new_drawing()
+    
+    """
+    px	пиксели (по умолчанию)
+    mm	миллиметры
+    cm	сантиметры
+    in	дюймы
+    pt	пункты (1 pt = 1/72 in)
+    pc	пика (1 pc = 12 pt)
+    %
+    
+    """
+
+    draw_sheet(dwg, combined_values, default_values, draw_debug_grid, timings)
+
+    # Шрифт подключается после рисования: в режиме 'subset' встраиваются только символы текстов чертежа
+    with stage_timer(timings, "fonts"):
+        add_fonts(dwg, font_mode or FONT_EMBED_MODE)
+
+    # Сохраняем SVG файл, если не отключено disable_svg_debug
+    # save_svg_if_enabled(dwg, disable_svg_debug, svg_path)
+
+    # Получаем SVG как строку для PDF генерации
+    # logger.debug(f"SVG файл выглядит так: {dwg.tostring()}")
+    with stage_timer(timings, "tostring"):
+        return dwg.tostring()
+
+
+def generate_pdf(svg_path=None, pdf_path=None, values=None, disable_svg_debug=False, save_pdf=False, draw_debug_grid=False, queue=None,
+                 on_stage=None, timings=None):
     """
     Генерирует PDF-файл чертежа детали на основе входных параметров.
 
@@ -30,20 +255,25 @@ def generate_pdf(svg_path=None, pdf_path=None, values=None, disable_svg_debug=Fa
         2. Добавляет вычисляемые параметры, такие как масса, обозначение, количество колец и материал.
         3. Создаёт чертёж в формате SVG с указанием размера листа (A3) и всех необходимых элементов (рамка, виды, таблицы, примечания).
         4. При необходимости сохраняет SVG-файл для отладки.
-        5. Преобразует SVG в PDF с помощью CairoSVG.
+        5. Преобразует SVG в PDF с помощью CairoSVG (или, при render_backend='cairo', рисует чертёж сразу в PDF).
         6. Возвращает результат через очередь, если она задана (например, при запуске в отдельном процессе).
 
         Аргументы:
             svg_path (str, optional): Путь для сохранения промежуточного SVG-файла (если не отключена отладка).
             pdf_path (str): Путь, по которому будет сохранён итоговый PDF-файл.
+                Если None — PDF не пишется на диск, а возвращается из функции в виде байтов.
             values (dict, optional): Пользовательские параметры, влияющие на чертёж (например, размеры, текст, маркировка).
             disable_svg_debug (bool): Если True — SVG-файл не сохраняется для отладки.
             save_pdf (bool): Если True — PDF будет сохранён (используется даже в режиме отладки).
             draw_debug_grid (bool): Если True — добавляется вспомогательная размерная сетка в SVG.
             queue (multiprocessing.Queue, optional): Очередь для передачи результата выполнения (успех или ошибка) при запуске в отдельном процессе.
+            on_stage (callable, optional): Вызывается с именем этапа ("calculations", "svg", "pdf") в начале каждого этапа.
+            timings (dict, optional): Сюда добавляется время шагов генерации, сек
+                (add_* из frame_calculations, draw_*, tostring, svg2pdf или optimize, replay, finish, write).
 
         Возвращает:
-            None. Но результат (успешное завершение или ошибка) может быть помещён в очередь, если она передана.
+            bytes | None: содержимое PDF, если pdf_path не задан (режим без записи на диск), иначе None.
+            Результат (успешное завершение или ошибка) также может быть помещён в очередь, если она передана.
 
         Примечания:
             - Размер чертежа задаётся в миллиметрах (A3: 420 мм × 297 мм), но внутренний viewBox используется в пикселях (1587.48 × 1122.56).
@@ -66,95 +296,56 @@ def generate_pdf(svg_path=None, pdf_path=None, values=None, disable_svg_debug=Fa
     Итого 1,777 на экране. Но зато при печати всё будет корректно отображаться в размерах.   
     '''
     
-    # Изменяем словарь с формы {key: (label_text, default_value)} на форму {key: default_value}
-    default_values = {key: value[1] for key, value in ALL_BLOCKS.items()}
-    
-    # Объединяем с введёнными значениями из формы ввода данных
-    combined_values = {**default_values, **(values or {})}
-    
-    logger.info(f"Запуск рассчётов...")
-
-    # Добавляем кол-во колец в изделии без замков
-    add_count_of_rings(combined_values)
-    
-    # Добавляем расчётное количество колец в каждом сегменте каркаса и длины каждого сегмента
-    add_calc_frame_layout(combined_values)
+    if on_stage is not None:
+        on_stage("calculations")
 
-    # Дабавляем значение диаметра донышка
-    add_bottom_diameter(combined_values)
+    combined_values, default_values = prepare_values(values, timings)
 
-    # Добавляем сгененрированное обозначения изделия
-    add_generated_part_number(combined_values)
+    if on_stage is not None:
+        on_stage("svg")
 
-    # Добавляем рассчётную массу
-    add_calc_weight(combined_values)
-
-    # Добавляем изменённое значение масштаба для 2-х и 3-х составных каркасов
-    add_scale_on_title_block(combined_values)
-    
-    # Добавляем материал как материал проволоки
-    add_material_as_wire_material(combined_values)
-
-    # logger.debug(f"Используемые значения: {combined_values}")
+    backend = render_backend(combined_values)
 
       # Создание SVG в памяти        
     try:
-        # dwg = svgwrite.Drawing(size=("1190.64pt", "841.92pt"), profile='full')
-        dwg = svgwrite.Drawing(size=("420mm", "297mm"), profile='full')
-        dwg.attribs['overflow'] = 'visible'
-        # dwg.attribs['viewBox'] = "0 0 420 297"
-        dwg.attribs['viewBox'] = "0 0 1587.48 1122.56"
-        
-        """
-        px	пиксели (по умолчанию)
-        mm	миллиметры
-        cm	сантиметры
-        in	дюймы
-        pt	пункты (1 pt = 1/72 in)
-        pc	пика (1 pc = 12 pt)
-        %
-        
-        """
-
-        
-        add_fonts(dwg)
+        if backend == "cairo":
+            # Чертёж рисуется один раз; SVG для отладочного просмотра и PDF строятся из одного списка
+            display_list = build_display_list(combined_values, default_values, draw_debug_grid, timings)
+            if not disable_svg_debug:
+                open_svg_in_browser_and_cleanup(serialize(display_list, "svg", timings), disable_svg_debug)
+        else:
+            # SVG только для PDF (без отладочного просмотра) — без встроенного шрифта (PDF_FONT_MODE)
+            font_mode = FONT_EMBED_MODE if not disable_svg_debug else PDF_FONT_MODE
+            svg_string = build_svg(combined_values, default_values, draw_debug_grid, timings, font_mode)
 
-        # Добавляем стрелку маркера
-        add_arrow_markers(dwg)
-
-        add_hatch_patterns(dwg)
-        
-        if draw_debug_grid:
-            draw_grid(dwg) # размерная сетка
-        
-        draw_views(dwg, combined_values)# <-- вызов отдельного модуля для чертёжных видов
-        
-        draw_note(dwg) # примечания
-        
-        draw_title_block(dwg, combined_values, default_values) # <-- вызов отдельного модуля для рамки
-
-        draw_table(dwg, combined_values)# <-- вызов отдельного модуля для таблички
-
-        # Сохраняем SVG файл, если не отключено disable_svg_debug
-        # save_svg_if_enabled(dwg, disable_svg_debug, svg_path)
-
-        # Получаем SVG как строку для PDF генерации
-        # logger.debug(f"SVG файл выглядит так: {dwg.tostring()}")
-        svg_string = dwg.tostring()
-
-        # Cохраняем, открываем и потом (через 5 сек) удаляем временный SVG-файл
-        open_svg_in_browser_and_cleanup(svg_string, disable_svg_debug)
+            # Cохраняем, открываем и потом (через 5 сек) удаляем временный SVG-файл
+            open_svg_in_browser_and_cleanup(svg_string, disable_svg_debug)
         
     except Exception as e:
         logger.error(f"Ошибка при создании SVG: {e}")
         raise Exception(f"Ошибка при генерации чертежа: {e}")
 
     if not DEBUG or save_pdf:
-        # Преобразование SVG → PDF через CairoSVG
+        if on_stage is not None:
+            on_stage("pdf")
+
+        # Преобразование SVG → PDF через CairoSVG или рисование сразу в PDF (render_backend='cairo')
         try:
-            cairosvg.svg2pdf(bytestring=svg_string.encode("utf-8"), write_to=pdf_path)
+            # PDF формируется в памяти; запись в файл — отдельным шагом (его время замеряется отдельно)
+            if backend == "cairo":
+                pdf_bytes = serialize(display_list, "pdf", timings)
+            else:
+                with stage_timer(timings, "svg2pdf"):
+                    pdf_bytes = cairosvg.svg2pdf(bytestring=svg_string.encode("utf-8"))
+            if pdf_path is not None:
+                with stage_timer(timings, "write"):
+                    with open(pdf_path, "wb") as f:
+                        f.write(pdf_bytes)
             if queue is not None:
                 queue.put({"status": "OK", "path": pdf_path})
+            if pdf_path is None:
+                logger.info(f"PDF сформирован в памяти: {len(pdf_bytes)} байт")
+                return pdf_bytes
             logger.info(f"PDF файл успешно создан: {pdf_path}")   
         except Exception as e:
             if queue is not None:
@@ -169,3 +360,96 @@ def generate_pdf(svg_path=None, pdf_path=None, values=None, disable_svg_debug=Fa
             
 
 
+
+
+class _SharedPdfPage(PDFSurface):
+    """
+    Страница многостраничного PDF: рисует SVG на общей для всех страниц cairo-поверхности.
+
+    CairoSVG создаёт новую поверхность на каждый SVG; здесь _create_surface возвращает
+    одну и ту же поверхность (меняя только размер страницы), а разобранные маркеры
+    и паттерны штриховки берутся с предыдущей страницы (parent_surface).
+    """
+
+    def __init__(self, tree, output, shared_surface, previous_page=None):
+        self.shared_surface = shared_surface
+        super().__init__(tree, output, 96, parent_surface=previous_page)
+
+    def _create_surface(self, width, height):
+        self.shared_surface.set_size(width, height)
+        return self.shared_surface, width, height
+
+
+def svg_pages_to_pdf(svg_pages, pdf_path=None, timings=None):
+    """
+    Собирает несколько SVG в один PDF на одной cairo-поверхности.
+
+    Шрифты внедряются в документ один раз (cairo формирует общий набор глифов
+    на весь документ), маркеры и штриховки разбираются один раз для всех страниц.
+    Страница может быть и списком отображения (render_backend='cairo') — он рисуется
+    на той же поверхности напрямую.
+    Возвращает байты PDF, если pdf_path не задан.
+    """
+    output = io.BytesIO()
+    with stage_timer(timings, "svg2pdf"):
+        # Размер задаётся для каждой страницы в _SharedPdfPage._create_surface
+        shared_surface = cairocffi.PDFSurface(output, 1, 1)
+        previous_page = None
+        for svg_string in svg_pages:
+            if isinstance(svg_string, DisplayList):
+                width, height = page_size(SHEET_SIZE)
+                shared_surface.set_size(width * PT_PER_PX, height * PT_PER_PX)
+                draw_cairo_page(shared_surface, svg_string)
+                continue
+            tree = Tree(bytestring=svg_string.encode("utf-8"))
+            page = _SharedPdfPage(tree, output, shared_surface, previous_page)
+            page.context.show_page()
+            previous_page = page
+        shared_surface.finish()
+    if pdf_path is None:
+        return output.getvalue()
+    with stage_timer(timings, "write"):
+        with open(pdf_path, "wb") as f:
+            f.write(output.getbuffer())
+
+
+def generate_multipage_pdf(values_list, pdf_path=None, on_stage=None, timings=None):
+    """
+    Генерирует один многостраничный PDF: по странице A3 на каждый набор параметров.
+
+    Аргументы:
+        values_list (list[dict]): Наборы пользовательских параметров (как values у generate_pdf).
+        pdf_path (str, optional): Путь для сохранения. Если None — возвращаются байты PDF.
+        on_stage (callable, optional): Вызывается с именем этапа ("calculations", "svg", "pdf").
+        timings (dict, optional): Сюда добавляется суммарное по страницам время шагов генерации, сек.
+
+    Возвращает:
+        bytes | None: содержимое PDF, если pdf_path не задан.
+    """
+    svg_pages = []
+    for page_number, values in enumerate(values_list, start=1):
+        if on_stage is not None:
+            on_stage("calculations")
+        combined_values, default_values = prepare_values(values, timings)
+
+        if on_stage is not None:
+            on_stage("svg")
+        try:
+            if render_backend(combined_values) == "cairo":
+                svg_pages.append(build_display_list(combined_values, default_values, timings=timings))
+            else:
+                svg_pages.append(build_svg(combined_values, default_values, timings=timings, font_mode=PDF_FONT_MODE))
+        except Exception as e:
+            logger.error(f"Ошибка при создании SVG (страница {page_number}): {e}")
+            raise Exception(f"Ошибка при генерации чертежа (страница {page_number}): {e}")
+
+    if on_stage is not None:
+        on_stage("pdf")
+    try:
+        pdf_bytes = svg_pages_to_pdf(svg_pages, pdf_path, timings)
+    except Exception as e:
+        logger.error(f"Ошибка при генерации многостраничного PDF: {e}")
+        raise Exception(f"Ошибка при создании PDF: {e}")
+
+    logger.info(f"Многостраничный PDF сформирован: {len(svg_pages)} стр.")
+    return pdf_bytes
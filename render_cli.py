@@ -0,0 +1,57 @@
+# render_cli.py
+# Генерация чертежей из командной строки (без сервера и GUI)
+
+"""
+Примеры:
+    python render_cli.py order.csv -o order.pdf               # все чертежи одним многостраничным PDF
+    python render_cli.py order.json --separate -o output/     # отдельный PDF на каждый чертёж
+
+Входной файл — JSON-массив объектов или CSV (первая строка — имена полей),
+ключи те же, что у формы (DEFAULT_VALUES_DRAWING, DEFAULT_VALUES_TITLE_BLOCK, filename).
+"""
+
+import argparse
+import os
+import sys
+
+from app.batch import BatchError, parse_batch_payload
+from configs.config_log import logger
+from configs.config_server import BATCH_MAX_ITEMS
+from generate_drawing import generate_pdf, generate_multipage_pdf
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Генерация PDF-чертежей каркасов из JSON/CSV")
+    parser.add_argument("input", help="JSON- или CSV-файл с наборами параметров")
+    parser.add_argument("-o", "--output", required=True,
+                        help="PDF-файл (многостраничный режим) или каталог (--separate)")
+    parser.add_argument("--separate", action="store_true", help="отдельный PDF на каждый набор параметров")
+    args = parser.parse_args(argv)
+
+    content_type = "text/csv" if args.input.lower().endswith(".csv") else "application/json"
+    with open(args.input, "rb") as f:
+        try:
+            items = parse_batch_payload(f.read(), content_type, BATCH_MAX_ITEMS)
+        except BatchError as e:
+            logger.error(f"Некорректный входной файл: {e}")
+            return 1
+
+    if not args.separate:
+        generate_multipage_pdf([values for values, _ in items], pdf_path=args.output)
+        logger.info(f"Сохранено {len(items)} стр. в {args.output}")
+        return 0
+
+    os.makedirs(args.output, exist_ok=True)
+    failed = 0
+    for index, (values, filename) in enumerate(items, start=1):
+        pdf_path = os.path.join(args.output, f"{index:03d}_{filename}.pdf")
+        try:
+            generate_pdf(pdf_path=pdf_path, values=values, disable_svg_debug=True, save_pdf=True)
+        except Exception as e:  # noqa: BLE001
+            failed += 1
+            logger.error(f"Чертёж {index} ({filename}) не создан: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 # run.py
 
+import argparse
 import os
 import sys
 
@@ -8,34 +9,77 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
-from flask import jsonify
-from werkzeug.exceptions import HTTPException
 from configs.config_log import logger
+from configs.config_server import SERVER_MODE, SERVER_HOST, SERVER_PORT
 from app.server import app
+from app.render_pool import get_render_pool
+from app.runtime_config import runtime_config
 
 
-# === Глобальный обработчик ошибок ===
-@app.errorhandler(Exception)
-def handle_exception(e):
+def run_dev(host, port):
+    """Встроенный сервер Flask (поток на запрос)."""
+    logger.info("Starting Flask server...")
+    # Запускаем и прогреваем пул процессов рендеринга до приёма первых запросов
+    get_render_pool()
+    # SIGHUP — перечитать .env, токены и настройки чертежа без перезапуска
+    runtime_config.install_signal_handler()
+    app.run(host=host, port=port, debug=False)
+
+
+def run_production(host, port):
     """
-    Логируем все неожиданные исключения.
-    HTTP-исключения (404, 405 и т.п.) отдаём как есть.
+    gunicorn: несколько процессов-обработчиков, приложение загружено до fork,
+    настройки — configs/gunicorn_conf.py (число процессов, keep-alive, перезапуск по HUP).
     """
-    if isinstance(e, HTTPException):
-        return e
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        logger.error("Для режима production нужен gunicorn: pip install gunicorn")
+        return 1
+    from configs import gunicorn_conf
+
+    class ProductionServer(BaseApplication):
+        def load_config(self):
+            for key, value in vars(gunicorn_conf).items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+            self.cfg.set("bind", f"{host}:{port}")
+
+        def load(self):
+            return app
 
-    logger.exception("Unhandled exception:")
-    response = {
-        "error": str(e),
-        "type": type(e).__name__,
-    }
-    return jsonify(response), 500
+    logger.info("Starting production server (gunicorn)...")
+    ProductionServer().run()
+    return 0
+
+
+def run_asgi(host, port):
+    """ASGI-приложение app.asgi под uvicorn: ожидание рендеринга не занимает поток."""
+    try:
+        import uvicorn
+    except ImportError:
+        logger.error("Для режима asgi нужен uvicorn: pip install uvicorn")
+        return 1
+    logger.info("Starting ASGI server...")
+    # Пул рендеринга запускается в lifespan-событии startup (app.asgi.lifespan)
+    runtime_config.install_signal_handler()
+    uvicorn.run("app.asgi:application", host=host, port=port, lifespan="on")
+    return 0
 
 
 # === Точка входа ===
 if __name__ == "__main__":
-    logger.info("Starting Flask server...")
-    # Для отладки можно посмотреть версию Python
-    print(sys.version)
-    app.run(host="0.0.0.0", port=5000, debug=False)
+    parser = argparse.ArgumentParser(description="Сервер генерации чертежей")
+    parser.add_argument("--mode", choices=("dev", "production", "asgi"), default=SERVER_MODE,
+                        help="dev — сервер Flask, production — gunicorn, asgi — uvicorn (по умолчанию SERVER_MODE)")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    args = parser.parse_args()
 
+    # Для отладки можно посмотреть версию Python
+    print(sys.version, flush=True)
+    if args.mode == "production":
+        sys.exit(run_production(args.host, args.port))
+    if args.mode == "asgi":
+        sys.exit(run_asgi(args.host, args.port))
+    run_dev(args.host, args.port)
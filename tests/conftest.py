@@ -0,0 +1,20 @@
+# tests/conftest.py
+# Корень проекта в sys.path (как в benchmarks/*.py) и общие фикстуры тестов
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture
+def cairo():
+    """cairocffi; без libcairo тест пропускается (cairocffi тогда бросает OSError, а не ImportError)."""
+    try:
+        import cairocffi
+    except (ImportError, OSError) as error:
+        pytest.skip(f"нужна libcairo: {error}")
+    return cairocffi
@@ -0,0 +1,111 @@
+# tests/test_asgi.py
+# ASGI-режим: в цикле событий /generate только ждёт рендеринг, блокирующие шаги идут в пуле потоков
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+import app.asgi as asgi
+import app.server as server
+
+
+class FakePool:
+    """Пул рендеринга без воркеров: Future заданий завершает тест."""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, **options):
+        job = type("Job", (), {})()
+        job.future = Future()
+        self.futures.append(job.future)
+        return job
+
+    def stats(self):
+        return {"size": 0}
+
+
+@pytest.fixture
+def threads(monkeypatch):
+    """Имена потоков, в которых выполнялись блокирующие шаги /generate."""
+    seen = []
+    monkeypatch.setattr(server, "is_authorized", lambda: True)
+    monkeypatch.setattr(server.rate_limiter, "enabled", False)
+    monkeypatch.setattr(server, "finish_render", lambda *args: None)
+
+    def record_thread(result=None):
+        def step(*args, **kwargs):
+            seen.append(threading.current_thread().name)
+            return result
+        return step
+
+    monkeypatch.setattr(server.runtime_config, "check", record_thread())
+    monkeypatch.setattr(server.request_capture, "record", record_thread())
+    monkeypatch.setattr(server.pdf_cache, "get", record_thread())
+    return seen
+
+
+async def call(method, path, body=b""):
+    """Выполняет запрос к ASGI-приложению, возвращает (статус, тело)."""
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"", "headers": [
+        (b"content-type", b"application/x-www-form-urlencoded")]}
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi.application(scope, receive, send)
+    return sent[0]["status"], b"".join(message.get("body", b"") for message in sent[1:])
+
+
+def test_generate_waits_in_loop_and_blocks_only_worker_threads(threads, monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(server, "get_render_pool", lambda **options: pool)
+
+    async def scenario():
+        generate = asyncio.ensure_future(call("POST", "/generate"))
+        while not pool.futures:
+            await asyncio.sleep(0.01)
+        # Пока /generate ждёт рендеринг, цикл событий обслуживает другие запросы
+        status, _ = await call("GET", "/health")
+        assert status == 200
+        assert not generate.done()
+        pool.futures[0].set_result({"status": "OK", "pdf": b"%PDF-test", "timings": {}, "pdf_size": 9})
+        return await asyncio.wait_for(generate, timeout=10)
+
+    status, body = asyncio.run(scenario())
+    assert status == 200
+    assert body == b"%PDF-test"
+    assert threads and all(name.startswith("asgi-request") for name in threads)
+
+
+def test_blocking_step_does_not_stall_loop(threads, monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(server, "get_render_pool", lambda **options: pool)
+
+    def slow_cache_get(key):
+        time.sleep(0.5)
+
+    monkeypatch.setattr(server.pdf_cache, "get", slow_cache_get)
+
+    async def scenario():
+        generate = asyncio.ensure_future(call("POST", "/generate"))
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        await asyncio.sleep(0.01)
+        # Медленное чтение кэша выполняется в пуле потоков и не задерживает цикл событий
+        assert time.monotonic() - started < 0.3
+        while not pool.futures:
+            await asyncio.sleep(0.01)
+        pool.futures[0].set_result({"status": "error", "message": "тест", "stage": "svg"})
+        return await asyncio.wait_for(generate, timeout=10)
+
+    status, _ = asyncio.run(scenario())
+    assert status >= 500
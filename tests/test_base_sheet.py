@@ -0,0 +1,19 @@
+# tests/test_base_sheet.py
+# Шаблон листа (BaseSheet): время надписей — под шагами draw_title_block и draw_table, как без шаблона
+
+import pytest
+
+from drawers.display_list import DisplayList
+from drawers.svg_canvas import SvgCanvas
+
+
+@pytest.mark.parametrize("canvas", [SvgCanvas, DisplayList])
+def test_slot_filling_is_timed_under_original_steps(cairo, canvas):
+    from app.render_pool import default_render_values
+    from generate_drawing import draw_sheet, prepare_values
+
+    combined, defaults = prepare_values(default_render_values())
+    timings = {}
+    draw_sheet(canvas(), combined, defaults, timings=timings)
+    assert {"draw_views", "draw_title_block", "draw_table", "draw_base_sheet"} <= timings.keys()
+    assert all(seconds >= 0 for seconds in timings.values())
@@ -0,0 +1,134 @@
+# tests/test_display_list.py
+# Проходы оптимизации списка отображения: что убирается, что сохраняется, и что рисунок не меняется
+
+from drawers.display_list import OPTIMIZATIONS, DisplayList, simplify_points
+
+SHEET_SIZE = ("200", "120")
+SHEET_VIEWBOX = "0 0 200 120"
+BOUNDS = (0, 0, 200, 120)
+
+
+def build_scene():
+    """
+    Лист 200×120 с крайними случаями проходов. Записи: 0 — группа, 1, 2 — полупрозрачные повторы,
+    3, 4 — непрозрачные повторы, 5 — ломаная с маркерами, 6 — дуга с концами за краем листа,
+    7 — замкнутый многоугольник, 8 — окружность у края, 9, 10 — группа с фигурой вне листа.
+    """
+    dl = DisplayList()
+    marker = dl.marker(id="dot", insert=(2, 2), size=(4, 4), viewBox="0 0 4 4", orient="auto",
+                       markerUnits="strokeWidth")
+    marker.add(dl.circle(center=(2, 2), r=2, fill="black"))
+    dl.defs.add(marker)
+
+    group = dl.g(stroke="black", fill="none")
+    for _ in range(2):
+        group.add(dl.rect(insert=(10, 10), size=(40, 30), fill="red", fill_opacity=0.5))
+    # По сетке пикселей: у повтора нет полупрозрачных краёв сглаживания, рисунок не меняется
+    for _ in range(2):
+        group.add(dl.line(start=(10, 100.5), end=(100, 100.5), stroke_width=1))
+    polyline = dl.polyline(points=[(60, 20), (80, 20), (100, 20)], stroke_width=1)
+    polyline.set_markers("#dot")
+    group.add(polyline)
+    group.add(dl.path(d="M -10 -10 A 70 70 0 0 1 -10 130", stroke_width=2))
+    group.add(dl.polygon(points=[(120, 20), (150, 20), (180, 20), (180, 60), (120, 60), (120, 40)],
+                         fill="blue", stroke_width=1))
+    group.add(dl.circle(center=(150, 118), r=10, stroke_width=1))
+    dl.add(group)
+
+    outside = dl.g(stroke="black")
+    outside.add(dl.rect(insert=(300, 300), size=(10, 10)))
+    dl.add(outside)
+    return dl
+
+
+def points_of(display_list, index):
+    values = display_list._coords(index)
+    return [(values[offset], values[offset + 1]) for offset in range(0, len(values), 2)]
+
+
+def distance_to_segment(point, first, last):
+    dx, dy = last[0] - first[0], last[1] - first[1]
+    return abs(dx * (point[1] - first[1]) - dy * (point[0] - first[0])) / (dx * dx + dy * dy) ** .5
+
+
+# simplify_points
+
+def test_simplify_points_drops_collinear_and_keeps_ends():
+    assert simplify_points([(0, 0), (1, 0), (2, 0), (2, 1)], 0.01) == [(0, 0), (2, 0), (2, 1)]
+    assert simplify_points([(0, 0), (1, 0)], 0.01) == [(0, 0), (1, 0)]
+
+
+def test_simplify_points_keeps_turns_and_backtracking():
+    assert simplify_points([(0, 0), (1, 0.5), (2, 0)], 0.01) == [(0, 0), (1, 0.5), (2, 0)]
+    # Точка на прямой, но за концом отрезка — ломаная возвращается назад, её нельзя убирать
+    assert simplify_points([(0, 0), (2, 0), (1, 0)], 0.01) == [(0, 0), (2, 0), (1, 0)]
+
+
+def test_simplify_points_deviation_is_bounded_by_tolerance():
+    # Плавная дуга: каждая точка близко к соседнему отрезку, но отклонения накапливаются
+    points = [(x, 0.002 * x * x) for x in range(20)]
+    tolerance = 0.05
+    result = simplify_points(points, tolerance)
+    assert len(result) < len(points)
+    for first, last in zip(result, result[1:]):
+        dropped = points[points.index(first) + 1:points.index(last)]
+        assert all(distance_to_segment(point, first, last) <= tolerance for point in dropped)
+
+
+def test_simplify_points_closed_polygon_simplifies_closing_edge():
+    points = [(0, 0), (1, 0), (2, 0), (2, 2), (0, 2), (0, 1)]
+    assert simplify_points(points, 0.01, closed=True) == [(0, 0), (2, 0), (2, 2), (0, 2)]
+    # Без closed замыкающая сторона не учитывается: последняя точка — конец ломаной
+    assert simplify_points(points, 0.01) == [(0, 0), (2, 0), (2, 2), (0, 2), (0, 1)]
+
+
+# Маски проходов
+
+def test_dedupe_mask_keeps_translucent_repeats_and_last_opaque_repeat():
+    keep = build_scene()._dedupe_mask()
+    assert keep[1] and keep[2]
+    assert not keep[3] and keep[4]
+    assert keep.count(False) == 1
+
+
+def test_cull_mask_keeps_arcs_and_shapes_crossing_the_edge():
+    keep = build_scene()._cull_mask(BOUNDS)
+    # Убираются только фигура вне листа и опустевшая группа; дуга (концы за краем) и окружность — нет
+    assert [index for index, kept in enumerate(keep) if not kept] == [9, 10]
+
+
+def test_cull_mask_keeps_marked_shapes():
+    dl = build_scene()
+    outside = dl.polyline(points=[(300, 10), (320, 10)], stroke="black")
+    outside.set_markers("#dot")
+    dl.add(outside)
+    assert dl._cull_mask(BOUNDS)[-1]
+
+
+def test_simplify_keeps_marker_vertices_and_polygon_closure():
+    dl = build_scene()
+    removed = dl.optimize(("simplify",), 0.01)
+    assert removed == {"simplify": 2}
+    assert points_of(dl, 5) == [(60, 20), (80, 20), (100, 20)]
+    assert points_of(dl, 7) == [(120, 20), (180, 20), (180, 60), (120, 60)]
+
+
+# Воспроизведение
+
+def render(cairo, display_list):
+    from drawers.cairo_canvas import CairoCanvas
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 200, 120)
+    display_list.replay(CairoCanvas.page(surface, SHEET_SIZE, SHEET_VIEWBOX, device_units_per_user_units=1))
+    surface.flush()
+    return bytes(surface.get_data())
+
+
+def test_optimized_replay_matches_unoptimized(cairo):
+    expected = render(cairo, build_scene())
+    optimized = build_scene()
+    removed = optimized.optimize(OPTIMIZATIONS, 0.01, bounds=BOUNDS)
+    assert removed == {"simplify": 2, "cull": 2, "dedupe": 1}
+    actual = render(cairo, optimized)
+    # Каналы пикселей (ARGB); у повторов по сетке и убранных точек на прямой отличий нет вовсе
+    changed = sum(1 for first, second in zip(expected, actual) if abs(first - second) > 2)
+    assert changed == 0
@@ -0,0 +1,44 @@
+# tests/test_form_validation.py
+# Недопустимый render_backend отклоняется с ответом 400 до постановки задания в пул рендеринга
+
+import json
+
+import pytest
+
+import app.server as server
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server, "is_authorized", lambda: True)
+    monkeypatch.setattr(server.rate_limiter, "enabled", False)
+
+    def no_render_pool(**options):
+        raise AssertionError("задание с недопустимыми полями не должно попасть в пул рендеринга")
+
+    monkeypatch.setattr(server, "get_render_pool", no_render_pool)
+    return server.app.test_client()
+
+
+@pytest.mark.parametrize("path", ["/generate", "/jobs"])
+def test_unknown_render_backend_in_form(client, path):
+    response = client.post(path, data={"render_backend": "skia"})
+    assert response.status_code == 400
+    assert "render_backend" in response.json["error"]
+
+
+@pytest.mark.parametrize("path", ["/generate/batch", "/generate/multipage"])
+def test_unknown_render_backend_in_batch(client, path):
+    body = json.dumps([{}, {"render_backend": "skia"}])
+    response = client.post(path, data=body, content_type="application/json")
+    assert response.status_code == 400
+    assert "render_backend" in response.json["error"]
+
+
+def test_empty_render_backend_is_default():
+    from werkzeug.datastructures import MultiDict
+
+    values, _ = server.parse_form_values(MultiDict({"render_backend": ""}))
+    assert "render_backend" not in values
+    values, _ = server.parse_form_values(MultiDict({"render_backend": "cairo"}))
+    assert values["render_backend"] == "cairo"
@@ -0,0 +1,125 @@
+# tests/test_jobs.py
+# Реестр асинхронных заданий /jobs: состояние на диске, общее для процессов сервера
+
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from app.jobs import JobRegistry
+from app.render_pool import RenderJob
+
+PDF = b"%PDF-1.4 test"
+
+
+def fork_context():
+    if "fork" not in multiprocessing.get_all_start_methods():
+        pytest.skip("нужен fork (процессы-обработчики gunicorn)")
+    return multiprocessing.get_context("fork")
+
+
+def run_in_child(target, *args):
+    """Выполняет target(*args, conn) в дочернем процессе и возвращает то, что он отправил в conn."""
+    context = fork_context()
+    reader, writer = context.Pipe(duplex=False)
+    process = context.Process(target=target, args=(*args, writer))
+    process.start()
+    value = reader.recv()
+    process.join(timeout=10)
+    assert process.exitcode == 0
+    return value
+
+
+def create_completed_job(directory, conn):
+    job = JobRegistry(directory).add_completed("drawing", {"status": "OK", "pdf": PDF, "cache": "HIT"}, etag="abc")
+    conn.send(job.id)
+
+
+def create_running_job(directory, conn):
+    registry = JobRegistry(directory)
+    job = RenderJob({})
+    job.status, job.stage = "running", "svg"
+    job.on_update = registry._save_state
+    registry._save_state(job)
+    conn.send(job.id)
+
+
+def test_job_created_in_one_process_is_served_by_another(tmp_path):
+    job_id = run_in_child(create_completed_job, str(tmp_path))
+    job = JobRegistry(str(tmp_path)).get(job_id)
+    assert job is not None
+    assert job.to_dict()["status"] == "done"
+    assert (job.filename, job.etag, job.cache) == ("drawing", "abc", "HIT")
+    with open(job.pdf_path, "rb") as f:
+        assert f.read() == PDF
+
+
+def test_unfinished_job_of_exited_process_is_an_error(tmp_path):
+    job_id = run_in_child(create_running_job, str(tmp_path))
+    job = JobRegistry(str(tmp_path)).get(job_id)
+    assert job.status == "error"
+    assert job.stage == "svg"
+    assert "error" in job.to_dict()
+
+
+def test_unknown_and_malformed_ids(tmp_path):
+    registry = JobRegistry(str(tmp_path))
+    assert registry.get("0" * 32) is None
+    assert registry.get("../../etc") is None
+
+
+def test_completed_jobs_are_capped_least_recently_requested_first(tmp_path):
+    registry = JobRegistry(str(tmp_path), ttl=3600, max_completed=2, cleanup_interval=0)
+    first = registry.add_completed("first", {"status": "OK", "pdf": PDF})
+    second = registry.add_completed("second", {"status": "OK", "pdf": PDF})
+    # first запрашивали позже, чем создали second: сверх лимита вытесняется second
+    now = time.time()
+    os.utime(registry._status_path(second.id), (now - 20, now - 20))
+    os.utime(registry._status_path(first.id), (now - 10, now - 10))
+    third = registry.add_completed("third", {"status": "OK", "pdf": PDF})
+    registry.cleanup()
+    assert registry.get(second.id) is None
+    assert registry.get(first.id) is not None
+    assert registry.get(third.id) is not None
+
+
+def test_completed_jobs_expire_after_ttl(tmp_path):
+    registry = JobRegistry(str(tmp_path), ttl=60, max_completed=10, cleanup_interval=0)
+    job = RenderJob({})
+    job.status = "done"
+    job.finished_at = job.created_at - 61
+    registry._save_result(job, {"status": "OK", "pdf": PDF})
+    registry.cleanup()
+    assert registry.get(job.id) is None
+
+
+def test_cleanup_runs_in_background_thread(tmp_path):
+    registry = JobRegistry(str(tmp_path), ttl=60, max_completed=10, cleanup_interval=0.05)
+    job = RenderJob({})
+    job.status = "done"
+    job.finished_at = job.created_at - 61
+    registry._save_result(job, {"status": "OK", "pdf": PDF})
+    try:
+        # Первое обращение к реестру запускает поток очистки процесса; сам запрос каталог не просматривает
+        assert registry.get(job.id) is not None
+        deadline = time.monotonic() + 5
+        while os.path.exists(registry._job_dir(job.id)) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert registry.get(job.id) is None
+    finally:
+        registry.stop()
+
+
+@pytest.mark.parametrize("content", [b'{"id": "', b'{"status": "done"}', b"[1, 2]", b'{"id": "x", "status": "running"}'])
+def test_damaged_status_file_does_not_fail(tmp_path, content):
+    registry = JobRegistry(str(tmp_path), ttl=60, max_completed=10, cleanup_interval=0)
+    job_id = "a" * 32
+    os.makedirs(registry._job_dir(job_id))
+    with open(registry._status_path(job_id), "wb") as f:
+        f.write(content)
+    registry.cleanup()
+    if content.startswith(b'{"id": "x"'):
+        assert registry.get(job_id).status == "running"
+    else:
+        assert registry.get(job_id) is None
@@ -0,0 +1,80 @@
+# tests/test_metrics.py
+# Метрики /metrics в разделяемой памяти: значения процессов-обработчиков, созданных fork, суммируются
+
+import multiprocessing
+import os
+
+import pytest
+
+from app.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+def build_registry(slots=64):
+    registry = MetricsRegistry(slots=slots)
+    counter = registry.register(Counter("test_requests_total", "Запросы", ("status",)))
+    gauge = registry.register(Gauge("test_queue_depth", "Очередь"))
+    histogram = registry.register(Histogram("test_seconds", "Время", buckets=(0.1, 1)))
+    return registry, counter, gauge, histogram
+
+
+def run_in_children(target, count):
+    """Запускает count дочерних процессов (как обработчики gunicorn после fork), возвращает их pid."""
+    if "fork" not in multiprocessing.get_all_start_methods():
+        pytest.skip("нужен fork (процессы-обработчики gunicorn)")
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=target) for _ in range(count)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=10)
+        assert process.exitcode == 0
+    return [process.pid for process in processes]
+
+
+def test_values_of_forked_processes_are_summed():
+    registry, counter, gauge, histogram = build_registry()
+
+    def worker():
+        counter.inc(status="200")
+        counter.inc(2, status="500")
+        gauge.set(3)
+        histogram.observe(0.5)
+        os._exit(0)
+
+    run_in_children(worker, 2)
+    counter.inc(status="200")
+    gauge.set(1)
+    lines = registry.render().splitlines()
+
+    assert 'test_requests_total{status="200"} 3' in lines
+    assert 'test_requests_total{status="500"} 4' in lines
+    assert "test_queue_depth 7" in lines
+    assert 'test_seconds_bucket{le="0.1"} 0' in lines
+    assert 'test_seconds_bucket{le="1"} 2' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 2' in lines
+    assert "test_seconds_sum 1" in lines
+    assert "test_seconds_count 2" in lines
+
+
+def test_gauge_of_exited_process_is_forgotten_and_counters_kept():
+    registry, counter, gauge, _ = build_registry(slots=16)
+
+    def worker():
+        counter.inc(status="200")
+        gauge.set(5)
+        os._exit(0)
+
+    # 5 поколений по 3 процесса — 15 ячеек gauge: без освобождения таблица на 16 ячеек переполнилась бы
+    for _ in range(5):
+        for pid in run_in_children(worker, 3):
+            registry.forget_process(pid)
+    gauge.set(1)
+    lines = registry.render().splitlines()
+    assert "test_queue_depth 1" in lines
+    assert 'test_requests_total{status="200"} 15' in lines
+
+
+def test_labels_are_validated():
+    _, counter, _, _ = build_registry()
+    with pytest.raises(ValueError):
+        counter.inc(code="200")
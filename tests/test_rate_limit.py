@@ -0,0 +1,41 @@
+# tests/test_rate_limit.py
+# Лимиты по токену и IP: общий токен формы не делит одно ведро между всеми посетителями
+
+from app.rate_limit import IP_LIMITS, RateLimiter
+from app.tokens import DEFAULT_TOKEN_NAME, ApiToken
+
+LIMITS = {"rps": 0.001, "burst": 2, "cpu_per_minute": 0.001, "cpu_burst": 1}
+
+
+def allowed(limiter, keys) -> bool:
+    return all(decision.allowed for decision in limiter.check(keys))
+
+
+def test_two_ips_with_shared_token_have_separate_buckets(monkeypatch):
+    for field, value in LIMITS.items():
+        monkeypatch.setitem(IP_LIMITS, field, value)
+    limiter = RateLimiter(slots=64, enabled=True)
+    token = ApiToken(DEFAULT_TOKEN_NAME)
+    first = limiter.request_keys(token, "10.0.0.1")
+    second = limiter.request_keys(token, "10.0.0.2")
+    assert [key for key, _ in first] == ["ip:10.0.0.1"]
+
+    # Первый IP исчерпывает свой запас — второй с тем же токеном формы не затронут
+    assert allowed(limiter, first) and allowed(limiter, first)
+    assert not allowed(limiter, first)
+    assert allowed(limiter, second)
+
+    # Долг по CPU одного IP тоже не переходит на другой
+    limiter.charge(second, 100)
+    assert not allowed(limiter, second)
+
+
+def test_named_token_bucket_is_shared_across_ips():
+    limiter = RateLimiter(slots=64, enabled=True)
+    token = ApiToken("crm", LIMITS)
+    first = limiter.request_keys(token, "10.0.0.1")
+    second = limiter.request_keys(token, "10.0.0.2")
+    assert [key for key, _ in first] == ["ip:10.0.0.1", "token:crm"]
+    assert allowed(limiter, first) and allowed(limiter, second)
+    assert not allowed(limiter, first)
+    assert not allowed(limiter, second)
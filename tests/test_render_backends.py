@@ -0,0 +1,60 @@
+# tests/test_render_backends.py
+# render_backend svg и cairo: растры листа совпадают (как benchmarks/bench_backends.py)
+
+import pytest
+
+# Случаи параметризации берутся из бенчмарков, которые импортируют cairocffi: без libcairo модуль пропускается
+try:
+    import cairocffi  # noqa: F401
+except (ImportError, OSError) as error:
+    pytest.skip(f"нужна libcairo: {error}", allow_module_level=True)
+
+from app.render_pool import default_render_values  # noqa: E402
+from benchmarks.bench_generate_pdf import build_cases  # noqa: E402
+
+# Допуски bench_backends.py: отличие канала больше TOLERANCE — пиксель отличается,
+# таких пикселей допускается не больше MAX_DIFF от площади листа
+TOLERANCE = 64
+MAX_DIFF = 0.0005
+
+QUICK_CASES = build_cases(quick=True)
+CASES = [("default", default_render_values()), (QUICK_CASES[0][0], QUICK_CASES[0][2]),
+         (QUICK_CASES[-1][0], QUICK_CASES[-1][2])]
+
+
+@pytest.mark.parametrize("values", [values for _, values in CASES], ids=[case_id for case_id, _ in CASES])
+def test_png_parity(cairo, values):
+    from benchmarks.bench_backends import diff_pixels, render_cairo_png, render_svg_png
+    from generate_drawing import prepare_values
+
+    combined, defaults = prepare_values(values)
+    expected, actual = render_svg_png(combined, defaults), render_cairo_png(combined, defaults)
+    changed, _ = diff_pixels(expected, actual, TOLERANCE)
+    assert changed <= MAX_DIFF * expected.get_width() * expected.get_height()
+
+
+def test_pdf_parity(cairo):
+    """Растр PDF обоих способов: штриховки (паттерны) в PDF выводятся иначе, чем в PNG."""
+    pymupdf = pytest.importorskip("pymupdf")
+    from benchmarks.bench_backends import pdf_via_cairo, pdf_via_svg
+
+    def raster(pdf):
+        page = pymupdf.open(stream=pdf, filetype="pdf")[0]
+        return page.get_pixmap(matrix=pymupdf.Matrix(2, 2), alpha=False)
+
+    values = default_render_values()
+    expected, actual = raster(pdf_via_svg(values)), raster(pdf_via_cairo(values))
+    assert (expected.width, expected.height) == (actual.width, actual.height)
+    channels, stride = expected.n, expected.stride
+    samples_expected, samples_actual = expected.samples, actual.samples
+    changed = 0
+    for start in range(0, len(samples_expected), stride):
+        row_expected = samples_expected[start:start + stride]
+        row_actual = samples_actual[start:start + stride]
+        if row_expected == row_actual:
+            continue
+        changed += sum(
+            1 for offset in range(0, expected.width * channels, channels)
+            if any(abs(row_expected[offset + channel] - row_actual[offset + channel]) > TOLERANCE
+                   for channel in range(channels)))
+    assert changed <= MAX_DIFF * expected.width * expected.height
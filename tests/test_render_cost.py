@@ -0,0 +1,46 @@
+# tests/test_render_cost.py
+# С лимитов CPU списывается процессорное время воркера, а не время от передачи задания до результата
+
+import pytest
+
+import app.server as server
+from app.render_pool import RenderJob, RenderPool, default_render_values
+
+
+@pytest.fixture
+def charges(monkeypatch):
+    charged = []
+    monkeypatch.setattr(server.rate_limiter, "charge", lambda keys, cpu_seconds: charged.append(cpu_seconds))
+    return charged
+
+
+def finished_job(result, busy_seconds=5.0):
+    job = RenderJob({})
+    job.dispatched_at = 100.0
+    job.finished_at = 100.0 + busy_seconds
+    with server.app.test_request_context():
+        server.g.rate_keys = [("ip:127.0.0.1", {})]
+        server.track_render_cost(job)
+    job.future.set_result(result)
+
+
+def test_charges_worker_cpu_seconds(charges):
+    finished_job({"status": "OK", "cpu_seconds": 0.25})
+    assert charges == [0.25]
+
+
+def test_timeout_without_cpu_seconds_charges_busy_time(charges):
+    finished_job({"status": "timeout", "stage": "pdf"}, busy_seconds=5.0)
+    assert charges == [5.0]
+
+
+def test_worker_reports_cpu_seconds(cairo):
+    pool = RenderPool(size=1, warmup=False, stage_timeouts={})
+    try:
+        job = pool.submit(svg_path=None, pdf_path=None, values=default_render_values(),
+                          disable_svg_debug=True, save_pdf=True)
+        result = job.future.result(timeout=120)
+    finally:
+        pool.shutdown()
+    assert result["status"] == "OK"
+    assert 0 < result["cpu_seconds"] <= job.finished_at - job.dispatched_at
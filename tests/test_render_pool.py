@@ -0,0 +1,90 @@
+# tests/test_render_pool.py
+# Пул рендеринга: ошибки в потоке приёма результатов и воркеры, которые не запускаются
+
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import app.render_pool as render_pool
+from app.render_pool import RenderPool, RenderPoolError
+
+# Воркеры-заглушки подменяют _render_worker: процесс создаётся fork и видит подмену
+pytestmark = pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(),
+                                reason="нужен fork")
+
+
+def echo_worker(worker_id, conn, warmup):
+    """Отвечает на задание успехом; kwargs mode="bad" — результатом, который пул не может обработать."""
+    conn.send(("ready", worker_id, None))
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        job_id, _, kwargs, _ = task
+        time.sleep(kwargs.get("delay", 0))
+        conn.send(("start", job_id, worker_id))
+        conn.send(("stage", job_id, "svg"))
+        conn.send(("done", job_id, "не dict" if kwargs.get("mode") == "bad" else {"status": "OK", "cpu_seconds": 0}))
+
+
+def crashing_worker(worker_id, conn, warmup):
+    """Падает до готовности, как воркер с ошибкой импорта."""
+    os._exit(3)
+
+
+def small_pool(**options):
+    return RenderPool(size=1, warmup=False, max_queue=10, stage_timeouts={}, respawn_delay=0.01,
+                      respawn_max_delay=0.05, start_max_failures=3, start_timeout=10, **options)
+
+
+def test_failing_on_update_does_not_stop_listener(monkeypatch):
+    monkeypatch.setattr(render_pool, "_render_worker", echo_worker)
+    pool = small_pool()
+    pool.start()
+    try:
+        def broken_on_update(job):
+            raise OSError("диск недоступен")
+
+        job = pool.submit(delay=0.2)
+        job.on_update = broken_on_update
+        assert job.future.result(timeout=10)["status"] == "OK"
+        assert pool.submit().future.result(timeout=10)["status"] == "OK"
+    finally:
+        pool.shutdown()
+
+
+def test_bad_message_fails_only_its_job(monkeypatch):
+    monkeypatch.setattr(render_pool, "_render_worker", echo_worker)
+    pool = small_pool()
+    pool.start()
+    try:
+        result = pool.submit(mode="bad").future.result(timeout=10)
+        assert result["status"] == "error"
+        # Воркер заменён, пул продолжает работать
+        assert pool.submit().future.result(timeout=10)["status"] == "OK"
+        assert pool.stats()["worker_restarts"] == 1
+    finally:
+        pool.shutdown()
+
+
+def test_start_raises_when_workers_keep_crashing(monkeypatch):
+    monkeypatch.setattr(render_pool, "_render_worker", crashing_worker)
+    pool = small_pool()
+    started = time.monotonic()
+    with pytest.raises(RenderPoolError):
+        pool.start()
+    assert time.monotonic() - started < 5
+    with pytest.raises(RenderPoolError):
+        pool.submit()
+
+
+def test_start_raises_on_timeout(monkeypatch):
+    def silent_worker(worker_id, conn, warmup):
+        conn.recv()
+
+    monkeypatch.setattr(render_pool, "_render_worker", silent_worker)
+    pool = RenderPool(size=1, warmup=False, start_timeout=0.5)
+    with pytest.raises(RenderPoolError):
+        pool.start()
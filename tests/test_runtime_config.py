@@ -0,0 +1,62 @@
+# tests/test_runtime_config.py
+# Перезагрузка настроек: ошибка в файле не ломает запрос, а исправленный файл перечитывается
+
+import json
+import os
+
+import pytest
+
+import app.runtime_config as runtime_config_module
+from app.runtime_config import RuntimeConfig
+from app.tokens import hash_token, token_registry
+
+
+@pytest.fixture
+def tokens_file(tmp_path, monkeypatch):
+    path = tmp_path / "tokens.json"
+    path.write_text(json.dumps([{"name": "crm", "sha256": hash_token("a")}]), encoding="utf-8")
+    monkeypatch.setattr(runtime_config_module, "ENV_FILE", str(tmp_path / ".env"))
+    monkeypatch.setattr(runtime_config_module, "reload_config_modules", lambda: "version")
+    monkeypatch.setattr(runtime_config_module.ip_allowlist, "reload", lambda env_value=None: True)
+    # Глобальный реестр восстанавливается после теста
+    monkeypatch.setattr(token_registry, "_tokens", dict(token_registry._tokens))
+    monkeypatch.setattr(token_registry, "path", str(path))
+    token_registry.load(str(path))
+    return path
+
+
+def touch_later(path, text, seconds):
+    path.write_text(text, encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + seconds))
+
+
+def test_broken_tokens_file_keeps_registry_and_is_retried(tokens_file):
+    config = RuntimeConfig(reload_seconds=0)
+
+    touch_later(tokens_file, '[{"name": ', 10)
+    config.check()
+    assert token_registry.lookup("a").name == "crm"
+    assert config.reloads == 0
+
+    # Исправленный файл перечитывается при следующей проверке
+    touch_later(tokens_file, json.dumps([{"name": "partner", "sha256": hash_token("b")}]), 20)
+    config.check()
+    assert config.reloads == 1
+    assert token_registry.lookup("a") is None
+    assert token_registry.lookup("b").name == "partner"
+
+
+def test_failing_reload_does_not_raise(tokens_file, monkeypatch):
+    config = RuntimeConfig(reload_seconds=0)
+
+    def broken():
+        raise SyntaxError("configs/config.py")
+
+    monkeypatch.setattr(runtime_config_module, "reload_config_modules", broken)
+    touch_later(tokens_file, tokens_file.read_text(encoding="utf-8"), 10)
+    assert config.reload("тест") is False
+    mtimes = dict(config._mtimes)
+    config.check()
+    assert config._mtimes == mtimes
+    assert config.reloads == 0
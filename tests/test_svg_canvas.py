@@ -0,0 +1,52 @@
+# tests/test_svg_canvas.py
+# SvgCanvas пишет ту же строку SVG, что svgwrite.Drawing (как benchmarks/bench_svg_writer.py)
+
+import pytest
+
+from drawers.svg_canvas import SvgCanvas
+
+CASES = ["default", "first", "last"]
+
+
+def sheet_values(case):
+    """Значения листа: по умолчанию или первый / последний случай сокращённой матрицы бенчмарков."""
+    from app.render_pool import default_render_values
+    from benchmarks.bench_generate_pdf import build_cases
+
+    if case == "default":
+        return default_render_values()
+    cases = build_cases(quick=True)
+    return (cases[0] if case == "first" else cases[-1])[2]
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_sheet_matches_svgwrite(cairo, case):
+    pytest.importorskip("svgwrite")
+    from benchmarks.bench_svg_writer import build_svg_svgwrite, first_difference
+    from configs.config import PDF_FONT_MODE
+    from generate_drawing import build_svg, prepare_values
+
+    combined, defaults = prepare_values(sheet_values(case))
+    grid = case == "default"
+    expected = build_svg_svgwrite(combined, defaults, grid, PDF_FONT_MODE)
+    actual = build_svg(combined, defaults, grid, font_mode=PDF_FONT_MODE)
+    if expected != actual:
+        index, expected_part, actual_part = first_difference(expected, actual)
+        pytest.fail(f"первое отличие в символе {index}:\nsvgwrite: {expected_part!r}\ncanvas:   {actual_part!r}")
+
+
+def test_text_none_is_empty():
+    dwg = SvgCanvas()
+    text = dwg.text(None, insert=(1, 2))
+    text.add(dwg.tspan(None))
+    dwg.add(text)
+    assert '<text x="1" y="2"><tspan /></text>' in dwg.tostring()
+    assert "None" not in dwg.tostring()
+    assert not dwg.chars
+
+
+def test_text_is_escaped_and_collected():
+    dwg = SvgCanvas()
+    dwg.add(dwg.text("a<b & 0", insert=(0, 0)))
+    assert ">a&lt;b &amp; 0</text>" in dwg.tostring()
+    assert dwg.chars == set("a<b & 0")
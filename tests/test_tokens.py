@@ -0,0 +1,47 @@
+# tests/test_tokens.py
+# Реестр токенов: некорректные записи пропускаются, нечитаемый файл не заменяет прежний реестр
+
+import json
+
+from app.tokens import DEFAULT_TOKEN_NAME, TokenRegistry, hash_token
+
+
+def write_tokens(path, entries):
+    path.write_text(entries if isinstance(entries, str) else json.dumps(entries), encoding="utf-8")
+
+
+def test_bad_entries_are_skipped(tmp_path):
+    path = tmp_path / "tokens.json"
+    write_tokens(path, [
+        "не объект",
+        {"name": "no-hash"},
+        {"name": "bad-hash", "sha256": "x" * 64},
+        {"name": "bad-limit", "sha256": hash_token("b"), "rps": "много"},
+        {"name": "negative-limit", "sha256": hash_token("c"), "burst": -1},
+        {"name": "crm", "sha256": hash_token("a"), "rps": "10", "burst": 30},
+    ])
+    registry = TokenRegistry()
+    assert registry.load(str(path), "secret")
+    assert len(registry) == 2
+    assert registry.lookup("a").limits == {"rps": 10.0, "burst": 30.0}
+    assert registry.lookup("b") is None
+    assert registry.lookup("secret").name == DEFAULT_TOKEN_NAME
+
+
+def test_unreadable_file_keeps_previous_registry(tmp_path):
+    path = tmp_path / "tokens.json"
+    write_tokens(path, [{"name": "crm", "sha256": hash_token("a")}])
+    registry = TokenRegistry()
+    assert registry.load(str(path))
+    for broken in ('[{"name": ', '{"name": "crm"}'):
+        write_tokens(path, broken)
+        assert not registry.load(str(path))
+        assert registry.lookup("a").name == "crm"
+
+
+def test_unreadable_file_on_first_load_keeps_secret_token(tmp_path):
+    path = tmp_path / "tokens.json"
+    write_tokens(path, "[")
+    registry = TokenRegistry()
+    registry.load(str(path), "secret")
+    assert registry.lookup("secret").name == DEFAULT_TOKEN_NAME
@@ -10,6 +10,7 @@ import tempfile
 import threading
 import time
 import os
+from contextlib import contextmanager
 from configs.config_log import logger
 
 
@@ -20,12 +21,9 @@ def resource_path(relative_path):
         # Если запущено из .exe (PyInstaller), используем временную папку _MEIPASS
         base_path = Path(sys._MEIPASS)
     else:
-        # Иначе используем папку с главным исполняемым скриптом
-        try:
-            base_path = Path(sys.modules['__main__'].__file__).resolve().parent
-        except AttributeError:
-            # Если __main__.__file__ не доступен, fallback на текущий файл
-            base_path = Path(__file__).resolve().parent
+        # Иначе используем корень проекта (на уровень выше utils/): так пути не зависят
+        # от того, какой скрипт запущен (main.py, run.py, benchmarks/..., python -c)
+        base_path = Path(__file__).resolve().parent.parent
       
     # base_path = getattr(sys, '_MEIPASS', Path(__file__).parent)
 
@@ -93,6 +91,22 @@ def save_svg_if_enabled(dwg, disable_svg_debug, svg_path):
             logger.warning(f"Не удалось сохранить SVG отладочный файл: {svg_debug_err}") 
 
 
+@contextmanager
+def stage_timer(timings, name):
+    """
+    Замеряет время выполнения блока и прибавляет его (сек) к timings[name].
+    Если timings равен None — ничего не замеряет.
+    """
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
 def mm_to_pt(num):
     """Переводит мм в pt (points)"""
     return num*96/25.4